@@ -0,0 +1,58 @@
+"""Measures the time from ``python -m serpentime.app`` to the first painted
+frame of the chronodex graph.
+
+Usage: python benchmarks/bench_startup.py [--runs N] [--output FILE]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+def measure_startup(runs):
+    """Returns the list of the startup times of the given number of runs,
+    in seconds.
+    """
+    env = dict(os.environ)
+    env["SERPENTIME_QUIT_ON_FIRST_PAINT"] = "1"
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-m", "serpentime.app"], env=env, check=True
+        )
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--output", help="JSON file to write results to")
+    args = parser.parse_args()
+
+    timings = measure_startup(args.runs)
+    results = {
+        "startup": {
+            "runs": args.runs,
+            "min": min(timings),
+            "median": statistics.median(timings),
+            "max": max(timings),
+        }
+    }
+    print(
+        f"startup to first paint: median {results['startup']['median']:.3f}s"
+        f" (min {results['startup']['min']:.3f}s,"
+        f" max {results['startup']['max']:.3f}s)"
+    )
+    if args.output:
+        with open(args.output, "w") as fi:
+            json.dump(results, fi, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,351 @@
+"""Runs the benchmark suite on a synthetic dataset and stores the results as
+JSON, to compare commits and catch performance regressions.
+
+Usage: python benchmarks/bench_suite.py [--days N] [--activities M]
+       [--repeat R] [--output FILE] [--compare BASELINE] [--threshold T]
+       [--filter NAME]
+
+Benchmarks needing Qt are run with the offscreen platform, and skipped if
+PyQt5 is not installed.
+"""
+from datetime import date, timedelta
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from generate_data import generate_dataset
+from serpentime.core.chronodex import Chronodex
+from serpentime.core.data_index import day_filename
+from serpentime.files import PREF_PATH
+
+
+# Relative slowdown of the median above which a benchmark is reported as a
+# regression when comparing with a baseline
+DEFAULT_THRESHOLD = 0.2
+
+
+def measure(func, setup=None, repeat=5):
+    """Returns the durations of repeat calls of func, in seconds. setup is
+    called before each call and is not timed.
+    """
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+class Context(object):
+    """The dataset and objects shared by the benchmarks."""
+
+    def __init__(self, directory, n_days, n_activities):
+        self.directory = directory
+        self.n_days = n_days
+        self.n_activities = n_activities
+        self.today = date.today()
+        self.dirs = generate_dataset(
+            directory, n_days, n_activities, formats=("csv", "txt"),
+            end=self.today,
+        )
+        self.days = [
+            self.today - timedelta(days=n_days - 1 - ind)
+            for ind in range(n_days)
+        ]
+        self._model = None
+        # The csv and sqlite storages of the dataset, see make_storages
+        self.storages = None
+
+    def paths(self, fmt):
+        return [
+            os.path.join(self.dirs[fmt], day_filename(day, fmt))
+            for day in self.days
+        ]
+
+    @property
+    def model(self):
+        """An AppModel reading a copy of the csv dataset."""
+        if self._model is None:
+            self._model = make_model(self)
+        return self._model
+
+    def close(self):
+        if self._model is not None:
+            self._model.close()
+        for storage in (self.storages or {}).values():
+            storage.close()
+
+
+def ensure_qt():
+    """Creates the QApplication needed by the Qt benchmarks."""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+
+    if QApplication.instance() is None:
+        ensure_qt.app = QApplication([])
+
+
+def make_model(context):
+    """Returns an AppModel reading a copy of the csv dataset and of the
+    default preferences.
+    """
+    ensure_qt()
+    from serpentime.ui import app_model
+
+    data_dir = os.path.join(context.directory, "model-data")
+    if not os.path.exists(data_dir):
+        shutil.copytree(context.dirs["csv"], data_dir)
+    pref_path = os.path.join(context.directory, "preferences.json")
+    shutil.copy(PREF_PATH, pref_path)
+    app_model.DATA_PATH = data_dir
+    app_model.PREF_PATH = pref_path
+    return app_model.AppModel()
+
+
+def bench_from_txt(context, repeat):
+    paths = context.paths("txt")
+    return measure(
+        lambda: [Chronodex.from_txt(path) for path in paths], repeat=repeat
+    )
+
+
+def bench_from_csv(context, repeat):
+    paths = context.paths("csv")
+    return measure(
+        lambda: [Chronodex.from_csv(path) for path in paths], repeat=repeat
+    )
+
+
+def bench_app_model_init(context, repeat):
+    models = []
+
+    def create():
+        models.append(make_model(context))
+
+    try:
+        return measure(create, repeat=repeat)
+    finally:
+        for model in models:
+            model.close()
+
+
+def bench_get_chronodex_uncached(context, repeat):
+    model = context.model
+    return measure(
+        lambda: [model.get_chronodex(day) for day in context.days],
+        setup=model.day_cache.clear, repeat=repeat,
+    )
+
+
+def bench_get_chronodex_cached(context, repeat):
+    model = context.model
+    for day in context.days:
+        model.get_chronodex(day)
+    return measure(
+        lambda: [model.get_chronodex(day) for day in context.days],
+        repeat=repeat,
+    )
+
+
+def bench_save_chronodex(context, repeat):
+    model = context.model
+
+    def setup():
+        # Forces the whole day to be journaled, as after an edit made with
+        # auto save off
+        model._synced = False
+
+    return measure(model.save_chronodex, setup=setup, repeat=repeat)
+
+
+def bench_draw_chronodex(context, repeat):
+    ensure_qt()
+    from serpentime.ui.chronodex_graph import ChronodexGraph
+
+    model = context.model
+    graph = ChronodexGraph(model.chronodex, model.preferences)
+    return measure(graph.draw_chronodex, repeat=repeat)
+
+
+def bench_table_row_operations(context, repeat):
+    ensure_qt()
+    from PyQt5.QtCore import QModelIndex
+    from serpentime.ui.chronodex_table_model import ChronodexTableModel
+
+    chronodex = Chronodex.from_csv(context.paths("csv")[-1])
+    table = ChronodexTableModel(chronodex)
+    parent = QModelIndex()
+
+    def operations():
+        for _ in range(100):
+            row = len(chronodex) // 2
+            table.insertRows(row, 1, parent)
+            table.removeRows(row, 1, parent)
+
+    return measure(operations, repeat=repeat)
+
+
+def make_storages(context):
+    """Returns the csv storage of the dataset, and a sqlite storage holding
+    a copy of it.
+    """
+    from serpentime.core.storage import (
+        CsvStorage, SqliteStorage, copy_storage
+    )
+
+    if context.storages is None:
+        csv_storage = CsvStorage(context.dirs["csv"])
+        sqlite_storage = SqliteStorage(context.directory)
+        copy_storage(csv_storage, sqlite_storage)
+        context.storages = {"csv": csv_storage, "sqlite": sqlite_storage}
+    return context.storages
+
+
+def bench_storage_range(backend):
+    def bench(context, repeat):
+        storage = make_storages(context)[backend]
+        return measure(lambda: list(storage.iter_range()), repeat=repeat)
+    return bench
+
+
+def bench_storage_category(backend):
+    def bench(context, repeat):
+        storage = make_storages(context)[backend]
+        return measure(
+            lambda: storage.query_category("work"), repeat=repeat
+        )
+    return bench
+
+
+# Benchmarks by name, and whether they need Qt
+BENCHMARKS = {
+    "from_txt": (bench_from_txt, False),
+    "from_csv": (bench_from_csv, False),
+    "app_model_init": (bench_app_model_init, True),
+    "get_chronodex_uncached": (bench_get_chronodex_uncached, True),
+    "get_chronodex_cached": (bench_get_chronodex_cached, True),
+    "save_chronodex": (bench_save_chronodex, True),
+    "draw_chronodex": (bench_draw_chronodex, True),
+    "table_row_operations": (bench_table_row_operations, True),
+    "storage_range_csv": (bench_storage_range("csv"), False),
+    "storage_range_sqlite": (bench_storage_range("sqlite"), False),
+    "storage_category_csv": (bench_storage_category("csv"), False),
+    "storage_category_sqlite": (bench_storage_category("sqlite"), False),
+}
+
+
+def qt_available():
+    try:
+        import PyQt5.QtWidgets  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def git_commit():
+    """Returns the current commit hash, or None outside of a git tree."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+            check=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(n_days, n_activities, repeat, names=None):
+    """Runs the benchmarks and returns their results as a dictionary."""
+    names = names or list(BENCHMARKS)
+    has_qt = qt_available()
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        context = Context(directory, n_days, n_activities)
+        try:
+            for name in names:
+                func, needs_qt = BENCHMARKS[name]
+                if needs_qt and not has_qt:
+                    results[name] = {"skipped": "PyQt5 is not installed"}
+                    continue
+                timings = func(context, repeat)
+                results[name] = {
+                    "repeat": len(timings),
+                    "min": min(timings),
+                    "median": statistics.median(timings),
+                    "mean": statistics.mean(timings),
+                    "max": max(timings),
+                }
+        finally:
+            context.close()
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.time(),
+            "days": n_days,
+            "activities": n_activities,
+        },
+        "results": results,
+    }
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Returns the names of the benchmarks whose median is slower than in
+    baseline by more than threshold, and prints the ratio of each.
+    """
+    regressions = []
+    for name, result in results["results"].items():
+        reference = baseline.get("results", {}).get(name, {})
+        if "median" not in result or "median" not in reference:
+            continue
+        ratio = result["median"] / reference["median"]
+        flag = ""
+        if ratio > 1 + threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<24} {ratio:6.2f}x baseline{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--activities", type=int, default=12)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="JSON file to write results to")
+    parser.add_argument("--compare", help="JSON results of a baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--filter", nargs="+", choices=tuple(BENCHMARKS),
+                        help="the benchmarks to run, all by default")
+    args = parser.parse_args()
+
+    results = run_suite(args.days, args.activities, args.repeat, args.filter)
+    for name, result in results["results"].items():
+        if "skipped" in result:
+            print(f"{name:<24} skipped: {result['skipped']}")
+        else:
+            print(
+                f"{name:<24} median {result['median'] * 1000:9.3f}ms"
+                f" (min {result['min'] * 1000:.3f}ms)"
+            )
+    if args.output:
+        with open(args.output, "w") as fi:
+            json.dump(results, fi, indent=2)
+    if args.compare:
+        with open(args.compare, "r") as fi:
+            baseline = json.load(fi)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Generates synthetic chronodex data: N days of M activities each, as
+YYYYMMDD.txt and/or YYYYMMDD.csv files.
+
+Usage: python benchmarks/generate_data.py DIRECTORY [--days N]
+       [--activities M] [--formats txt csv] [--seed S]
+"""
+from datetime import date, timedelta
+import argparse
+import os
+import random
+
+from serpentime.core.data_index import day_filename
+from serpentime.core.parsers import ActivityRow
+
+
+CATEGORIES = [
+    "chore", "sleep", "work", "code", "food", "meeting", "call", "bike",
+]
+NAMES = [
+    "emails", "review", "standup", "lunch", "dinner", "commute", "reading",
+    "groceries", "design", "debugging", "planning", "run", "nap", "call mum",
+]
+
+
+def generate_day(rng, n_activities):
+    """Returns n_activities contiguous activities covering the day, as a
+    list of ActivityRow.
+
+    Boundaries are multiples of a minute, so that txt files, which only
+    hold start hours, are generated from whole hours when there are at
+    most 24 activities.
+    """
+    if n_activities <= 24:
+        hours = sorted(rng.sample(range(1, 24), n_activities - 1))
+        bounds = [0] + hours + [24]
+    else:
+        minutes = sorted(rng.sample(range(1, 24 * 60), n_activities - 1))
+        bounds = [0] + [minute / 60 for minute in minutes] + [24]
+    return [
+        ActivityRow(
+            bounds[ind], bounds[ind + 1], rng.choice(NAMES),
+            rng.choice(CATEGORIES), rng.randint(1, 10),
+        )
+        for ind in range(n_activities)
+    ]
+
+
+def write_csv(path, rows):
+    """Writes rows in the csv format: start, end, category, name, weight.
+    """
+    with open(path, "w") as fi:
+        for row in rows:
+            fi.write(
+                f"{row.start}, {row.end}, {row.category}, {row.name}, "
+                f"{row.weight}\n"
+            )
+
+
+def write_txt(path, rows):
+    """Writes rows in the txt format: start, category, weight, name. Start
+    hours are truncated to integers, as the format requires.
+    """
+    with open(path, "w") as fi:
+        for row in rows:
+            fi.write(
+                f"{int(row.start)}, {row.category}, {row.weight}, "
+                f"{row.name}\n"
+            )
+
+
+WRITERS = {"csv": write_csv, "txt": write_txt}
+
+
+def generate_dataset(directory, n_days, n_activities, formats=("csv",),
+                     end=None, seed=0):
+    """Writes n_days days of n_activities activities in directory.
+
+    Parameters
+    ----------
+    directory: str
+        The directory in which the day files are written, created if
+        needed. Each format gets its own subdirectory when several are
+        requested, as a data directory holds one file per day.
+    n_days, n_activities: int
+        The number of days and of activities per day.
+    formats: sequence(str)
+        Among 'txt' and 'csv'.
+    end: datetime.date or None
+        The last generated day, today if None.
+    seed: int
+        The seed of the random generator, for reproducible datasets.
+
+    Returns
+    -------
+    directories: dict
+        {format: directory holding the files of that format}.
+    """
+    rng = random.Random(seed)
+    end = end or date.today()
+    directories = {}
+    for fmt in formats:
+        fmt_dir = directory if len(formats) == 1 else os.path.join(
+            directory, fmt
+        )
+        os.makedirs(fmt_dir, exist_ok=True)
+        directories[fmt] = fmt_dir
+    for ind in range(n_days):
+        day = end - timedelta(days=n_days - 1 - ind)
+        rows = generate_day(rng, n_activities)
+        for fmt, fmt_dir in directories.items():
+            WRITERS[fmt](os.path.join(fmt_dir, day_filename(day, fmt)), rows)
+    return directories
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("directory")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--activities", type=int, default=12)
+    parser.add_argument("--formats", nargs="+", choices=tuple(WRITERS),
+                        default=["csv"])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    directories = generate_dataset(
+        args.directory, args.days, args.activities, formats=args.formats,
+        seed=args.seed,
+    )
+    for fmt, fmt_dir in directories.items():
+        print(f"{args.days} {fmt} days written to {fmt_dir}")
+
+
+if __name__ == "__main__":
+    main()
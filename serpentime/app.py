@@ -1,12 +1,33 @@
+import os
 import sys
+from PyQt5.QtCore import QEvent, QObject
 from PyQt5.QtWidgets import QApplication
 
 from .ui.app_view import AppView
 
 
+# If set in the environment, the app quits as soon as the chronodex graph
+# has been painted once. Used to benchmark startup time.
+QUIT_ON_FIRST_PAINT = "SERPENTIME_QUIT_ON_FIRST_PAINT"
+
+
+class FirstPaintFilter(QObject):
+    """An event filter quitting the application on the first paint event
+    of the watched widget.
+    """
+
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Paint:
+            QApplication.instance().quit()
+        return False
+
+
 def main():
     app = QApplication(sys.argv)
-    _ = AppView()
+    view = AppView()
+    if os.environ.get(QUIT_ON_FIRST_PAINT):
+        paint_filter = FirstPaintFilter(view)
+        view.chronodex_view.viewport().installEventFilter(paint_filter)
     sys.exit(app.exec_())
 
 
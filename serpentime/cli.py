@@ -0,0 +1,344 @@
+"""The serpentime command line interface, to query and export the data of
+the application without starting its UI.
+
+It only depends on serpentime.core, so it runs without a display and
+starts quickly. Usage:
+
+    serpentime show 2020-03-01
+    serpentime stats 2020-01-01 2020-12-31
+    serpentime export 2020-01-01 2020-12-31 -o activities.csv
+    serpentime import old_files/
+    serpentime validate
+    serpentime search project x
+    serpentime --backend csv migrate sqlite
+"""
+from datetime import date, timedelta
+import argparse
+import csv
+import json
+import sys
+
+from serpentime.core.analytics import summarize
+from serpentime.core.chronodex import (
+    BAD_TYPE, END_BEFORE_START, OUT_OF_RANGE, OVERLAP
+)
+from serpentime.core.journal import EditJournal
+from serpentime.core.normalize import KEEP, OVERLAP_POLICIES
+from serpentime.core.search import SearchIndex
+from serpentime.core.storage import (
+    STORAGE_BACKENDS, copy_storage, open_storage
+)
+from serpentime.files import DATA_PATH, PREF_PATH
+
+
+# Descriptions of the reason codes of Chronodex.validate
+REASONS = [
+    (BAD_TYPE, "start, end or weight is not a number"),
+    (OUT_OF_RANGE, "out of range"),
+    (END_BEFORE_START, "ends before it starts"),
+    (OVERLAP, "overlaps another activity"),
+]
+
+EXPORT_FIELDS = ['date', 'start', 'end', 'category', 'name', 'weight']
+
+
+def parse_day(value):
+    """Returns the date given as YYYY-MM-DD, 'today' or 'yesterday'."""
+    if value == 'today':
+        return date.today()
+    if value == 'yesterday':
+        return date.today() - timedelta(days=1)
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"invalid date {value!r}, expected YYYY-MM-DD"
+        ) from None
+
+
+def format_hour(value):
+    """Returns a time given in hours as HH:MM."""
+    if value is None:
+        return '--:--'
+    minutes = round(value * 60)
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+class DataStore(object):
+    """Reads the days of a data directory, with the edits of its journal
+    not yet written to its storage.
+    """
+
+    def __init__(self, directory, backend='csv'):
+        self.directory = directory
+        self.storage = open_storage(directory, backend)
+        self.journal = EditJournal(directory)
+
+    def get(self, day):
+        """Returns the Chronodex of the given day, empty if it has no data.
+        """
+        if day in self.journal:
+            return self.journal.replay(day, self.storage.get)
+        return self.storage.get(day)
+
+    def iter_range(self, start=None, end=None):
+        """Yields the (day, Chronodex) pairs of the days with data between
+        start and end, both included, in order. A None bound is unbounded.
+        """
+        return self.journal.iter_range(self.storage, start, end)
+
+    def close(self):
+        self.journal.close()
+        self.storage.close()
+
+
+def load_preferences(path):
+    """Returns the preferences of the given file, empty if it cannot be
+    read.
+    """
+    try:
+        with open(path, 'r') as fi:
+            return json.load(fi)
+    except (OSError, ValueError):
+        return {}
+
+
+def load_categories(path):
+    """Returns the categories of the preferences file, if any."""
+    return load_preferences(path).get('categories', [])
+
+
+def cmd_show(args, store):
+    chronodex = store.get(args.day)
+    if args.format == 'csv':
+        chronodex.to_csv(sys.stdout)
+        return 0
+    if args.format == 'json':
+        json.dump([row._asdict() for row in chronodex.rows()], sys.stdout)
+        print()
+        return 0
+    _, reasons = chronodex.validate()
+    print(args.day.isoformat())
+    for row, reason in zip(chronodex.rows(), reasons):
+        flag = '!' if reason else ' '
+        print(
+            f"{flag} {format_hour(row.start)}-{format_hour(row.end)}  "
+            f"{row.category:<12} {row.name:<20} {row.weight}"
+        )
+    return 0
+
+
+def cmd_stats(args, store):
+    end = args.end or args.start
+    summary = summarize(
+        store.storage, args.start, end,
+        categories=load_categories(args.preferences), journal=store.journal,
+    )
+    totals = summary.name_totals if args.names else summary.category_totals
+    if args.json:
+        json.dump({
+            'start': args.start.isoformat(),
+            'end': end.isoformat(),
+            'total_hours': summary.total_hours,
+            'coverage': summary.coverage,
+            'hours': totals,
+        }, sys.stdout)
+        print()
+        return 0
+    print(
+        f"{args.start.isoformat()} to {end.isoformat()}: "
+        f"{summary.total_hours:.1f}h tracked, {summary.coverage:.0%} "
+        f"of the time covered"
+    )
+    total = summary.total_hours or 1
+    for key, hours in sorted(totals.items(), key=lambda item: -item[1]):
+        print(f"  {key:<20} {hours:8.1f}h {hours / total:6.1%}")
+    return 0
+
+
+def cmd_export(args, store):
+    output = sys.stdout
+    if args.output is not None:
+        output = open(args.output, 'w', newline='')
+    try:
+        if args.format == 'csv':
+            writer = csv.writer(output)
+            writer.writerow(EXPORT_FIELDS)
+        else:
+            records = []
+        for day, chronodex in store.iter_range(args.start, args.end):
+            mask, _ = chronodex.validate()
+            for row, valid in zip(chronodex.rows(), mask):
+                if not valid:
+                    continue
+                if args.format == 'csv':
+                    writer.writerow([day.isoformat()] + [
+                        getattr(row, field) for field in EXPORT_FIELDS[1:]
+                    ])
+                else:
+                    records.append(dict(row._asdict(), date=day.isoformat()))
+        if args.format == 'json':
+            json.dump(records, output)
+            output.write('\n')
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return 0
+
+
+def cmd_import(args, store):
+    # The process pool is only imported when needed, to keep the other
+    # commands fast to start
+    from serpentime.core.importer import import_tree
+
+    report = import_tree(
+        args.source, store.storage, overwrite=args.overwrite,
+        workers=args.workers, journal=store.journal, overlap=args.overlap,
+    )
+    for path, message in sorted(report.errors.items()):
+        print(f"{path}: {message}", file=sys.stderr)
+    print(report.summary())
+    return 1 if report.errors else 0
+
+
+def cmd_validate(args, store):
+    n_invalid = 0
+    n_warnings = 0
+    for day, chronodex in store.iter_range(args.start, args.end):
+        mask, reasons = chronodex.validate()
+        for row, (valid, reason) in enumerate(zip(mask, reasons)):
+            if not reason:
+                continue
+            if valid:
+                n_warnings += 1
+            else:
+                n_invalid += 1
+            descriptions = ', '.join(
+                text for code, text in REASONS if reason & code
+            )
+            level = 'warning' if valid else 'invalid'
+            print(f"{day.isoformat()} row {row + 1}: {level}: {descriptions}")
+    print(f"{n_invalid} invalid activities, {n_warnings} warnings")
+    return 1 if n_invalid else 0
+
+
+def cmd_search(args, store):
+    index = SearchIndex(store.directory)
+    index.sync(store.storage, store.get)
+    index.flush()
+    hits = index.search(' '.join(args.query), args.start, args.end)
+    for hit in hits:
+        chronodex = store.get(hit.day)
+        names = chronodex.names
+        matches = ', '.join(
+            names[row] for row in hit.rows if row < len(names)
+        )
+        print(f"{hit.day.isoformat()}  {matches}")
+    return 0 if hits else 1
+
+
+def cmd_migrate(args, store):
+    if args.target == args.backend:
+        print(f"The data is already in the {args.target} storage",
+              file=sys.stderr)
+        return 1
+    target = open_storage(store.directory, args.target)
+    try:
+        n_days = copy_storage(
+            store.storage, target, overwrite=args.overwrite
+        )
+    finally:
+        target.close()
+    print(f"{n_days} days copied to the {args.target} storage")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='serpentime',
+        description="Queries and exports the chronodex data.",
+    )
+    parser.add_argument('--data-dir', default=DATA_PATH)
+    parser.add_argument(
+        '--backend', choices=sorted(STORAGE_BACKENDS),
+        help="the storage of the data directory, by default the one set "
+             "in the preferences",
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    show = subparsers.add_parser('show', help="prints the activities of a day")
+    show.add_argument('day', type=parse_day, nargs='?', default=date.today())
+    show.add_argument('--format', choices=('text', 'csv', 'json'),
+                      default='text')
+    show.set_defaults(func=cmd_show)
+
+    stats = subparsers.add_parser(
+        'stats', help="prints the hours spent per category over a range"
+    )
+    stats.add_argument('start', type=parse_day)
+    stats.add_argument('end', type=parse_day, nargs='?')
+    stats.add_argument('--names', action='store_true',
+                       help="groups the hours by activity name")
+    stats.add_argument('--json', action='store_true')
+    stats.add_argument('--preferences', default=PREF_PATH)
+    stats.set_defaults(func=cmd_stats)
+
+    export = subparsers.add_parser(
+        'export', help="exports the valid activities of a range"
+    )
+    export.add_argument('start', type=parse_day, nargs='?')
+    export.add_argument('end', type=parse_day, nargs='?')
+    export.add_argument('--format', choices=('csv', 'json'), default='csv')
+    export.add_argument('-o', '--output')
+    export.set_defaults(func=cmd_export)
+
+    import_ = subparsers.add_parser(
+        'import', help="imports a tree of YYYYMMDD.txt and .csv files"
+    )
+    import_.add_argument('source')
+    import_.add_argument('--overwrite', action='store_true')
+    import_.add_argument('--workers', type=int, default=None)
+    import_.add_argument('--overlap', choices=OVERLAP_POLICIES, default=KEEP)
+    import_.set_defaults(func=cmd_import)
+
+    validate = subparsers.add_parser(
+        'validate', help="reports the invalid activities of a range"
+    )
+    validate.add_argument('start', type=parse_day, nargs='?')
+    validate.add_argument('end', type=parse_day, nargs='?')
+    validate.set_defaults(func=cmd_validate)
+
+    search = subparsers.add_parser(
+        'search', help="lists the days of the activities matching words"
+    )
+    search.add_argument('query', nargs='+')
+    search.add_argument('--start', type=parse_day)
+    search.add_argument('--end', type=parse_day)
+    search.set_defaults(func=cmd_search)
+
+    migrate = subparsers.add_parser(
+        'migrate', help="copies the stored days to another storage backend"
+    )
+    migrate.add_argument('target', choices=sorted(STORAGE_BACKENDS))
+    migrate.add_argument('--overwrite', action='store_true')
+    migrate.set_defaults(func=cmd_migrate)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    start, end = getattr(args, 'start', None), getattr(args, 'end', None)
+    if start is not None and end is not None and end < start:
+        parser.error(f"the end date {end} is before the start date {start}")
+    if args.backend is None:
+        args.backend = load_preferences(PREF_PATH).get('storage', 'csv')
+    store = DataStore(args.data_dir, args.backend)
+    try:
+        return args.func(args, store)
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,216 @@
+"""Aggregation of the time spent per category and per activity name across
+a range of days."""
+from datetime import timedelta
+
+from .categories import CategoryRegistry
+from .chronodex import Chronodex
+
+
+HOURS_PER_DAY = 24
+
+
+def category_aliases(categories):
+    """Returns a dictionary mapping each category name and alias to its
+    canonical category name.
+
+    Parameters
+    ----------
+    categories: list(dict) or serpentime.core.categories.CategoryRegistry
+        The categories as stored in the 'categories' key of preferences,
+        each of type {'name': 'work', 'aliases': ['job', 'office'], ...},
+        or their compiled registry.
+    """
+    if not isinstance(categories, CategoryRegistry):
+        categories = CategoryRegistry(categories)
+    return categories.aliases
+
+
+def covered_hours(chronodex, mask=None):
+    """Returns the number of hours covered by at least one valid activity
+    of the given Chronodex, counting overlapping activities once.
+    """
+    if mask is None:
+        mask, _ = chronodex.validate()
+    intervals = sorted(
+        (start, end)
+        for start, end, valid in zip(chronodex.starts, chronodex.ends, mask)
+        if valid and end > start
+    )
+    covered = 0
+    current_start, current_end = (None, None)
+    for start, end in intervals:
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                covered += current_end - current_start
+            current_start, current_end = (start, end)
+        elif end > current_end:
+            current_end = end
+    if current_end is not None:
+        covered += current_end - current_start
+    return covered
+
+
+def day_totals(chronodex, aliases=None):
+    """Returns the hours spent per category and per name in one day.
+
+    Parameters
+    ----------
+    chronodex: serpentime.core.Chronodex
+        The activities of the day. Only valid activities are counted.
+    aliases: dict or None
+        A mapping of category aliases to canonical names, as returned by
+        :func:`category_aliases`.
+
+    Returns
+    -------
+    categories: dict
+        Hours per canonical category name.
+    names: dict
+        Hours per activity name.
+    """
+    mask, _ = chronodex.validate()
+    # Sums over the interned indexes, then maps indexes to strings once
+    category_hours = [0.0] * len(chronodex._categories.values)
+    name_hours = [0.0] * len(chronodex._names.values)
+    columns = zip(
+        chronodex.starts, chronodex.ends, chronodex._category,
+        chronodex._name, mask,
+    )
+    for start, end, category, name, valid in columns:
+        if valid and end > start:
+            category_hours[category] += end - start
+            name_hours[name] += end - start
+    aliases = aliases or {}
+    categories = {}
+    for category, hours in zip(chronodex._categories.values, category_hours):
+        if hours:
+            category = aliases.get(category, category)
+            categories[category] = categories.get(category, 0) + hours
+    names = {
+        name: hours
+        for name, hours in zip(chronodex._names.values, name_hours)
+        if hours
+    }
+    return categories, names
+
+
+class RangeSummary(object):
+    """The time spent per category and per name over a range of days."""
+
+    def __init__(self, start, end):
+        """Creates an empty summary of the days from start to end, both
+        included.
+
+        Parameters
+        ----------
+        start, end: datetime.date
+            The bounds of the range of days.
+        """
+        self.start = start
+        self.end = end
+        # Hours per canonical category and per activity name over the range
+        self.category_totals = {}
+        self.name_totals = {}
+        # {datetime.date: {category: hours}} for the days with data
+        self.daily = {}
+        # {datetime.date: hours covered by activities}
+        self.daily_covered = {}
+
+    @property
+    def n_days(self):
+        """The number of days in the range."""
+        return (self.end - self.start).days + 1
+
+    @property
+    def total_hours(self):
+        """The hours spent in all activities, overlaps counted twice."""
+        return sum(self.category_totals.values())
+
+    @property
+    def coverage(self):
+        """The ratio of the hours of the range covered by activities, 0 for
+        an empty range.
+        """
+        if self.n_days <= 0:
+            return 0.0
+        return sum(self.daily_covered.values()) / (
+            HOURS_PER_DAY * self.n_days
+        )
+
+    def daily_coverage(self):
+        """Returns {datetime.date: ratio of the day covered by activities}
+        for every day of the range.
+        """
+        return {
+            day: self.daily_covered.get(day, 0) / HOURS_PER_DAY
+            for day in self.days()
+        }
+
+    def daily_series(self, category):
+        """Returns the list of the hours spent in the given category, for
+        every day of the range.
+        """
+        return [
+            self.daily.get(day, {}).get(category, 0) for day in self.days()
+        ]
+
+    def days(self):
+        """Returns the list of all the days of the range."""
+        return [
+            self.start + timedelta(days=ind) for ind in range(self.n_days)
+        ]
+
+    def add_day(self, day, chronodex, aliases=None):
+        """Adds the activities of one day to the summary."""
+        categories, names = day_totals(chronodex, aliases)
+        self.daily[day] = categories
+        self.daily_covered[day] = covered_hours(chronodex)
+        for category, hours in categories.items():
+            self.category_totals[category] = (
+                self.category_totals.get(category, 0) + hours
+            )
+        for name, hours in names.items():
+            self.name_totals[name] = self.name_totals.get(name, 0) + hours
+
+
+def read_day(entry):
+    """Returns the Chronodex of a serpentime.core.data_index.FileEntry."""
+    if entry.format == 'csv':
+        return Chronodex.from_csv(entry.path)
+    return Chronodex.from_txt(entry.path)
+
+
+def summarize(storage, start, end, categories=None, journal=None):
+    """Aggregates the activities of the days from start to end.
+
+    Parameters
+    ----------
+    storage: serpentime.core.storage.Storage or str
+        The storage of the days, or a data directory of csv files.
+    start, end: datetime.date
+        The bounds of the range of days, both included.
+    categories: list(dict), CategoryRegistry or None
+        The categories of the preferences, or their compiled registry, used
+        to resolve aliases.
+    journal: serpentime.core.journal.EditJournal or None
+        The edit journal of the storage, whose edits not yet written to the
+        storage are applied to the days.
+
+    Returns
+    -------
+    summary: RangeSummary
+        The aggregated hours of the range.
+    """
+    from .storage import CsvStorage
+
+    if isinstance(storage, str):
+        storage = CsvStorage(storage)
+    if journal is not None:
+        days = journal.iter_range(storage, start, end)
+    else:
+        days = storage.iter_range(start, end)
+    aliases = category_aliases(categories or [])
+    summary = RangeSummary(start, end)
+    for day, chronodex in days:
+        summary.add_day(day, chronodex, aliases)
+    return summary
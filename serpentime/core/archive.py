@@ -0,0 +1,345 @@
+"""A binary, memory-mapped archive holding the chronodexes of one year.
+
+The archive file is laid out as follows, all integers being little-endian:
+
+- a 16 bytes header: magic ``b'SRPT'``, format version (uint16), year
+  (uint16) and the number of compactions of the file (uint64),
+- a day index of 366 entries of 16 bytes, one per day of the year: offset of
+  the day block in the file (uint64), number of activities (uint32) and 4
+  reserved bytes. An offset of 0 means the day is not in the archive,
+- the day blocks, each aligned on 8 bytes. A day block holds the columns of
+  a Chronodex: starts, ends and weights as float64, category and name
+  indexes as uint32, followed by the category and name string tables. A
+  string table is a uint32 count followed, for each string, by its uint32
+  byte length and its utf-8 bytes.
+
+Writing a day appends a new block and updates its index entry in place, so
+that saving one day does not rewrite the whole year. The block is synced to
+disk before the entry points to it, and the entry is synced in turn, so that
+a crash leaves each day with either its previous or its new content.
+:meth:`Archive.compact` atomically replaces the file by a copy without the
+blocks no longer referenced by the index.
+"""
+from array import array
+from datetime import date
+import mmap
+import os
+import struct
+import sys
+
+from .chronodex import Chronodex, _StringPool
+from .files import atomic_write
+
+
+MAGIC = b'SRPT'
+VERSION = 1
+HEADER = struct.Struct('<4sHHQ')
+INDEX_ENTRY = struct.Struct('<QI4x')
+DAYS_PER_YEAR = 366
+DATA_OFFSET = HEADER.size + DAYS_PER_YEAR * INDEX_ENTRY.size
+UINT32 = struct.Struct('<I')
+ALIGNMENT = 8
+
+
+def archive_path(directory, year):
+    """Returns the path of the archive file of the given year in
+    the given directory.
+    """
+    return os.path.join(directory, f'{year}.dex')
+
+
+def _day_index(day):
+    return day.timetuple().tm_yday - 1
+
+
+def _native(values):
+    """Converts an array read from or written to the archive between
+    little-endian and the machine byte order.
+    """
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values
+
+
+def _pack_strings(pool):
+    chunks = [UINT32.pack(len(pool.values))]
+    for value in pool.values:
+        encoded = str(value).encode('utf-8')
+        chunks.append(UINT32.pack(len(encoded)))
+        chunks.append(encoded)
+    return b''.join(chunks)
+
+
+def _unpack_strings(buffer, offset):
+    pool = _StringPool()
+    count, = UINT32.unpack_from(buffer, offset)
+    offset += UINT32.size
+    for _ in range(count):
+        length, = UINT32.unpack_from(buffer, offset)
+        offset += UINT32.size
+        pool.intern(str(buffer[offset:offset + length], 'utf-8'))
+        offset += length
+    return pool, offset
+
+
+def _skip_strings(buffer, offset):
+    """Returns the offset following the string table at offset."""
+    count, = UINT32.unpack_from(buffer, offset)
+    offset += UINT32.size
+    for _ in range(count):
+        length, = UINT32.unpack_from(buffer, offset)
+        offset += UINT32.size + length
+    return offset
+
+
+def pack_day(chronodex):
+    """Returns the bytes of the day block holding the given Chronodex."""
+    chunks = []
+    for column in (chronodex._start, chronodex._end, chronodex._weight):
+        chunks.append(_native(array('d', column)).tobytes())
+    for column in (chronodex._category, chronodex._name):
+        chunks.append(_native(array('I', column)).tobytes())
+    chunks.append(_pack_strings(chronodex._categories))
+    chunks.append(_pack_strings(chronodex._names))
+    return b''.join(chunks)
+
+
+def unpack_day(buffer, offset, count):
+    """Returns the Chronodex held in the day block of count activities
+    starting at offset in buffer.
+    """
+    dex = Chronodex()
+    for column in (dex._start, dex._end, dex._weight):
+        column.frombytes(buffer[offset:offset + 8 * count])
+        _native(column)
+        offset += 8 * count
+    for column in (dex._category, dex._name):
+        indexes = array('I')
+        indexes.frombytes(buffer[offset:offset + 4 * count])
+        column.fromlist(_native(indexes).tolist())
+        offset += 4 * count
+    dex._categories, offset = _unpack_strings(buffer, offset)
+    dex._names, offset = _unpack_strings(buffer, offset)
+    return dex
+
+
+class Archive(object):
+    """Gives access to the chronodexes stored in one year archive file."""
+
+    def __init__(self, path, year=None):
+        """Opens the archive file at the given path, creating it if it does
+        not exist.
+
+        Parameters
+        ----------
+        path: str
+            The full filename of the archive.
+        year: int or None
+            The year held by the archive. Required only when the file does
+            not exist yet.
+        """
+        self.path = path
+        if not os.path.exists(path):
+            if year is None:
+                raise ValueError(f"No archive at {path}, year is required")
+            with atomic_write(path, 'wb') as fid:
+                fid.write(HEADER.pack(MAGIC, VERSION, year, 0))
+                fid.write(bytes(DAYS_PER_YEAR * INDEX_ENTRY.size))
+        self._file = open(path, 'r+b')
+        self._map = None
+        self._remap()
+        magic, version, self.year, self.generation = HEADER.unpack_from(
+            self._map, 0
+        )
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a serpentime archive")
+        if year is not None and year != self.year:
+            self.close()
+            raise ValueError(f"{path} holds year {self.year}, not {year}")
+        # Size of the referenced day blocks
+        self._live_size = sum(
+            self._block_size(offset, count)
+            for offset, count in self._entries()
+        )
+
+    def _remap(self):
+        if self._map is not None:
+            self._map.close()
+        self._map = mmap.mmap(self._file.fileno(), 0)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Closes the archive file."""
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def _entry(self, day):
+        if day.year != self.year:
+            raise ValueError(f"{day} is not in archive year {self.year}")
+        position = HEADER.size + _day_index(day) * INDEX_ENTRY.size
+        return position, INDEX_ENTRY.unpack_from(self._map, position)
+
+    def _entries(self):
+        """Yields the (offset, count) index entries of the stored days."""
+        for ind in range(DAYS_PER_YEAR):
+            position = HEADER.size + ind * INDEX_ENTRY.size
+            offset, count = INDEX_ENTRY.unpack_from(self._map, position)
+            if offset != 0:
+                yield offset, count
+
+    def _block_size(self, offset, count):
+        """Returns the size of the day block of count activities starting
+        at offset, 0 for the offset of a missing day.
+        """
+        if offset == 0:
+            return 0
+        # Three float64 and two uint32 columns, then two string tables
+        end = _skip_strings(self._map, offset + 32 * count)
+        return _skip_strings(self._map, end) - offset
+
+    def __contains__(self, day):
+        return self._entry(day)[1][0] != 0
+
+    def days(self):
+        """Returns the sorted list of the days held in the archive."""
+        first = date(self.year, 1, 1).toordinal()
+        days = []
+        for ind in range(DAYS_PER_YEAR):
+            position = HEADER.size + ind * INDEX_ENTRY.size
+            offset, _ = INDEX_ENTRY.unpack_from(self._map, position)
+            if offset != 0:
+                days.append(date.fromordinal(first + ind))
+        return days
+
+    def stamp(self, day):
+        """Returns a value changing whenever the given day is stored, or
+        None if the day is not in the archive.
+        """
+        _, (offset, count) = self._entry(day)
+        if offset == 0:
+            return None
+        return (self.generation, offset, count)
+
+    def garbage_size(self):
+        """Returns the size of the day blocks no longer referenced by the
+        index, which :meth:`compact` drops.
+        """
+        size = os.fstat(self._file.fileno()).st_size
+        return size - DATA_OFFSET - self._live_size
+
+    def live_size(self):
+        """Returns the size of the day blocks referenced by the index."""
+        return self._live_size
+
+    def columns(self, day):
+        """Returns zero-copy views on the numeric columns of a day.
+
+        Parameters
+        ----------
+        day: datetime.date
+            The day to look up.
+
+        Returns
+        -------
+        columns: tuple(memoryview) or None
+            Read-only views on the starts, ends and weights of the day,
+            or None if the day is not in the archive. The views must be
+            released before the archive is written to or closed, and are
+            only meaningful on little-endian machines.
+        """
+        _, (offset, count) = self._entry(day)
+        if offset == 0:
+            return None
+        view = memoryview(self._map).toreadonly()
+        size = 8 * count
+        return tuple(
+            view[start:start + size].cast('d')
+            for start in range(offset, offset + 3 * size, size)
+        )
+
+    def get(self, day):
+        """Returns the Chronodex of the given day, or None if the day is
+        not in the archive.
+        """
+        _, (offset, count) = self._entry(day)
+        if offset == 0:
+            return None
+        return unpack_day(self._map, offset, count)
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def put(self, day, chronodex):
+        """Stores the Chronodex of the given day, replacing the previous
+        one if any.
+        """
+        self.put_many([(day, chronodex)])
+
+    def put_many(self, items):
+        """Stores the Chronodex of each (day, Chronodex) pair, replacing
+        the previous ones if any, with two syncs for all the days.
+        """
+        # The last Chronodex of a day given twice wins
+        items = dict(items)
+        if not items:
+            return
+        self._file.seek(0, os.SEEK_END)
+        offset = self._file.tell()
+        entries = []
+        for day, chronodex in items.items():
+            position, old_entry = self._entry(day)
+            block = pack_day(chronodex)
+            padding = -offset % ALIGNMENT
+            self._file.write(bytes(padding) + block)
+            entries.append((position, offset + padding, len(chronodex)))
+            self._live_size += len(block) - self._block_size(*old_entry)
+            offset += padding + len(block)
+        # The blocks are on disk before any entry points to them
+        self._sync()
+        for position, block_offset, count in entries:
+            self._file.seek(position)
+            self._file.write(INDEX_ENTRY.pack(block_offset, count))
+        self._sync()
+        self._remap()
+
+    def delete(self, day):
+        """Removes the given day from the archive."""
+        position, old_entry = self._entry(day)
+        self._live_size -= self._block_size(*old_entry)
+        self._file.seek(position)
+        self._file.write(INDEX_ENTRY.pack(0, 0))
+        self._sync()
+
+    def compact(self):
+        """Replaces the archive file by a copy without the unreferenced
+        day blocks. The stamps of all the days change.
+        """
+        days = {day: self.get(day) for day in self.days()}
+        generation = self.generation + 1
+        with atomic_write(self.path, 'wb') as fid:
+            fid.write(HEADER.pack(MAGIC, VERSION, self.year, generation))
+            fid.write(bytes(DAYS_PER_YEAR * INDEX_ENTRY.size))
+            for day, dex in days.items():
+                offset = fid.tell()
+                padding = -offset % ALIGNMENT
+                fid.write(bytes(padding) + pack_day(dex))
+                fid.seek(HEADER.size + _day_index(day) * INDEX_ENTRY.size)
+                fid.write(INDEX_ENTRY.pack(offset + padding, len(dex)))
+                fid.seek(0, os.SEEK_END)
+        self.close()
+        self.generation = generation
+        self._file = open(self.path, 'r+b')
+        self._remap()
+        self._live_size = sum(
+            self._block_size(offset, count)
+            for offset, count in self._entries()
+        )
@@ -0,0 +1,95 @@
+"""Debounced saving of chronodexes on a background thread."""
+import logging
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+# Default time to wait after the last edit before saving, in seconds
+DEFAULT_DELAY = 1.0
+
+
+class DebouncedTrigger(object):
+    """Runs an action on a background thread once triggers settle.
+
+    Each call to :meth:`trigger` postpones the action until no other
+    trigger happened for the debounce delay, so that a burst of triggers
+    runs the action once.
+    """
+
+    def __init__(self, action, delay=DEFAULT_DELAY):
+        """Starts the background thread.
+
+        Parameters
+        ----------
+        action: callable
+            A function without arguments, called from the background
+            thread.
+        delay: float
+            The debounce delay, in seconds.
+        """
+        self.action = action
+        self.delay = delay
+        # Time at which the action is due, None if it is not triggered
+        self._deadline = None
+        self._running = False
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(
+            target=self._run, name='serpentime-saver', daemon=True
+        )
+        self._thread.start()
+
+    def trigger(self):
+        """Schedules the action after the debounce delay."""
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("The trigger is closed")
+            self._deadline = time.monotonic() + self.delay
+            self._condition.notify_all()
+
+    def flush(self):
+        """Runs the triggered action now, and waits until it is done."""
+        with self._condition:
+            if self._deadline is not None:
+                self._deadline = 0
+            self._condition.notify_all()
+            while self._deadline is not None or self._running:
+                self._condition.wait()
+
+    def close(self):
+        """Flushes the triggered action and stops the background thread."""
+        self.flush()
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+
+    def _run(self):
+        with self._condition:
+            while True:
+                if self._deadline is None:
+                    if self._closed:
+                        return
+                    self._condition.wait()
+                    continue
+                timeout = self._deadline - time.monotonic()
+                if timeout > 0:
+                    self._condition.wait(timeout)
+                    continue
+                self._deadline = None
+                self._running = True
+                self._condition.release()
+                try:
+                    self._call()
+                finally:
+                    self._condition.acquire()
+                    self._running = False
+                    self._condition.notify_all()
+
+    def _call(self):
+        try:
+            self.action()
+        except Exception:
+            logger.exception("Could not run %s", self.action)
@@ -0,0 +1,123 @@
+"""A compiled lookup table of the activity categories of the preferences."""
+from collections import namedtuple
+
+
+# Color of the activities whose category is unknown or has no color
+DEFAULT_COLOR = "#FFFFFF"
+
+Category = namedtuple('Category', ['name', 'color', 'weight', 'aliases'])
+
+
+def _parse_weight(value):
+    """Returns a weight of the preferences as a float, None if it is not
+    set or not a number.
+    """
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class CategoryRegistry(object):
+    """Resolves category names and aliases to their settings.
+
+    The registry is compiled from the 'categories' key of the preferences,
+    a list of dictionaries of type
+    {'name': 'work', 'color': '#32a84e', 'weight': '6', 'aliases': ['job']},
+    and only recompiled when they change, see :meth:`update`.
+    """
+
+    def __init__(self, categories=()):
+        """Compiles the given categories.
+
+        Parameters
+        ----------
+        categories: list(dict)
+            The categories as stored in the 'categories' key of preferences.
+        """
+        self._signature = None
+        self.categories = []
+        self.names = []
+        # {name or alias: canonical name}
+        self.aliases = {}
+        # {name or alias: Category}
+        self._lookup = {}
+        self.update(categories)
+
+    @staticmethod
+    def _signature_of(categories):
+        return tuple(
+            (cat.get('name'), cat.get('color'), cat.get('weight'),
+             tuple(cat.get('aliases', ())))
+            for cat in categories
+        )
+
+    def update(self, categories):
+        """Recompiles the registry if the given categories differ from the
+        compiled ones.
+
+        Returns
+        -------
+        changed: bool
+            Whether the registry was recompiled.
+        """
+        signature = self._signature_of(categories)
+        if signature == self._signature:
+            return False
+        self._signature = signature
+        self.categories = [
+            Category(
+                name, color or DEFAULT_COLOR, _parse_weight(weight), aliases
+            )
+            for name, color, weight, aliases in signature
+            if name is not None
+        ]
+        self.names = [cat.name for cat in self.categories]
+        self.aliases = {}
+        self._lookup = {}
+        # Names take precedence over aliases, and first aliases over later
+        # ones
+        for cat in self.categories:
+            self.aliases[cat.name] = cat.name
+            self._lookup[cat.name] = cat
+        for cat in self.categories:
+            for alias in cat.aliases:
+                if alias not in self.aliases:
+                    self.aliases[alias] = cat.name
+                    self._lookup[alias] = cat
+        self._compile()
+        return True
+
+    def _compile(self):
+        """Called once the categories are compiled, for subclasses to
+        derive their own lookup tables.
+        """
+
+    def __contains__(self, name):
+        return name in self._lookup
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+    def get(self, name):
+        """Returns the Category of the given name or alias, None if unknown.
+        """
+        return self._lookup.get(name)
+
+    def resolve(self, name):
+        """Returns the canonical name of the given category name or alias,
+        or name itself if it is unknown.
+        """
+        return self.aliases.get(name, name)
+
+    def weight(self, name, default=None):
+        """Returns the weight of the given category name or alias, or
+        default if it is unknown or has no weight.
+        """
+        cat = self._lookup.get(name)
+        if cat is None or cat.weight is None:
+            return default
+        return cat.weight
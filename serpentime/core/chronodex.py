@@ -1,5 +1,80 @@
+from array import array
+from collections.abc import MutableSequence
+from hashlib import blake2b
+from math import isnan
+import csv
+
+from .files import atomic_write
+from .intervals import IntervalIndex
+from .normalize import KEEP, normalize_rows
+from .parsers import ActivityRow, iter_csv_activities, iter_txt_activities
+from .timing import STATS
+
+
+# Value stored in the numeric columns when a start or end time is not set
+MISSING = float('nan')
+# Default value of optional arguments for which None is meaningful
+_UNSET = object()
+
+# Reason codes returned by Chronodex.validate, combined as bit flags
+VALID = 0
+# Start, end or weight is not a number
+BAD_TYPE = 1
+# Start or end is not in [0, 24], or weight is not in [0, 10]
+OUT_OF_RANGE = 2
+# End time is earlier than start time
+END_BEFORE_START = 4
+# The activity overlaps another one
+OVERLAP = 8
+# Reasons making an activity invalid. Other reasons are only warnings, the
+# activity being still drawn and saved.
+INVALID_REASONS = BAD_TYPE | OUT_OF_RANGE
+
+
+def _to_float(value):
+    """Returns value as a float if it is a number, MISSING otherwise."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return MISSING
+
+
+def _from_float(value):
+    """Returns None for MISSING values, the value itself otherwise."""
+    if isnan(value):
+        return None
+    return value
+
+
+class _StringPool(object):
+    """An interning table mapping strings to integer indexes."""
+
+    def __init__(self):
+        self.values = []
+        self.indexes = {}
+
+    def intern(self, value):
+        """Returns the index of the given value, adding it if needed."""
+        try:
+            return self.indexes[value]
+        except KeyError:
+            index = self.indexes[value] = len(self.values)
+            self.values.append(value)
+            return index
+
+    def __getitem__(self, index):
+        return self.values[index]
+
+
 class Activity(object):
-    """A class representing an activity during a day."""
+    """A class representing an activity during a day.
+
+    An Activity is a light view on one row of the columns held by a
+    Chronodex. An Activity created on its own is backed by a private
+    one-row Chronodex, and its values are copied when it is added to
+    another Chronodex.
+    """
+
+    __slots__ = ('_chronodex', '_row')
 
     def __init__(self, start=None, end=None, name='', category='', weight=5):
         """Initialises one activity of the day.
@@ -23,29 +98,174 @@ class Activity(object):
             A weight for the graphical representation of this activity.
             It should be between 0 and 10, otherwise the activity is invalid.
         """
-        self.start = start
-        self.end = end
-        self.name = name
-        self.category = category
-        self.weight = weight
+        self._chronodex = Chronodex()
+        self._row = 0
+        self._chronodex._append(start, end, name, category, weight)
+
+    @classmethod
+    def _view(cls, chronodex, row):
+        """Returns an Activity viewing the given row of a Chronodex."""
+        activity = cls.__new__(cls)
+        activity._chronodex = chronodex
+        activity._row = row
+        return activity
+
+    @property
+    def start(self):
+        return _from_float(self._chronodex._start[self._row])
+
+    @start.setter
+    def start(self, value):
+        self._chronodex._set_times(self._row, start=value)
+
+    @property
+    def end(self):
+        return _from_float(self._chronodex._end[self._row])
+
+    @end.setter
+    def end(self, value):
+        self._chronodex._set_times(self._row, end=value)
+
+    @property
+    def weight(self):
+        return self._chronodex._weight[self._row]
+
+    @weight.setter
+    def weight(self, value):
+        self._chronodex._weight[self._row] = _to_float(value)
+        # The weight is checked by validate, but not indexed
+        self._chronodex._validation = None
+
+    @property
+    def name(self):
+        return self._chronodex._names[self._chronodex._name[self._row]]
+
+    @name.setter
+    def name(self, value):
+        self._chronodex._name[self._row] = self._chronodex._names.intern(value)
+
+    @property
+    def category(self):
+        dex = self._chronodex
+        return dex._categories[dex._category[self._row]]
+
+    @category.setter
+    def category(self, value):
+        dex = self._chronodex
+        dex._category[self._row] = dex._categories.intern(value)
+
+    def copy(self):
+        """Returns a detached copy of this activity."""
+        return Activity(
+            start=self.start, end=self.end, name=self.name,
+            category=self.category, weight=self.weight,
+        )
 
     def is_valid(self):
         """Whether or not this activity has valid attribute values.
         """
-        if not isinstance(self.start, (int, float)):
-            return False
-        if not isinstance(self.end, (int, float)):
-            return False
-        checks = [
-            self.start >= 0, self.start <= 24,
-            self.end >= 0, self.end <= 24,
-            self.weight >= 0, self.weight <= 10,
-        ]
-        return all(checks)
+        dex, row = (self._chronodex, self._row)
+        start, end, weight = (dex._start[row], dex._end[row], dex._weight[row])
+        # Comparisons involving MISSING (nan) are always False
+        return (
+            0 <= start <= 24 and 0 <= end <= 24 and 0 <= weight <= 10
+        )
+
+    def __repr__(self):
+        return (
+            f"Activity(start={self.start!r}, end={self.end!r}, "
+            f"name={self.name!r}, category={self.category!r}, "
+            f"weight={self.weight!r})"
+        )
+
+
+class ActivityList(MutableSequence):
+    """A list-like view on the activities of a Chronodex.
+
+    Items are Activity views on the rows of the Chronodex: they follow
+    the row they were fetched from, so they should not be kept across
+    insertions or removals.
+    """
+
+    def __init__(self, chronodex):
+        self._chronodex = chronodex
+
+    def __len__(self):
+        return len(self._chronodex._start)
+
+    def _check_index(self, index):
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("activity index out of range")
+        return index
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [
+                Activity._view(self._chronodex, row)
+                for row in range(*index.indices(len(self)))
+            ]
+        return Activity._view(self._chronodex, self._check_index(index))
+
+    def __setitem__(self, index, activity):
+        if isinstance(index, slice):
+            raise TypeError("slice assignment is not supported")
+        row = self._check_index(index)
+        view = Activity._view(self._chronodex, row)
+        view.start = activity.start
+        view.end = activity.end
+        view.name = activity.name
+        view.category = activity.category
+        view.weight = activity.weight
+
+    def __delitem__(self, index):
+        if isinstance(index, slice):
+            rows = range(*index.indices(len(self)))
+            if rows.step == 1:
+                self._chronodex._delete_range(rows.start, rows.stop)
+                return
+            for row in sorted(rows, reverse=True):
+                self._chronodex._delete(row)
+        else:
+            self._chronodex._delete(self._check_index(index))
+
+    def insert(self, index, activity):
+        length = len(self)
+        if index < 0:
+            index = max(0, index + length)
+        index = min(index, length)
+        self._chronodex._insert(
+            index, activity.start, activity.end, activity.name,
+            activity.category, activity.weight,
+        )
+
+    def pop(self, index=-1):
+        row = self._check_index(index)
+        activity = Activity._view(self._chronodex, row).copy()
+        self._chronodex._delete(row)
+        return activity
+
+    def clear(self):
+        self._chronodex._clear()
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield Activity._view(self._chronodex, row)
+
+    def __repr__(self):
+        return repr(list(self))
 
 
 class Chronodex(object):
-    """Represents a list of activities for one day."""
+    """Represents a list of activities for one day.
+
+    Activities are stored column-wise: start, end and weight are held in
+    arrays of doubles, while category and name are held as indexes into
+    interned string tables. :attr:`activities` gives a list-like access to
+    the rows as Activity views.
+    """
 
     def __init__(self, activities=None):
         """Represents a list of activities for one day.
@@ -55,9 +275,320 @@ class Chronodex(object):
         activities: list(serpentime.core.Activity)
             The list of activity composing this Chronodex.
         """
-        self.activities = activities or []
+        self._start = array('d')
+        self._end = array('d')
+        self._weight = array('d')
+        self._category = array('l')
+        self._name = array('l')
+        self._categories = _StringPool()
+        self._names = _StringPool()
+        self._validation = None
+        self._intervals = None
+        if activities:
+            self.activities.extend(activities)
+
+    @property
+    def activities(self):
+        return ActivityList(self)
+
+    @activities.setter
+    def activities(self, value):
+        value = [activity.copy() for activity in value]
+        self._clear()
+        self.activities.extend(value)
+
+    @property
+    def starts(self):
+        """The array of start times, nan where the start is not set."""
+        return self._start
+
+    @property
+    def ends(self):
+        """The array of end times, nan where the end is not set."""
+        return self._end
+
+    @property
+    def weights(self):
+        """The array of activity weights."""
+        return self._weight
+
+    @property
+    def categories(self):
+        """The list of the category of each activity."""
+        values = self._categories.values
+        return [values[ind] for ind in self._category]
+
+    @property
+    def names(self):
+        """The list of the name of each activity."""
+        values = self._names.values
+        return [values[ind] for ind in self._name]
+
+    def getter(self, field):
+        """Returns a function taking a row and returning the value of the
+        given Activity field at that row, as the Activity property would,
+        without creating an Activity view.
+
+        Parameters
+        ----------
+        field: str
+            One of 'start', 'end', 'weight', 'name' or 'category'.
+        """
+        if field in ('start', 'end'):
+            column = self._start if field == 'start' else self._end
+            return lambda row: _from_float(column[row])
+        if field == 'weight':
+            return self._weight.__getitem__
+        if field in ('name', 'category'):
+            if field == 'name':
+                indexes, values = self._name, self._names.values
+            else:
+                indexes, values = self._category, self._categories.values
+            return lambda row: values[indexes[row]]
+        raise ValueError("Unknown activity field {!r}".format(field))
+
+    def __len__(self):
+        return len(self._start)
+
+    def copy(self):
+        """Returns an independent copy of this Chronodex."""
+        dex = Chronodex()
+        for source, target in zip(self._columns(), dex._columns()):
+            target.extend(source)
+        for source, target in [(self._categories, dex._categories),
+                               (self._names, dex._names)]:
+            target.values = list(source.values)
+            target.indexes = dict(source.indexes)
+        return dex
+
+    def content_hash(self):
+        """Returns a digest of the activities, equal for two Chronodex
+        holding the same activities in the same order.
+        """
+        digest = blake2b(digest_size=16)
+        for column in (self._start, self._end, self._weight):
+            digest.update(column.tobytes())
+        for values in (self.categories, self.names):
+            digest.update('\x1f'.join(map(str, values)).encode())
+            digest.update(b'\x1e')
+        return digest.hexdigest()
+
+    def rows(self):
+        """Returns the list of the ActivityRow of each activity."""
+        return [
+            ActivityRow(
+                _from_float(start), _from_float(end), name, category, weight
+            )
+            for start, end, name, category, weight in zip(
+                self._start, self._end, self.names, self.categories,
+                self._weight,
+            )
+        ]
+
+    def valid(self):
+        """Returns a new Chronodex holding only the valid activities, as
+        given by :meth:`validate`.
+        """
+        mask, _ = self.validate()
+        dex = Chronodex()
+        for row, valid in zip(self.rows(), mask):
+            if valid:
+                dex._append(*row)
+        return dex
+
+    def normalize(self, overlap=KEEP, fill_gaps=False, merge=True):
+        """Returns a normalized copy of this Chronodex, sorted by start
+        time, see serpentime.core.normalize.normalize_rows.
+
+        Activities that cannot be placed in time, because they are invalid
+        or end before they start, are kept unchanged after the others.
+
+        Parameters
+        ----------
+        overlap: str
+            How overlapping activities are resolved: 'keep' leaves them,
+            'split' cuts the earlier activity around the later one, 'trim'
+            starts the later activity where the earlier one ends.
+        fill_gaps: bool
+            Whether activities are extended up to the start of the next
+            one.
+        merge: bool
+            Whether contiguous activities with the same name and category
+            are merged.
+        """
+        mask, reasons = self.validate()
+        placed, others = ([], [])
+        for row, valid, reason in zip(self.rows(), mask, reasons):
+            if valid and not reason & END_BEFORE_START:
+                placed.append(row)
+            else:
+                others.append(row)
+        dex = Chronodex()
+        rows = normalize_rows(
+            placed, overlap=overlap, fill_gaps=fill_gaps, merge=merge
+        )
+        for row in rows + others:
+            dex._append(*row)
+        return dex
+
+    def total_duration(self):
+        """Returns the total duration of the valid activities, in hours."""
+        return sum(
+            end - start
+            for start, end in zip(self._start, self._end)
+            if start <= end
+        )
+
+    def validate(self):
+        """Checks all the activities in one pass.
+
+        The result is cached until the activities are modified, so it can
+        be called on every redraw or save at no cost.
+
+        Returns
+        -------
+        mask: list(bool)
+            For each activity, whether it is valid, i.e. has none of the
+            reasons in INVALID_REASONS.
+        reasons: array('B')
+            For each activity, the combination of the reason codes
+            BAD_TYPE, OUT_OF_RANGE, END_BEFORE_START and OVERLAP found for
+            it, VALID if none.
+        """
+        if self._validation is None:
+            self._validation = self._validate()
+        return self._validation
+
+    def _validate(self):
+        reasons = array('B', bytes(len(self)))
+        intervals = []
+        rows = zip(self._start, self._end, self._weight)
+        for row, (start, end, weight) in enumerate(rows):
+            if isnan(start) or isnan(end) or isnan(weight):
+                reasons[row] = BAD_TYPE
+                continue
+            if not (0 <= start <= 24 and 0 <= end <= 24
+                    and 0 <= weight <= 10):
+                reasons[row] |= OUT_OF_RANGE
+            if end < start:
+                reasons[row] |= END_BEFORE_START
+            else:
+                intervals.append((start, end, row))
+        # Sweeps the intervals by start time, tracking the furthest end
+        intervals.sort()
+        last_end, last_row = (None, None)
+        for start, end, row in intervals:
+            if last_end is not None and start < last_end:
+                reasons[row] |= OVERLAP
+                reasons[last_row] |= OVERLAP
+            if last_end is None or end > last_end:
+                last_end, last_row = (end, row)
+        mask = [not reason & INVALID_REASONS for reason in reasons]
+        return mask, reasons
+
+    @property
+    def intervals(self):
+        """The IntervalIndex of the activities, built on first access and
+        then updated as activities are edited, inserted or removed.
+        """
+        if self._intervals is None:
+            self._intervals = IntervalIndex(self._start, self._end)
+        return self._intervals
+
+    def activity_at(self, time):
+        """Returns the first activity taking place at the given time,
+        start included and end excluded, or None.
+        """
+        rows = self.intervals.at(time)
+        return Activity._view(self, rows[0]) if rows else None
+
+    def overlapping(self, start, end):
+        """Returns the list of the activities overlapping the time window
+        from start to end, in row order.
+        """
+        return [
+            Activity._view(self, row)
+            for row in self.intervals.overlapping(start, end)
+        ]
+
+    def gaps(self, start=0, end=24):
+        """Returns the list of the (start, end) time windows between start
+        and end during which no activity takes place.
+        """
+        return self.intervals.gaps(start, end)
+
+    def _changed(self):
+        """Drops the cached data derived from the activities."""
+        self._validation = None
+        self._intervals = None
+
+    def _set_times(self, row, start=_UNSET, end=_UNSET):
+        """Sets the start or end of the given row, updating the interval
+        index.
+        """
+        old_start, old_end = (self._start[row], self._end[row])
+        if start is not _UNSET:
+            self._start[row] = _to_float(start)
+        if end is not _UNSET:
+            self._end[row] = _to_float(end)
+        self._validation = None
+        if self._intervals is not None:
+            self._intervals.discard(row, old_start, old_end)
+            self._intervals.add(row, self._start[row], self._end[row])
+
+    def _append(self, start, end, name, category, weight):
+        self._start.append(_to_float(start))
+        self._end.append(_to_float(end))
+        self._weight.append(_to_float(weight))
+        self._category.append(self._categories.intern(category))
+        self._name.append(self._names.intern(name))
+        self._validation = None
+        if self._intervals is not None:
+            self._intervals.add(len(self) - 1, self._start[-1], self._end[-1])
+
+    def _insert(self, row, start, end, name, category, weight):
+        self._start.insert(row, _to_float(start))
+        self._end.insert(row, _to_float(end))
+        self._weight.insert(row, _to_float(weight))
+        self._category.insert(row, self._categories.intern(category))
+        self._name.insert(row, self._names.intern(name))
+        self._validation = None
+        if self._intervals is not None:
+            self._intervals.shift(row, 1)
+            self._intervals.add(row, self._start[row], self._end[row])
+
+    def _delete(self, row):
+        if self._intervals is not None:
+            self._intervals.discard(row, self._start[row], self._end[row])
+            self._intervals.shift(row + 1, -1)
+        for column in self._columns():
+            del column[row]
+        self._validation = None
+
+    def _delete_range(self, first, stop):
+        """Deletes the rows from first to stop, stop excluded."""
+        if stop - first == 1:
+            self._delete(first)
+            return
+        if stop <= first:
+            return
+        for column in self._columns():
+            del column[first:stop]
+        # Rebuilding the interval index when next queried is cheaper than
+        # shifting it for each removed row
+        self._changed()
+
+    def _clear(self):
+        for column in self._columns():
+            del column[:]
+        self._changed()
+
+    def _columns(self):
+        return (self._start, self._end, self._weight,
+                self._category, self._name)
 
     @classmethod
+    @STATS.timed('from_txt')
     def from_txt(cls, path):
         """Returns a Chronodex instance from a txt file.
 
@@ -67,42 +598,22 @@ class Chronodex(object):
 
         Parameters
         ----------
-        path: str
-            The full filename to use to create the Chronodex instance.
+        path: str, file object or bytes
+            The full filename to use to create the Chronodex instance, or
+            an open file or raw content, see
+            serpentime.core.parsers.iter_txt_activities.
 
         Returns
         -------
         The Chronodex instance corresponding to the given path.
         """
-        activities = []
-        with open(path, 'r') as fid:
-            for line in fid:
-                params = [elt.strip() for elt in line.split(',')]
-                if any([param != '' for param in params[1:]]):
-                    if params[0].isnumeric():
-                        weight = params[2]
-                        if weight.isnumeric():
-                            weight = int(weight)
-                        else:
-                            weight = 10
-                        activities.append(
-                            Activity(
-                                start=int(params[0]),
-                                end=None,
-                                category=params[1],
-                                name=params[3],
-                                weight=weight,
-                            )
-                        )
-        # Fills the end time of the activities
-        if len(activities) > 1:
-            for ind, activity in enumerate(activities[1:]):
-                activities[ind].end = activity.start
-        activities[-1].end = 24
-
-        return cls(activities)
+        dex = cls()
+        for row in iter_txt_activities(path):
+            dex._append(*row)
+        return dex
 
     @classmethod
+    @STATS.timed('from_csv')
     def from_csv(cls, path):
         """Returns a Chronodex instance from a csv file.
 
@@ -112,26 +623,77 @@ class Chronodex(object):
 
         Parameters
         ----------
-        path: str
-            The full filename to use to create the Chronodex instance.
+        path: str, file object or bytes
+            The full filename to use to create the Chronodex instance, or
+            an open file or raw content, see
+            serpentime.core.parsers.iter_csv_activities.
 
         Returns
         -------
         The Chronodex instance corresponding to the given path.
         """
-        activities = []
-        with open(path, 'r') as fid:
-            for line in fid:
-                params = [elt.strip() for elt in line.split(',')]
-                if len(params) == 5:
-                    activities.append(
-                        Activity(
-                            start=float(params[0]),
-                            end=float(params[1]),
-                            category=params[2],
-                            name=params[3],
-                            weight=float(params[4]),
-                        )
-                    )
-
-        return cls(activities)
+        dex = cls()
+        for row in iter_csv_activities(path):
+            dex._append(*row)
+        return dex
+
+    @classmethod
+    def from_archive(cls, path, day):
+        """Returns a Chronodex instance from a year archive file.
+
+        Parameters
+        ----------
+        path: str
+            The full filename of the archive, see serpentime.core.archive.
+        day: datetime.date
+            The day of the Chronodex to load.
+
+        Returns
+        -------
+        The Chronodex instance stored for the given day, or an empty one if
+        the day is not in the archive.
+        """
+        from .archive import Archive
+
+        with Archive(path) as archive:
+            dex = archive.get(day)
+        return dex if dex is not None else cls()
+
+    def to_archive(self, path, day):
+        """Stores this Chronodex in a year archive file, creating the file
+        if it does not exist.
+
+        Parameters
+        ----------
+        path: str
+            The full filename of the archive, see serpentime.core.archive.
+        day: datetime.date
+            The day this Chronodex corresponds to.
+        """
+        from .archive import Archive
+
+        with Archive(path, year=day.year) as archive:
+            archive.put(day, self)
+
+    def to_csv(self, path):
+        """Writes the valid activities of this Chronodex to a csv file, as
+        read by :meth:`from_csv`.
+
+        Parameters
+        ----------
+        path: str or file object
+            The full filename of the csv file, or a file object opened in
+            text mode. A file given by name is replaced atomically, see
+            serpentime.core.files.atomic_write.
+        """
+        if isinstance(path, str):
+            with atomic_write(path, 'w', newline='') as csvfile:
+                self.to_csv(csvfile)
+            return
+        writer = csv.writer(path, delimiter=',')
+        mask, _ = self.validate()
+        for row, valid in zip(self.rows(), mask):
+            if valid:
+                writer.writerow(
+                    [row.start, row.end, row.category, row.name, row.weight]
+                )
@@ -0,0 +1,221 @@
+"""A persisted index of the chronodex files of a data directory."""
+from bisect import bisect_left, bisect_right, insort
+from collections import namedtuple
+from datetime import date
+import json
+import os
+import threading
+
+from .files import atomic_write
+
+
+# Name of the file holding the persisted index, in the data directory
+INDEX_FILENAME = '.serpentime-index.json'
+# Formats of the indexed day files, by order of preference when a day
+# has several files
+FORMATS = ('csv', 'txt')
+
+FileEntry = namedtuple('FileEntry', ['path', 'format', 'mtime', 'size'])
+
+
+def parse_filename(filename):
+    """Returns the date and format of a day file named YYYYMMDD.csv or
+    YYYYMMDD.txt, or None if the filename does not match.
+    """
+    basename, _, extension = filename.rpartition('.')
+    if extension not in FORMATS or len(basename) != 8:
+        return None
+    try:
+        day = date(int(basename[:4]), int(basename[4:6]), int(basename[6:]))
+    except ValueError:
+        return None
+    return day, extension
+
+
+def day_filename(day, fmt='csv'):
+    """Returns the name of the file holding the given day in the given
+    format.
+    """
+    return day.isoformat().replace('-', '') + '.' + fmt
+
+
+class DataIndex(object):
+    """Maps days to the chronodex files of a data directory.
+
+    The index is persisted in the data directory. Rescanning stats the
+    files of the directory, without reading them, and persists the index
+    only if a file was added, removed or rewritten since the last scan.
+    The index can be used from several threads.
+    """
+
+    def __init__(self, directory):
+        """Loads the persisted index of the given directory and brings it
+        up to date.
+
+        Parameters
+        ----------
+        directory: str
+            The data directory holding YYYYMMDD.csv and YYYYMMDD.txt files.
+        """
+        self.directory = directory
+        self.path = os.path.join(directory, INDEX_FILENAME)
+        # {datetime.date: {format: FileEntry}}
+        self._files = {}
+        # Sorted list of the indexed days, for range queries
+        self._days = []
+        # Guards the index, updated by the thread saving the days while
+        # others read it
+        self._lock = threading.Lock()
+        # Serializes the saves, so that an older state of the index is not
+        # written over a newer one. Readers do not wait for the disk.
+        self._save_lock = threading.Lock()
+        self.load()
+        self.scan()
+
+    def load(self):
+        """Loads the persisted index, if any."""
+        try:
+            with open(self.path, 'r') as fi:
+                content = json.load(fi)
+        except (OSError, ValueError):
+            return
+        with self._lock:
+            for filename, (mtime, size) in content.get('files', {}).items():
+                parsed = parse_filename(filename)
+                if parsed is not None:
+                    self._add(filename, parsed, mtime, size)
+
+    def save(self):
+        """Persists the index in the data directory."""
+        with self._save_lock:
+            with self._lock:
+                files = {
+                    os.path.basename(entry.path): [entry.mtime, entry.size]
+                    for entries in self._files.values()
+                    for entry in entries.values()
+                }
+            with atomic_write(self.path, 'w') as fi:
+                json.dump({'files': files}, fi)
+
+    def scan(self):
+        """Updates the index with the changes of the data directory since
+        the last scan, and persists it if any. Files rewritten in place are
+        detected by their mtime and size.
+        """
+        with self._lock:
+            seen = set()
+            changed = False
+            with os.scandir(self.directory) as entries:
+                for dir_entry in entries:
+                    parsed = parse_filename(dir_entry.name)
+                    if parsed is None:
+                        continue
+                    seen.add(parsed)
+                    stat = dir_entry.stat()
+                    known = self._files.get(parsed[0], {}).get(parsed[1])
+                    if (known is None or known.mtime != stat.st_mtime_ns
+                            or known.size != stat.st_size):
+                        self._add(
+                            dir_entry.name, parsed, stat.st_mtime_ns,
+                            stat.st_size,
+                        )
+                        changed = True
+            for day, entries in list(self._files.items()):
+                for fmt in list(entries):
+                    if (day, fmt) not in seen:
+                        self._remove(day, fmt)
+                        changed = True
+        if changed:
+            self.save()
+
+    def _add(self, filename, parsed, mtime, size):
+        day, fmt = parsed
+        if day not in self._files:
+            self._files[day] = {}
+            insort(self._days, day)
+        self._files[day][fmt] = FileEntry(
+            os.path.join(self.directory, filename), fmt, mtime, size
+        )
+
+    def _remove(self, day, fmt):
+        entries = self._files.get(day, {})
+        entries.pop(fmt, None)
+        if not entries and day in self._files:
+            del self._files[day]
+            del self._days[bisect_left(self._days, day)]
+
+    def update(self, day, fmt='csv'):
+        """Records the current state of the file of the given day and
+        format, after it has been written.
+        """
+        self.update_many([day], fmt)
+
+    def update_many(self, days, fmt='csv'):
+        """Records the current state of the files of the given days and
+        format, after they have been written, persisting the index once.
+        """
+        for day in days:
+            filename = day_filename(day, fmt)
+            stat = os.stat(os.path.join(self.directory, filename))
+            with self._lock:
+                self._add(
+                    filename, (day, fmt), stat.st_mtime_ns, stat.st_size
+                )
+        self.save()
+
+    def discard(self, day):
+        """Forgets all the files of the given day, after they have been
+        deleted.
+        """
+        with self._lock:
+            for fmt in FORMATS:
+                self._remove(day, fmt)
+        self.save()
+
+    def __contains__(self, day):
+        with self._lock:
+            return day in self._files
+
+    def __len__(self):
+        with self._lock:
+            return len(self._days)
+
+    def get(self, day):
+        """Returns the FileEntry of the preferred format for the given
+        day, or None if the day has no file.
+        """
+        with self._lock:
+            entries = self._files.get(day)
+            if entries:
+                for fmt in FORMATS:
+                    if fmt in entries:
+                        return entries[fmt]
+            return None
+
+    def stamp(self, day):
+        """Returns the (mtime, size) of the file of the preferred format
+        for the given day, or None if the day has no file.
+        """
+        entry = self.get(day)
+        if entry is None:
+            return None
+        return (entry.mtime, entry.size)
+
+    def entries(self, day):
+        """Returns the list of the FileEntry of all the files of the
+        given day.
+        """
+        with self._lock:
+            return list(self._files.get(day, {}).values())
+
+    def days(self, start=None, end=None):
+        """Returns the sorted list of the indexed days between start and
+        end, both included. A None bound is unbounded.
+        """
+        with self._lock:
+            lower = 0 if start is None else bisect_left(self._days, start)
+            if end is None:
+                upper = len(self._days)
+            else:
+                upper = bisect_right(self._days, end)
+            return self._days[lower:upper]
@@ -0,0 +1,134 @@
+"""An LRU cache of the chronodexes of recently visited days, filled in the
+background by prefetching."""
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+
+# Default bound of the cache, as a total number of activities. An activity
+# takes about 40 bytes in a Chronodex, so this is a few megabytes.
+DEFAULT_MAX_ACTIVITIES = 100000
+
+
+class DayCache(object):
+    """Caches the Chronodex of days returned by a loader function.
+
+    The cache is bounded by the total number of activities it holds, the
+    least recently used days being evicted first. :meth:`prefetch` loads
+    days on a worker thread, so that later calls to :meth:`get` do not
+    touch the disk.
+    """
+
+    def __init__(self, loader, max_activities=DEFAULT_MAX_ACTIVITIES):
+        """Creates an empty cache.
+
+        Parameters
+        ----------
+        loader: callable
+            A function taking a datetime.date and returning the
+            serpentime.core.Chronodex of that day. It is called from the
+            worker thread when prefetching.
+        max_activities: int
+            The maximal total number of activities held in the cache.
+        """
+        self.loader = loader
+        self.max_activities = max_activities
+        self._days = OrderedDict()
+        self._size = 0
+        self._pending = {}
+        # Incremented on each invalidation of a day, and on each clear, so
+        # that a load started before it does not store outdated data.
+        self._generations = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def __contains__(self, day):
+        with self._lock:
+            return day in self._days
+
+    def get(self, day):
+        """Returns a copy of the Chronodex of the given day, loading it
+        if it is neither cached nor being prefetched.
+        """
+        with self._lock:
+            dex = self._days.get(day)
+            if dex is not None:
+                self._days.move_to_end(day)
+                return dex.copy()
+            future = self._pending.get(day)
+            generation = self._generation(day)
+        if future is not None:
+            dex = future.result()
+        else:
+            dex = self.loader(day)
+            self._store(day, dex, generation)
+        return dex.copy()
+
+    def put(self, day, chronodex):
+        """Caches a copy of the given Chronodex for the given day."""
+        with self._lock:
+            generation = self._generation(day)
+        self._store(day, chronodex.copy(), generation)
+
+    def prefetch(self, days):
+        """Loads the given days on the worker thread, if they are not
+        already cached or being loaded.
+        """
+        with self._lock:
+            for day in days:
+                if day in self._days or day in self._pending:
+                    continue
+                self._pending[day] = self._executor.submit(
+                    self._prefetch_day, day, self._generation(day)
+                )
+
+    def _prefetch_day(self, day, generation):
+        try:
+            dex = self.loader(day)
+            self._store(day, dex, generation)
+            return dex
+        finally:
+            with self._lock:
+                # After an invalidation, the pending entry was dropped and
+                # may have been replaced by a newer prefetch.
+                if generation == self._generation(day):
+                    self._pending.pop(day, None)
+
+    def _generation(self, day):
+        return (self._epoch, self._generations.get(day, 0))
+
+    def _store(self, day, chronodex, generation):
+        with self._lock:
+            if generation != self._generation(day):
+                return
+            previous = self._days.pop(day, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._days[day] = chronodex
+            self._size += len(chronodex)
+            while self._size > self.max_activities and len(self._days) > 1:
+                _, evicted = self._days.popitem(last=False)
+                self._size -= len(evicted)
+
+    def invalidate(self, day):
+        """Drops the given day from the cache, after its file changed."""
+        with self._lock:
+            self._generations[day] = self._generations.get(day, 0) + 1
+            self._pending.pop(day, None)
+            dex = self._days.pop(day, None)
+            if dex is not None:
+                self._size -= len(dex)
+
+    def clear(self):
+        """Drops all the cached days."""
+        with self._lock:
+            self._epoch += 1
+            self._generations.clear()
+            self._pending.clear()
+            self._days.clear()
+            self._size = 0
+
+    def close(self):
+        """Stops the worker thread, without waiting for pending loads."""
+        self._executor.shutdown(wait=False)
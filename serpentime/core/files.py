@@ -0,0 +1,70 @@
+"""Helpers to write files safely."""
+from contextlib import contextmanager
+import os
+import stat
+import tempfile
+
+
+# Permissions of the files created by atomic_write
+DEFAULT_PERMISSIONS = 0o644
+
+
+@contextmanager
+def atomic_write(path, mode='w', **kwargs):
+    """Opens a temporary file to be moved to path once written.
+
+    The temporary file is created next to path, synced to disk when the
+    context exits and then renamed over path, so that path holds either
+    its previous content or the new one, never a partially written file.
+    The directory is synced after the rename, so that the new content
+    survives a power loss.
+    If the context raises, the temporary file is removed and path is left
+    untouched.
+
+    Parameters
+    ----------
+    path: str
+        The full filename of the file to write.
+    mode: str
+        The mode in which the temporary file is opened, 'w' or 'wb'.
+    **kwargs
+        Other arguments of open, such as newline.
+    """
+    directory, basename = os.path.split(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(
+        dir=directory, prefix=f'.{basename}.', suffix='.tmp'
+    )
+    try:
+        try:
+            permissions = stat.S_IMODE(os.stat(path).st_mode)
+        except OSError:
+            permissions = DEFAULT_PERMISSIONS
+        os.chmod(tmp_path, permissions)
+        with os.fdopen(fd, mode, **kwargs) as fid:
+            yield fid
+            fid.flush()
+            os.fsync(fid.fileno())
+        os.replace(tmp_path, path)
+        fsync_directory(directory)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def fsync_directory(directory):
+    """Syncs the entries of a directory to disk, such as a renamed file.
+    Does nothing on platforms where directories cannot be opened.
+    """
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
@@ -0,0 +1,319 @@
+"""Bulk import of trees of legacy txt and csv chronodex files into a data
+directory.
+
+Source files are found by their YYYYMMDD.txt or YYYYMMDD.csv name, parsed,
+validated and normalized in a pool of processes, and written to the storage
+of the data directory in batches, see Storage.put_many.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import os
+import sys
+import time
+
+from .chronodex import Chronodex
+from .data_index import FORMATS, parse_filename
+from .journal import EditJournal
+from .normalize import KEEP, OVERLAP_POLICIES
+from .storage import STORAGE_BACKENDS, CsvStorage, open_storage
+
+
+# Number of days written to the storage in each batch
+BATCH_SIZE = 500
+
+
+def find_day_files(root):
+    """Returns the day files found in a directory tree.
+
+    When a day has several files, the csv one is preferred, then the first
+    by path.
+
+    Parameters
+    ----------
+    root: str
+        The directory to walk.
+
+    Returns
+    -------
+    files: dict
+        {datetime.date: (path, format)} for each day.
+    duplicates: list(str)
+        The paths of the files ignored because their day has another file.
+    """
+    found = []
+    for directory, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            parsed = parse_filename(filename)
+            if parsed is not None:
+                day, fmt = parsed
+                path = os.path.join(directory, filename)
+                found.append((day, FORMATS.index(fmt), path, fmt))
+    files = {}
+    duplicates = []
+    for day, _, path, fmt in sorted(found):
+        if day in files:
+            duplicates.append(path)
+        else:
+            files[day] = (path, fmt)
+    return files, duplicates
+
+
+def convert_file(path, fmt, overlap=KEEP, fill_gaps=False, merge=True):
+    """Parses, validates and normalizes one day file. Called in worker
+    processes.
+
+    Parameters
+    ----------
+    path: str
+        The file to import.
+    fmt: str
+        Either 'txt' or 'csv'.
+    overlap, fill_gaps, merge
+        The options of Chronodex.normalize.
+
+    Returns
+    -------
+    chronodex: serpentime.core.Chronodex or None
+        The valid normalized activities, None if the file could not be
+        read.
+    n_valid, n_invalid: int
+        The number of normalized activities kept and dropped as invalid.
+    size: int
+        The number of bytes read.
+    error: str or None
+        Why the file could not be read.
+    """
+    try:
+        with open(path, 'rb') as fid:
+            data = fid.read()
+        if fmt == 'txt':
+            chronodex = Chronodex.from_txt(data)
+        else:
+            chronodex = Chronodex.from_csv(data)
+    except (OSError, ValueError) as error:
+        return None, 0, 0, 0, str(error)
+    chronodex = chronodex.normalize(
+        overlap=overlap, fill_gaps=fill_gaps, merge=merge
+    )
+    valid = chronodex.valid()
+    n_invalid = len(chronodex) - len(valid)
+    return valid, len(valid), n_invalid, len(data), None
+
+
+def _convert_job(path, fmt, options):
+    return convert_file(path, fmt, **options)
+
+
+def _record_result(report, day, path, result):
+    """Records the outcome of the conversion of a day in the report.
+
+    Parameters
+    ----------
+    report: ImportReport
+        The report to update.
+    day: datetime.date
+        The converted day.
+    path: str
+        The source file of the day.
+    result: tuple
+        The value returned by convert_file.
+
+    Returns
+    -------
+    chronodex: serpentime.core.Chronodex or None
+        The Chronodex to write, None if the file could not be read.
+    """
+    chronodex, n_valid, n_invalid, size, error = result
+    report.bytes_read += size
+    if error is not None:
+        report.errors[path] = error
+        return None
+    report.imported.append(day)
+    report.activities += n_valid
+    report.invalid += n_invalid
+    return chronodex
+
+
+def _write_batch(storage, journal, batch, report, progress):
+    """Writes the (day, Chronodex) pairs of a batch to the storage and
+    reports the progress.
+
+    The journaled edits of the days are dropped first, as they refer to the
+    rows of the replaced content.
+    """
+    if batch:
+        if journal is not None:
+            journal.discard(day for day, _ in batch)
+        storage.put_many(batch)
+    report.tick()
+    if progress is not None:
+        progress(report)
+
+
+class ImportReport(object):
+    """The outcome of a bulk import."""
+
+    def __init__(self):
+        # The days written to the data directory
+        self.imported = []
+        # The days skipped because the data directory already has them
+        self.skipped = []
+        # {path: message} for the files that could not be imported
+        self.errors = {}
+        # The number of activities written and dropped as invalid
+        self.activities = 0
+        self.invalid = 0
+        self.bytes_read = 0
+        self._begin = time.perf_counter()
+        self.elapsed = 0.0
+
+    @property
+    def n_files(self):
+        """The number of files processed so far."""
+        return len(self.imported) + len(self.errors)
+
+    @property
+    def files_per_second(self):
+        return self.n_files / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def megabytes_per_second(self):
+        return self.bytes_read / 1e6 / self.elapsed if self.elapsed else 0.0
+
+    def tick(self):
+        """Updates the elapsed time."""
+        self.elapsed = time.perf_counter() - self._begin
+
+    def summary(self):
+        """Returns a one line description of the import."""
+        return (
+            f"{len(self.imported)} days imported, {len(self.skipped)} "
+            f"skipped, {len(self.errors)} errors, {self.activities} "
+            f"activities ({self.invalid} invalid dropped) in "
+            f"{self.elapsed:.2f}s: {self.files_per_second:.0f} files/s, "
+            f"{self.megabytes_per_second:.1f} MB/s"
+        )
+
+
+def import_tree(root, storage, overwrite=False, workers=None,
+                batch_size=BATCH_SIZE, progress=None, journal=None,
+                **options):
+    """Imports the chronodex files of a directory tree into the storage of
+    a data directory.
+
+    Parameters
+    ----------
+    root: str
+        The directory tree holding YYYYMMDD.txt and YYYYMMDD.csv files.
+    storage: serpentime.core.storage.Storage or str
+        The storage to import into, or a data directory of csv files.
+    overwrite: bool
+        Whether days already stored or journaled are replaced. Otherwise,
+        they are skipped.
+    workers: int or None
+        The number of processes to use. If None, uses all the cores.
+    batch_size: int
+        The number of days written to the storage in each batch.
+    progress: callable or None
+        Called with the ImportReport after each batch.
+    journal: serpentime.core.journal.EditJournal or None
+        The edit journal of the storage, whose edits of the imported days
+        are dropped.
+    **options
+        The options of Chronodex.normalize.
+
+    Returns
+    -------
+    report: ImportReport
+        The imported days, errors and throughput.
+    """
+    overlap = options.get('overlap', KEEP)
+    if overlap not in OVERLAP_POLICIES:
+        raise ValueError(
+            f"Unknown overlap policy {overlap!r}, expected one of "
+            f"{OVERLAP_POLICIES}"
+        )
+    if isinstance(storage, str):
+        storage = CsvStorage(storage)
+    report = ImportReport()
+    files, duplicates = find_day_files(root)
+    for path in duplicates:
+        report.errors[path] = "another file holds the same day"
+    jobs = []
+    for day in sorted(files):
+        exists = day in storage or (journal is not None and day in journal)
+        if exists and not overwrite:
+            report.skipped.append(day)
+        else:
+            jobs.append(day)
+    if not jobs:
+        report.tick()
+        return report
+    paths = [files[day][0] for day in jobs]
+    fmts = [files[day][1] for day in jobs]
+    batch = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Chunks amortize the cost of sending each file to a worker
+        chunksize = max(
+            1, min(64, len(jobs) // (4 * (workers or os.cpu_count() or 1)))
+        )
+        results = executor.map(
+            _convert_job, paths, fmts, [options] * len(jobs),
+            chunksize=chunksize,
+        )
+        for day, path, result in zip(jobs, paths, results):
+            chronodex = _record_result(report, day, path, result)
+            if chronodex is None:
+                continue
+            batch.append((day, chronodex))
+            if len(batch) >= batch_size:
+                _write_batch(storage, journal, batch, report, progress)
+                batch = []
+    _write_batch(storage, journal, batch, report, progress)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Imports a tree of YYYYMMDD.txt and YYYYMMDD.csv "
+                    "chronodex files into the data directory."
+    )
+    parser.add_argument('source')
+    parser.add_argument('data_dir')
+    parser.add_argument('--backend', choices=sorted(STORAGE_BACKENDS),
+                        default='csv')
+    parser.add_argument('--overwrite', action='store_true')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--overlap', choices=OVERLAP_POLICIES, default=KEEP)
+    parser.add_argument('--fill-gaps', action='store_true')
+    parser.add_argument('--no-merge', dest='merge', action='store_false')
+    args = parser.parse_args(argv)
+
+    def progress(report):
+        print(
+            f"{report.n_files} files, {report.files_per_second:.0f} "
+            f"files/s", file=sys.stderr
+        )
+
+    storage = open_storage(args.data_dir, args.backend)
+    journal = EditJournal(args.data_dir)
+    try:
+        report = import_tree(
+            args.source, storage, overwrite=args.overwrite,
+            workers=args.workers, batch_size=args.batch_size,
+            progress=progress, journal=journal, overlap=args.overlap,
+            fill_gaps=args.fill_gaps, merge=args.merge,
+        )
+    finally:
+        journal.close()
+        storage.close()
+    for path, message in sorted(report.errors.items()):
+        print(f"{path}: {message}", file=sys.stderr)
+    print(report.summary())
+    return 1 if report.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
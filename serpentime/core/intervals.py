@@ -0,0 +1,110 @@
+"""A sorted index of the time intervals of the activities of a Chronodex."""
+from bisect import bisect_left, bisect_right, insort
+from math import isnan
+
+
+class IntervalIndex(object):
+    """Indexes the rows of a Chronodex by their [start, end) interval.
+
+    Intervals are kept sorted by start time in a list. The intervals
+    overlapping a time window start at most the longest interval length
+    before it, so that lookups cost O(log n + k), where k is the number of
+    intervals starting in that extended window. k is small for the
+    activities of a day, which rarely nest, but reaches n when one interval
+    spans the day, as the longest length is an upper bound that is never
+    lowered. Adding, discarding and shifting rows move the items of the list
+    and cost O(n), a memory move for add and discard, a pass over the items
+    for shift, which is cheap for the few dozen activities of a day.
+
+    Only rows with numeric start and end, and end not before start, are
+    indexed.
+    """
+
+    def __init__(self, starts, ends):
+        """Builds the index of the given start and end columns.
+
+        Parameters
+        ----------
+        starts, ends: sequence(float)
+            The start and end time of each row, nan when not set.
+        """
+        self._items = sorted(
+            (start, end, row)
+            for row, (start, end) in enumerate(zip(starts, ends))
+            if self._indexable(start, end)
+        )
+        # Upper bound of the interval lengths. It is not lowered when
+        # intervals are removed, which only widens the lookups.
+        self._max_length = max(
+            (end - start for start, end, _ in self._items), default=0
+        )
+
+    @staticmethod
+    def _indexable(start, end):
+        return not (isnan(start) or isnan(end)) and end >= start
+
+    def __len__(self):
+        return len(self._items)
+
+    def add(self, row, start, end):
+        """Indexes the interval of the given row, if it is indexable."""
+        if self._indexable(start, end):
+            insort(self._items, (start, end, row))
+            self._max_length = max(self._max_length, end - start)
+
+    def discard(self, row, start, end):
+        """Removes the interval of the given row from the index."""
+        if self._indexable(start, end):
+            ind = bisect_left(self._items, (start, end, row))
+            if ind < len(self._items) and self._items[ind][2] == row:
+                del self._items[ind]
+
+    def shift(self, first_row, delta):
+        """Shifts by delta the rows from first_row onwards, after rows were
+        inserted or removed before them. This keeps the order of the items,
+        but visits all of them, in O(n).
+        """
+        self._items = [
+            (start, end, row + delta if row >= first_row else row)
+            for start, end, row in self._items
+        ]
+
+    def _candidates(self, start, end):
+        """Returns the items starting between start minus the longest
+        interval length and end, both included.
+        """
+        lower = bisect_left(self._items, (start - self._max_length,))
+        upper = bisect_right(self._items, (end, float('inf')))
+        return self._items[lower:upper]
+
+    def at(self, time):
+        """Returns the sorted rows whose interval contains the given time,
+        start included and end excluded.
+        """
+        return sorted(
+            row for start, end, row in self._candidates(time, time)
+            if start <= time < end
+        )
+
+    def overlapping(self, start, end):
+        """Returns the sorted rows whose interval overlaps [start, end)."""
+        return sorted(
+            row for item_start, item_end, row in self._candidates(start, end)
+            if item_start < end and item_end > start
+        )
+
+    def gaps(self, lower=0, upper=24):
+        """Returns the list of the (start, end) intervals between lower and
+        upper covered by no indexed interval.
+        """
+        gaps = []
+        current = lower
+        for start, end, _ in self._items:
+            if start > current:
+                gaps.append((current, min(start, upper)))
+            current = max(current, end)
+            if current >= upper:
+                break
+        if current < upper:
+            gaps.append((current, upper))
+        return [(start, end) for start, end in gaps if start < end]
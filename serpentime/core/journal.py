@@ -0,0 +1,379 @@
+"""An append-only journal of the edits made to the chronodexes of a data
+directory.
+
+Each line of the journal is a JSON object holding the day it applies to and
+one of the following operations:
+
+- ``set``: sets the field of a row to a value,
+- ``insert``: inserts a row with the given values,
+- ``remove``: removes a row, or ``count`` rows from it,
+- ``reset``: replaces the whole day by the given rows,
+- ``delete``: marks the day files as deleted, the day being empty.
+
+The state of a day is its file content, or the rows of its last ``reset``
+or ``delete`` operation, to which the later operations are applied.
+Compacting the journal writes the state of the edited days to their files
+and empties the journal.
+"""
+from contextlib import nullcontext
+from datetime import date
+import heapq
+from itertools import groupby
+import json
+import logging
+import os
+import threading
+
+from .chronodex import Activity, Chronodex
+from .files import atomic_write
+from .parsers import ActivityRow
+
+
+logger = logging.getLogger(__name__)
+
+# Name of the journal file, in the data directory
+JOURNAL_FILENAME = '.serpentime-journal.jsonl'
+# Default time without edits after which the journal is compacted, in
+# seconds
+COMPACT_DELAY = 30.0
+# Operations replacing the state of a day
+BASE_OPERATIONS = ('reset', 'delete')
+# Fields of an activity that a set operation may change
+FIELDS = ActivityRow._fields
+
+
+class EditJournal(object):
+    """Records edits of chronodexes as cheap appends to a journal file.
+
+    Each edit is synced to disk before the method recording it returns, so
+    that a recorded edit survives a crash of the application or a power
+    loss.
+    """
+
+    def __init__(self, directory):
+        """Loads the journal of the given data directory, if any.
+
+        Parameters
+        ----------
+        directory: str
+            The data directory holding the chronodex files.
+        """
+        self.directory = directory
+        self.path = os.path.join(directory, JOURNAL_FILENAME)
+        # {datetime.date: [operation]}, in journal order
+        self._operations = {}
+        self._file = None
+        self._lock = threading.RLock()
+        self.load()
+
+    def load(self):
+        """Loads the operations of the journal file. A last line left
+        incomplete by a crash is ignored.
+        """
+        self._operations = {}
+        try:
+            fid = open(self.path, 'r')
+        except FileNotFoundError:
+            return
+        with fid:
+            for line_num, line in enumerate(fid, 1):
+                try:
+                    operation = json.loads(line)
+                    day = date.fromisoformat(operation['day'])
+                except (ValueError, KeyError):
+                    logger.warning(
+                        "Ignoring invalid line %d of %s", line_num, self.path
+                    )
+                    continue
+                self._operations.setdefault(day, []).append(operation)
+
+    def close(self):
+        """Closes the journal file."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __contains__(self, day):
+        with self._lock:
+            return day in self._operations
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(ops) for ops in self._operations.values())
+
+    def days(self):
+        """Returns the sorted list of the days with journaled edits."""
+        with self._lock:
+            return sorted(self._operations)
+
+    def _append(self, day, operation):
+        self._append_many(day, [operation])
+
+    def _append_many(self, day, operations):
+        """Appends operations of the given day with a single sync."""
+        for operation in operations:
+            operation['day'] = day.isoformat()
+        lines = ''.join(
+            json.dumps(operation) + '\n' for operation in operations
+        )
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, 'a')
+            self._file.write(lines)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._operations.setdefault(day, []).extend(operations)
+
+    def set_field(self, day, row, field, value):
+        """Records that the field of a row of the given day was set."""
+        if field not in FIELDS:
+            raise ValueError(f"Unknown activity field {field!r}")
+        self._append(
+            day, {'op': 'set', 'row': row, 'field': field, 'value': value}
+        )
+
+    def insert_row(self, day, row, activity):
+        """Records that an activity was inserted at a row of the given day.
+        """
+        self._append(day, {'op': 'insert', 'row': row, 'values': [
+            getattr(activity, field) for field in FIELDS
+        ]})
+
+    def remove_row(self, day, row):
+        """Records that a row of the given day was removed."""
+        self._append(day, {'op': 'remove', 'row': row})
+
+    def remove_rows(self, day, first, last):
+        """Records that the rows from first to last, both included, of the
+        given day were removed.
+        """
+        self._append(day, self._remove_operation(first, last))
+
+    def remove_ranges(self, day, ranges):
+        """Records that the given ranges of rows of the given day were
+        removed, with a single sync.
+
+        Parameters
+        ----------
+        day: datetime.date
+            The day the rows were removed from.
+        ranges: list(tuple(int, int))
+            The (first, last) rows of each range, both included, in the
+            order they were removed.
+        """
+        if ranges:
+            self._append_many(day, [
+                self._remove_operation(first, last) for first, last in ranges
+            ])
+
+    @staticmethod
+    def _remove_operation(first, last):
+        if first == last:
+            return {'op': 'remove', 'row': first}
+        return {'op': 'remove', 'row': first, 'count': last - first + 1}
+
+    def reset(self, day, chronodex):
+        """Records the whole content of the given day."""
+        self._append(day, self._reset_operation(chronodex))
+
+    def delete(self, day):
+        """Records that the files of the given day were deleted."""
+        self._append(day, {'op': 'delete'})
+
+    def discard(self, days):
+        """Forgets the journaled edits of the given days, for instance when
+        their stored content is replaced.
+        """
+        with self._lock:
+            removed = [
+                day for day in days
+                if self._operations.pop(day, None) is not None
+            ]
+            if removed:
+                self._rewrite()
+
+    @staticmethod
+    def _reset_operation(chronodex):
+        return {'op': 'reset', 'rows': [list(row) for row in chronodex.rows()]}
+
+    def replay(self, day, read_file):
+        """Returns the Chronodex of the given day with its journaled edits
+        applied.
+
+        Parameters
+        ----------
+        day: datetime.date
+            The day to replay.
+        read_file: callable
+            A function taking a datetime.date and returning the Chronodex
+            read from its file.
+        """
+        with self._lock:
+            operations = list(self._operations.get(day, []))
+        return self._replay(day, operations, read_file)[0]
+
+    def iter_range(self, storage, start=None, end=None):
+        """Yields the (day, Chronodex) pairs of the stored or journaled days
+        between start and end, both included, in order, with their journaled
+        edits applied. The stored days are read in bulk, and the days the
+        journal deleted are skipped.
+
+        Parameters
+        ----------
+        storage: serpentime.core.storage.Storage
+            The storage of the data directory of the journal.
+        start, end: datetime.date or None
+            The bounds of the range of days, None for unbounded.
+        """
+        with self._lock:
+            snapshot = {
+                day: list(ops) for day, ops in self._operations.items()
+                if (start is None or day >= start)
+                and (end is None or day <= end)
+            }
+        items = heapq.merge(
+            storage.iter_range(start, end),
+            ((day, None) for day in sorted(snapshot)),
+            key=lambda item: item[0],
+        )
+        for day, group in groupby(items, key=lambda item: item[0]):
+            stored = [
+                chronodex for _, chronodex in group if chronodex is not None
+            ]
+            chronodex = stored[0] if stored else Chronodex()
+            if day in snapshot:
+                chronodex, deleted = self._replay(
+                    day, snapshot[day], lambda _, stored=chronodex: stored
+                )
+                if deleted:
+                    continue
+            yield day, chronodex
+
+    def _replay(self, day, operations, read_file):
+        """Returns the Chronodex resulting from the given operations, and
+        whether the day is deleted.
+        """
+        base = None
+        for ind, operation in enumerate(operations):
+            if operation['op'] in BASE_OPERATIONS:
+                base = ind
+        if base is None:
+            chronodex = read_file(day)
+            deleted = False
+        else:
+            rows = operations[base].get('rows', [])
+            chronodex = Chronodex()
+            for row in rows:
+                chronodex._append(*row)
+            deleted = operations[base]['op'] == 'delete'
+            operations = operations[base + 1:]
+        for operation in operations:
+            try:
+                self._apply(chronodex, operation)
+            except (IndexError, KeyError, TypeError, ValueError):
+                logger.warning("Ignoring invalid edit %s", operation)
+        return chronodex, deleted and len(chronodex) == 0
+
+    @staticmethod
+    def _apply(chronodex, operation):
+        activities = chronodex.activities
+        if operation['op'] == 'set':
+            if operation['field'] not in FIELDS:
+                raise ValueError(operation['field'])
+            activity = activities[operation['row']]
+            setattr(activity, operation['field'], operation['value'])
+        elif operation['op'] == 'insert':
+            activities.insert(
+                operation['row'], Activity(*operation['values'])
+            )
+        elif operation['op'] == 'remove':
+            row = operation['row']
+            count = operation.get('count', 1)
+            if not 0 <= row <= row + count <= len(activities):
+                raise IndexError(row)
+            del activities[row:row + count]
+
+    def _rewrite(self):
+        """Replaces the journal file by the operations held in memory."""
+        self.close()
+        with atomic_write(self.path, 'w') as fid:
+            for operations in self._operations.values():
+                for operation in operations:
+                    fid.write(json.dumps(operation) + '\n')
+
+    def compact(self, read_file, write_day, remove_day, batch=None):
+        """Writes the journaled days to their files and empties the journal.
+
+        Edits journaled while compacting are kept. At any time, the journal
+        file and the day files together hold the latest state of each day,
+        so that a crash during compaction loses nothing.
+
+        Parameters
+        ----------
+        read_file: callable
+            A function taking a datetime.date and returning the Chronodex
+            read from its file.
+        write_day: callable
+            A function taking a datetime.date and a Chronodex, and writing
+            the Chronodex to the file of that day.
+        remove_day: callable
+            A function taking a datetime.date and deleting its files.
+        batch: callable or None
+            A function returning a context manager wrapping the writes and
+            removals of the days, such as Storage.batch, left before the
+            journal forgets the written days.
+
+        Returns
+        -------
+        days: list(datetime.date)
+            The days that were compacted.
+        """
+        with self._lock:
+            # Days left with only the reset of a previous compaction already
+            # have their valid activities written
+            snapshot = {
+                day: list(ops) for day, ops in self._operations.items()
+                if not (len(ops) == 1 and ops[0].get('written', False))
+            }
+        if not snapshot:
+            return []
+        states = {
+            day: self._replay(day, operations, read_file)
+            for day, operations in snapshot.items()
+        }
+        # Records the state of each day, so that the day files can be
+        # rewritten without the risk of applying edits twice
+        resets = {}
+        with self._lock:
+            for day, (chronodex, deleted) in states.items():
+                if deleted:
+                    resets[day] = {'op': 'delete', 'day': day.isoformat()}
+                else:
+                    resets[day] = self._reset_operation(chronodex)
+                    resets[day]['day'] = day.isoformat()
+                tail = self._operations[day][len(snapshot[day]):]
+                self._operations[day] = [resets[day]] + tail
+            self._rewrite()
+        with batch() if batch is not None else nullcontext():
+            for day, (chronodex, deleted) in states.items():
+                if deleted:
+                    remove_day(day)
+                else:
+                    write_day(day, chronodex.valid())
+        # Days whose file now holds their whole state no longer need their
+        # reset. Days with invalid activities, which are not written to
+        # files, keep it, marked as written so that later compactions skip
+        # them until they are edited again.
+        with self._lock:
+            for day, (chronodex, deleted) in states.items():
+                operations = self._operations[day]
+                written = operations and operations[0] is resets[day]
+                if written and (deleted or all(chronodex.validate()[0])):
+                    operations.pop(0)
+                elif written:
+                    operations[0] = dict(resets[day], written=True)
+                if not operations:
+                    del self._operations[day]
+            self._rewrite()
+        return sorted(states)
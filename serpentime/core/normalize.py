@@ -0,0 +1,167 @@
+"""Normalization of the activities of a day: merging of contiguous
+activities, resolution of overlaps and filling of gaps."""
+import heapq
+
+
+# Overlapping activities are left as they are
+KEEP = 'keep'
+# The activity starting later wins: the earlier one is cut where the later
+# one starts, and resumes after it if it lasted longer
+SPLIT = 'split'
+# The activity starting earlier wins: the later one starts where the
+# earlier one ends, and is dropped if it is entirely covered
+TRIM = 'trim'
+OVERLAP_POLICIES = (KEEP, SPLIT, TRIM)
+
+
+def normalize_rows(rows, overlap=KEEP, fill_gaps=False, merge=True):
+    """Normalizes activity rows in one sweep over their start times.
+
+    Parameters
+    ----------
+    rows: iterable(serpentime.core.parsers.ActivityRow)
+        The activities to normalize. They must have numeric start and end,
+        end not before start.
+    overlap: str
+        How overlapping activities are resolved, one of KEEP, SPLIT and
+        TRIM.
+    fill_gaps: bool
+        Whether an activity is extended up to the start of the next one
+        when there is a gap between them.
+    merge: bool
+        Whether contiguous or overlapping activities with the same name and
+        category are merged into one, keeping the weight of the first.
+
+    Returns
+    -------
+    rows: list(serpentime.core.parsers.ActivityRow)
+        The normalized activities, sorted by start time.
+    """
+    if overlap not in OVERLAP_POLICIES:
+        raise ValueError(
+            f"Unknown overlap policy {overlap!r}, expected one of "
+            f"{OVERLAP_POLICIES}"
+        )
+    # The heap entries carry the original start of the activities, which
+    # their requeued remainders keep to decide the overlaps they take part
+    # in. The sequence number keeps the sort stable and avoids comparing
+    # rows
+    heap = [
+        (row.start, row.start, row.end, seq, row)
+        for seq, row in enumerate(rows)
+    ]
+    heapq.heapify(heap)
+    seq = len(heap)
+    result = []
+    origins = []
+    while heap:
+        _, origin, _, _, row = heapq.heappop(heap)
+        if result and _absorb(result, row, fill_gaps, merge):
+            continue
+        if result and row.start < result[-1].end and overlap != KEEP:
+            row, requeued = _resolve_overlap(
+                result, origins, row, origin, overlap
+            )
+            if requeued is not None:
+                requeued_origin, requeued = requeued
+                heapq.heappush(heap, (
+                    requeued.start, requeued_origin, requeued.end, seq,
+                    requeued,
+                ))
+                seq += 1
+            if row is None:
+                continue
+        result.append(row)
+        origins.append(origin)
+    return result
+
+
+def _absorb(result, row, fill_gaps, merge):
+    """Extends the last normalized activity up to row when filling gaps,
+    and merges row into it when they are the same activity.
+
+    Returns
+    -------
+    merged: bool
+        Whether row was merged into the last normalized activity.
+    """
+    previous = result[-1]
+    if fill_gaps and row.start > previous.end:
+        previous = result[-1] = previous._replace(end=row.start)
+    same_activity = (
+        row.name == previous.name and row.category == previous.category
+    )
+    if not (merge and same_activity and row.start <= previous.end):
+        return False
+    if row.end > previous.end:
+        result[-1] = previous._replace(end=row.end)
+    return True
+
+
+def _resolve_overlap(result, origins, row, origin, overlap):
+    """Resolves the overlap of row with the last normalized activity,
+    following the SPLIT or TRIM policy applied to their original starts.
+
+    Returns
+    -------
+    row: ActivityRow or None
+        The row to append to the normalized activities, if any.
+    requeued: tuple(float, ActivityRow) or None
+        The original start and the remainder of an activity to sweep
+        again, if any.
+    """
+    previous = result[-1]
+    if overlap == TRIM or origin < origins[-1]:
+        # The last normalized activity wins, row resumes after it
+        if row.end > previous.end:
+            return None, (origin, row._replace(start=previous.end))
+        return None, None
+    requeued = None
+    if previous.end > row.end:
+        requeued = (origins[-1], previous._replace(start=row.end))
+    if row.start > previous.start:
+        result[-1] = previous._replace(end=row.start)
+    else:
+        result.pop()
+        origins.pop()
+    return row, requeued
+
+
+def normalize_storage(storage, start=None, end=None, journal=None,
+                      **options):
+    """Normalizes the stored days, writing back the days that changed in
+    one batch.
+
+    The days are written through the storage, so that their stamps change
+    and the summaries and search index resynchronize them.
+
+    Parameters
+    ----------
+    storage: serpentime.core.storage.Storage or str
+        The storage of the days, or a data directory of csv files.
+    start, end: datetime.date or None
+        The bounds of the range of days to normalize, None for unbounded.
+    journal: serpentime.core.journal.EditJournal or None
+        The edit journal of the storage. Its days are skipped, as its edits
+        refer to the rows of the stored days.
+    **options
+        The options of Chronodex.normalize.
+
+    Returns
+    -------
+    days: list(datetime.date)
+        The days that were rewritten.
+    """
+    from .storage import CsvStorage
+
+    if isinstance(storage, str):
+        storage = CsvStorage(storage)
+    changed = []
+    for day, chronodex in storage.iter_range(start, end):
+        if journal is not None and day in journal:
+            continue
+        normalized = chronodex.normalize(**options)
+        if normalized.rows() != chronodex.rows():
+            changed.append((day, normalized))
+    storage.put_many(changed)
+    return [day for day, _ in changed]
@@ -0,0 +1,167 @@
+"""Streaming parsers for the txt and csv chronodex file formats.
+
+The parsers are generators yielding one ActivityRow per activity, so that
+large files are parsed in constant memory. They accept a path, a file
+object opened in text or binary mode, or a bytes-like buffer.
+"""
+from collections import namedtuple
+import csv
+import io
+import os
+
+
+# The fields of an activity, in the order of Activity's parameters
+ActivityRow = namedtuple(
+    'ActivityRow', ['start', 'end', 'name', 'category', 'weight']
+)
+
+
+class ChronodexParseError(ValueError):
+    """Raised when a line of a chronodex file cannot be parsed."""
+
+    def __init__(self, message, row):
+        super().__init__(f"row {row}: {message}")
+        self.row = row
+
+
+def _open_text(source):
+    """Returns a text file object reading source, and whether it should
+    be closed once read.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        return open(source, 'r', newline=''), True
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.TextIOWrapper(io.BytesIO(source), newline=''), True
+    if isinstance(source.read(0), bytes):
+        return io.TextIOWrapper(source, newline=''), False
+    return source, False
+
+
+def _rows(source):
+    """Yields the row number and fields of each line of source.
+
+    Lines the csv module cannot read, such as fields over its size limit
+    or NUL bytes, raise a ChronodexParseError.
+    """
+    fid, owned = _open_text(source)
+    try:
+        reader = csv.reader(fid, skipinitialspace=True)
+        try:
+            for row in reader:
+                yield reader.line_num, row
+        except csv.Error as error:
+            raise ChronodexParseError(str(error), reader.line_num)
+    finally:
+        if owned:
+            fid.close()
+        elif isinstance(fid, io.TextIOWrapper) and fid is not source:
+            # Leaves the binary file object given by the caller open
+            fid.detach()
+
+
+def iter_csv_activities(source, strict=False):
+    """Yields the activities of a csv chronodex file.
+
+    Csv rows are structured in the following way:
+    start, end, category, name, weight
+
+    Parameters
+    ----------
+    source: str, os.PathLike, file object or bytes
+        The file to read, as a path, an open file or its raw content.
+    strict: bool
+        If True, rows not having 5 fields raise a ChronodexParseError.
+        Otherwise, they are skipped.
+
+    Yields
+    ------
+    row: ActivityRow
+        The fields of each activity.
+
+    Raises
+    ------
+    ChronodexParseError
+        If a start, end or weight value is not a number.
+    """
+    for line_num, fields in _rows(source):
+        if len(fields) != 5:
+            if strict and fields:
+                raise ChronodexParseError(
+                    f"expected 5 fields, got {len(fields)}", line_num
+                )
+            continue
+        try:
+            start, end, weight = (
+                float(fields[0]), float(fields[1]), float(fields[4])
+            )
+        except ValueError as error:
+            raise ChronodexParseError(str(error), line_num) from None
+        yield ActivityRow(
+            start, end, fields[3].strip(), fields[2].strip(), weight
+        )
+
+
+def iter_txt_activities(source, strict=False):
+    """Yields the activities of a txt chronodex file.
+
+    Txt files are handled mostly to ensure old chronodex can be loaded.
+    Their rows are structured in the following way:
+    start, category, weight, name
+    and the end of an activity is the start of the next one, or 24 for
+    the last one.
+
+    Parameters
+    ----------
+    source: str, os.PathLike, file object or bytes
+        The file to read, as a path, an open file or its raw content.
+    strict: bool
+        If True, rows with a category, weight or name but no integer start
+        raise a ChronodexParseError. Otherwise, they are skipped.
+
+    Yields
+    ------
+    row: ActivityRow
+        The fields of each activity.
+    """
+    previous = None
+    for line_num, fields in _rows(source):
+        fields = [field.strip() for field in fields]
+        fields += [''] * (4 - len(fields))
+        if not any(field != '' for field in fields[1:]):
+            continue
+        if not fields[0].isnumeric():
+            if strict:
+                raise ChronodexParseError(
+                    f"invalid start {fields[0]!r}", line_num
+                )
+            continue
+        start = int(fields[0])
+        weight = int(fields[2]) if fields[2].isnumeric() else 10
+        if previous is not None:
+            yield previous._replace(end=start)
+        previous = ActivityRow(start, None, fields[3], fields[1], weight)
+    if previous is not None:
+        yield previous._replace(end=24)
+
+
+def iter_activities(source, fmt=None, strict=False):
+    """Yields the activities of a txt or csv chronodex file.
+
+    Parameters
+    ----------
+    source: str, os.PathLike, file object or bytes
+        The file to read, as a path, an open file or its raw content.
+    fmt: str or None
+        Either 'txt' or 'csv'. If None, it is taken from the extension of
+        source, which must then be a path.
+    strict: bool
+        Whether malformed rows raise a ChronodexParseError rather than
+        being skipped.
+    """
+    if fmt is None:
+        fmt = os.fspath(source).rpartition('.')[2]
+    if fmt == 'txt':
+        return iter_txt_activities(source, strict=strict)
+    if fmt == 'csv':
+        return iter_csv_activities(source, strict=strict)
+    raise ValueError(f"Unknown chronodex format {fmt!r}")
@@ -0,0 +1,262 @@
+"""A persisted inverted index of the words of the activity names and
+categories of a data directory, to find the days of an activity without
+reading their files.
+"""
+from bisect import bisect_left
+from collections import namedtuple
+from datetime import date
+import json
+import os
+import re
+import threading
+
+from .files import atomic_write
+
+
+# Name of the file holding the persisted index, in the data directory
+SEARCH_FILENAME = '.serpentime-search.json'
+
+_TOKEN_RE = re.compile(r'\w+')
+
+# A day matching a query, with the sorted rows of its matching activities
+SearchHit = namedtuple('SearchHit', ['day', 'rows'])
+
+
+def tokenize(text):
+    """Returns the list of the lower case words of the given text."""
+    return _TOKEN_RE.findall(text.lower())
+
+
+def day_tokens(chronodex):
+    """Returns {token: [row]} for the words of the names and categories of
+    the activities of the given Chronodex.
+    """
+    tokens = {}
+    for row, (name, category) in enumerate(
+            zip(chronodex.names, chronodex.categories)):
+        for token in set(tokenize(name) + tokenize(category)):
+            tokens.setdefault(token, []).append(row)
+    return tokens
+
+
+class SearchIndex(object):
+    """Maps the words of the activities to the days and rows holding them.
+
+    Like serpentime.core.summaries.SummaryStore, the index is updated when
+    days are saved or deleted, persisted by :meth:`flush`, and
+    :meth:`sync` indexes the days modified outside of the index.
+    """
+
+    def __init__(self, directory):
+        """Loads the index persisted in the given data directory.
+
+        Parameters
+        ----------
+        directory: str
+            The data directory holding the chronodex files.
+        """
+        self.directory = directory
+        self.path = os.path.join(directory, SEARCH_FILENAME)
+        # {datetime.date: (stamp, {token: [row]})}
+        self._days = {}
+        # {token: {datetime.date: [row]}}
+        self._postings = {}
+        # Sorted list of the tokens, for prefix queries, rebuilt when
+        # searching after tokens were added or removed
+        self._tokens = []
+        self._tokens_sorted = True
+        self._dirty = False
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        """Loads the persisted index, if any."""
+        try:
+            with open(self.path, 'r') as fi:
+                content = json.load(fi)
+        except (OSError, ValueError):
+            return
+        for key, (stamp, tokens) in content.get('days', {}).items():
+            try:
+                day = date.fromisoformat(key)
+            except ValueError:
+                continue
+            if stamp is not None:
+                stamp = tuple(stamp)
+            self._add(day, stamp, tokens)
+
+    def flush(self):
+        """Persists the index, if it changed since the last flush."""
+        with self._lock:
+            if not self._dirty:
+                return
+            content = {'days': {
+                day.isoformat(): [stamp, tokens]
+                for day, (stamp, tokens) in sorted(self._days.items())
+            }}
+            self._dirty = False
+        with atomic_write(self.path, 'w') as fi:
+            json.dump(content, fi)
+
+    def _add(self, day, stamp, tokens):
+        self._days[day] = (stamp, tokens)
+        for token, rows in tokens.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                self._tokens_sorted = False
+            postings[day] = rows
+
+    def _remove(self, day):
+        _, tokens = self._days.pop(day)
+        for token in tokens:
+            postings = self._postings[token]
+            del postings[day]
+            if not postings:
+                del self._postings[token]
+                self._tokens_sorted = False
+
+    def __contains__(self, day):
+        with self._lock:
+            return day in self._days
+
+    def __len__(self):
+        with self._lock:
+            return len(self._days)
+
+    def stamp(self, day):
+        """Returns the stamp of the indexed content of the given day, see
+        :meth:`update`, or None.
+        """
+        with self._lock:
+            entry = self._days.get(day)
+        return None if entry is None else entry[0]
+
+    def update(self, day, chronodex, stamp=None):
+        """Indexes the given Chronodex as the content of the given day.
+
+        Parameters
+        ----------
+        day: datetime.date
+            The day of the Chronodex.
+        chronodex: serpentime.core.Chronodex
+            The activities of the day. An empty Chronodex discards the day.
+        stamp: tuple or None
+            The Storage.stamp of the day holding the Chronodex, None if it
+            is not stored yet.
+        """
+        if len(chronodex) == 0:
+            self.discard(day)
+            return
+        tokens = day_tokens(chronodex)
+        with self._lock:
+            previous = self._days.get(day)
+            if previous == (stamp, tokens):
+                return
+            if previous is not None:
+                self._remove(day)
+            self._add(day, stamp, tokens)
+            self._dirty = True
+
+    def discard(self, day):
+        """Forgets the given day, after it was deleted."""
+        with self._lock:
+            if day in self._days:
+                self._remove(day)
+                self._dirty = True
+
+    def sync(self, storage, loader, start=None, end=None):
+        """Indexes the stored days whose content changed since they were
+        indexed, and forgets the days no longer stored.
+
+        Parameters
+        ----------
+        storage: serpentime.core.storage.Storage
+            The storage of the data directory.
+        loader: callable
+            A function taking a datetime.date and returning its Chronodex.
+        start, end: datetime.date or None
+            The bounds of the range of days to synchronize, None for
+            unbounded.
+
+        Returns
+        -------
+        days: list(datetime.date)
+            The days that were indexed again.
+        """
+        days = storage.days(start, end)
+        updated = []
+        for day in days:
+            stamp = storage.stamp(day)
+            if day in self and self.stamp(day) in (stamp, None):
+                # Days indexed from unsaved data are newer than the storage
+                continue
+            self.update(day, loader(day), stamp)
+            updated.append(day)
+        stored = set(days)
+        with self._lock:
+            removed = [
+                day for day, (stamp, _) in self._days.items()
+                if day not in stored and stamp is not None
+                and (start is None or day >= start)
+                and (end is None or day <= end)
+            ]
+        for day in removed:
+            self.discard(day)
+        return updated
+
+    def _matching_tokens(self, prefix):
+        if not self._tokens_sorted:
+            self._tokens = sorted(self._postings)
+            self._tokens_sorted = True
+        for token in self._tokens[bisect_left(self._tokens, prefix):]:
+            if not token.startswith(prefix):
+                return
+            yield token
+
+    def search(self, query, start=None, end=None):
+        """Returns the days holding activities matching all the words of the
+        query, in their name or category. Each word of the query matches
+        the words starting with it.
+
+        Parameters
+        ----------
+        query: str
+            The words to search, case insensitive.
+        start, end: datetime.date or None
+            The bounds of the range of days to search, None for unbounded.
+
+        Returns
+        -------
+        hits: list(SearchHit)
+            The matching days, sorted, with their matching rows.
+        """
+        words = set(tokenize(query))
+        if not words:
+            return []
+        matches = None
+        with self._lock:
+            word_matches = []
+            for word in words:
+                found = {}
+                for token in self._matching_tokens(word):
+                    for day, rows in self._postings[token].items():
+                        found.setdefault(day, set()).update(rows)
+                word_matches.append(found)
+        # Starts with the least common words, to keep the sets small
+        for found in sorted(word_matches, key=len):
+            if matches is None:
+                matches = found
+            else:
+                matches = {
+                    day: matches[day] & rows
+                    for day, rows in found.items() if day in matches
+                }
+                matches = {day: rows for day, rows in matches.items() if rows}
+            if not matches:
+                return []
+        return [
+            SearchHit(day, sorted(rows))
+            for day, rows in sorted(matches.items())
+            if (start is None or day >= start) and (end is None or day <= end)
+        ]
@@ -0,0 +1,585 @@
+"""Storage backends holding the chronodex of each day of a data directory.
+
+Three backends are available:
+
+- ``csv``: one YYYYMMDD.csv file per day, the historical layout, read
+  through the persisted serpentime.core.data_index.DataIndex,
+- ``sqlite``: a single SQLite database, indexed by day and category, for
+  large histories and cross-day queries,
+- ``archive``: one memory-mapped binary YYYY.dex file per year, see
+  serpentime.core.archive, for compact histories read without parsing.
+
+Use :func:`open_storage` to open the backend of a data directory.
+"""
+from contextlib import contextmanager
+from datetime import date
+from itertools import groupby
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from .analytics import read_day
+from .archive import Archive, archive_path
+from .chronodex import MISSING, Chronodex
+from .data_index import DataIndex, day_filename
+from .parsers import ActivityRow
+
+
+# Size in bytes of the unreferenced day blocks of a year archive above which
+# the archive is compacted, unless its referenced blocks are larger
+ARCHIVE_COMPACT_SIZE = 1 << 20
+# Name of the year archives, in the data directory
+ARCHIVE_PATTERN = re.compile(r'^(\d{4})\.dex$')
+# Name of the SQLite database, in the data directory
+SQLITE_FILENAME = 'serpentime.sqlite3'
+# Version of the SQLite schema, stored as the database user_version
+SCHEMA_VERSION = 1
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS days (
+    day TEXT PRIMARY KEY,
+    stamp INTEGER NOT NULL,
+    n_rows INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS activities (
+    day TEXT NOT NULL,
+    row INTEGER NOT NULL,
+    start REAL,
+    end REAL,
+    name TEXT NOT NULL,
+    category TEXT NOT NULL,
+    weight REAL,
+    PRIMARY KEY (day, row)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS activities_category ON activities (category, day);
+"""
+
+
+class Storage(object):
+    """The interface of the storage backends.
+
+    Days are datetime.date, and their content a Chronodex. A day is stored
+    once it has been put, even if its Chronodex is empty, until it is
+    deleted.
+    """
+
+    def get(self, day):
+        """Returns the Chronodex of the given day, empty if it is not
+        stored.
+        """
+        raise NotImplementedError
+
+    def put(self, day, chronodex):
+        """Stores the given Chronodex as the content of the given day.
+
+        Returns
+        -------
+        stamp: tuple
+            The new stamp of the day, see :meth:`stamp`.
+        """
+        raise NotImplementedError
+
+    def put_many(self, items):
+        """Stores the given (day, Chronodex) pairs, in a single batch.
+
+        Returns
+        -------
+        stamps: dict
+            {datetime.date: stamp} of the stored days.
+        """
+        with self.batch():
+            return {day: self.put(day, chronodex) for day, chronodex in items}
+
+    def delete(self, day):
+        """Deletes the content of the given day."""
+        raise NotImplementedError
+
+    def days(self, start=None, end=None):
+        """Returns the sorted list of the stored days between start and
+        end, both included. A None bound is unbounded.
+        """
+        raise NotImplementedError
+
+    def stamp(self, day):
+        """Returns a value changing whenever the content of the given day
+        is stored, or None if the day is not stored.
+        """
+        raise NotImplementedError
+
+    def iter_range(self, start=None, end=None):
+        """Yields the (day, Chronodex) pairs of the stored days between
+        start and end, both included, in order.
+        """
+        for day in self.days(start, end):
+            yield day, self.get(day)
+
+    def query_category(self, categories, start=None, end=None):
+        """Returns the activities of the given categories between start
+        and end, both included.
+
+        Parameters
+        ----------
+        categories: str or iterable(str)
+            A category, or several categories, for instance a category and
+            its aliases.
+        start, end: datetime.date or None
+            The bounds of the range of days, None for unbounded.
+
+        Returns
+        -------
+        activities: list(tuple(datetime.date, ActivityRow))
+            The matching activities with their day, in order.
+        """
+        categories = _category_set(categories)
+        return [
+            (day, row)
+            for day, chronodex in self.iter_range(start, end)
+            for row in chronodex.rows() if row.category in categories
+        ]
+
+    @contextmanager
+    def batch(self):
+        """A context manager grouping the writes made in its block, for
+        backends able to commit them at once.
+        """
+        yield self
+
+    def __contains__(self, day):
+        return self.stamp(day) is not None
+
+    def __len__(self):
+        return len(self.days())
+
+    def close(self):
+        """Releases the resources held by the backend."""
+
+
+class CsvStorage(Storage):
+    """Stores each day in a YYYYMMDD.csv file of the data directory. Days
+    held in YYYYMMDD.txt files are read as well.
+    """
+
+    def __init__(self, directory):
+        """Opens the data directory, scanning it for changes.
+
+        Parameters
+        ----------
+        directory: str
+            The data directory.
+        """
+        self.directory = directory
+        self.index = DataIndex(directory)
+
+    def get(self, day):
+        entry = self.index.get(day)
+        if entry is None:
+            return Chronodex()
+        return read_day(entry)
+
+    def _write(self, day, chronodex):
+        chronodex.to_csv(os.path.join(self.directory, day_filename(day)))
+
+    def put(self, day, chronodex):
+        self._write(day, chronodex)
+        self.index.update(day, 'csv')
+        return self.stamp(day)
+
+    def put_many(self, items):
+        days = []
+        for day, chronodex in items:
+            self._write(day, chronodex)
+            days.append(day)
+        # Persists the index once for the whole batch
+        self.index.update_many(days, 'csv')
+        return {day: self.stamp(day) for day in days}
+
+    def delete(self, day):
+        for entry in self.index.entries(day):
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+        self.index.discard(day)
+
+    def days(self, start=None, end=None):
+        return self.index.days(start, end)
+
+    def stamp(self, day):
+        return self.index.stamp(day)
+
+    def __len__(self):
+        return len(self.index)
+
+
+class SqliteStorage(Storage):
+    """Stores the days in a SQLite database of the data directory, with
+    one row per activity, indexed by day and by category.
+
+    The database is opened in WAL mode, so that other processes, such as
+    the command line interface, can read it while the application writes.
+    Writes are grouped in transactions by :meth:`batch`. The connection is
+    shared by the threads of the application, a batch holding it until its
+    transaction ends, so that the writes of other threads wait rather than
+    join the transaction.
+    """
+
+    def __init__(self, directory, filename=SQLITE_FILENAME):
+        """Opens or creates the database of the given data directory.
+
+        Parameters
+        ----------
+        directory: str
+            The data directory.
+        filename: str
+            The name of the database file, in the data directory.
+        """
+        self.directory = directory
+        self.path = os.path.join(directory, filename)
+        self._lock = threading.RLock()
+        # Depth of nested batch blocks, the outermost one owning the
+        # transaction
+        self._depth = 0
+        self._conn = sqlite3.connect(
+            self.path, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        # Each commit is synced, as the edit journal forgets the days once
+        # they are written. Batches keep the number of commits low.
+        self._conn.execute('PRAGMA synchronous=FULL')
+        version = self._conn.execute('PRAGMA user_version').fetchone()[0]
+        if version > SCHEMA_VERSION:
+            raise ValueError(
+                f"{self.path} has schema version {version}, newer than "
+                f"the supported version {SCHEMA_VERSION}"
+            )
+        with self.batch():
+            for statement in SCHEMA.split(';'):
+                if statement.strip():
+                    self._conn.execute(statement)
+            self._conn.execute(f'PRAGMA user_version={SCHEMA_VERSION}')
+
+    @contextmanager
+    def batch(self):
+        """Groups the writes of the block in a single transaction, rolled
+        back if the block raises. The other threads wait for the end of the
+        block to use the connection.
+        """
+        with self._lock:
+            self._depth += 1
+            if self._depth == 1:
+                self._conn.execute('BEGIN')
+            try:
+                yield self
+            except BaseException:
+                self._end_batch('ROLLBACK')
+                raise
+            self._end_batch('COMMIT')
+
+    def _end_batch(self, statement):
+        # Called with the lock held by the thread owning the batch
+        self._depth -= 1
+        if self._depth == 0:
+            self._conn.execute(statement)
+
+    def _query(self, sql, parameters=()):
+        with self._lock:
+            return self._conn.execute(sql, parameters).fetchall()
+
+    def get(self, day):
+        rows = self._query(
+            'SELECT start, end, name, category, weight FROM activities '
+            'WHERE day = ? ORDER BY row',
+            (day.isoformat(),),
+        )
+        return _make_chronodex(rows)
+
+    def put(self, day, chronodex):
+        key = day.isoformat()
+        stamp = (time.time_ns(), len(chronodex))
+        with self.batch():
+            self._conn.execute('DELETE FROM activities WHERE day = ?', (key,))
+            self._conn.executemany(
+                'INSERT INTO activities VALUES (?, ?, ?, ?, ?, ?, ?)',
+                ((key, ind) + tuple(row)
+                 for ind, row in enumerate(chronodex.rows())),
+            )
+            self._conn.execute(
+                'INSERT OR REPLACE INTO days VALUES (?, ?, ?)',
+                (key,) + stamp,
+            )
+        return stamp
+
+    def delete(self, day):
+        key = day.isoformat()
+        with self.batch():
+            self._conn.execute('DELETE FROM activities WHERE day = ?', (key,))
+            self._conn.execute('DELETE FROM days WHERE day = ?', (key,))
+
+    def days(self, start=None, end=None):
+        where, parameters = _day_range(start, end)
+        rows = self._query(
+            f'SELECT day FROM days {where} ORDER BY day', parameters
+        )
+        return [date.fromisoformat(day) for day, in rows]
+
+    def stamp(self, day):
+        rows = self._query(
+            'SELECT stamp, n_rows FROM days WHERE day = ?', (day.isoformat(),)
+        )
+        return tuple(rows[0]) if rows else None
+
+    def iter_range(self, start=None, end=None):
+        # Reads the range with two queries rather than one per day
+        days = self.days(start, end)
+        where, parameters = _day_range(start, end)
+        rows = self._query(
+            'SELECT day, start, end, name, category, weight FROM activities '
+            f'{where} ORDER BY day, row', parameters,
+        )
+        groups = {
+            key: [row[1:] for row in group]
+            for key, group in groupby(rows, key=lambda row: row[0])
+        }
+        for day in days:
+            yield day, _make_chronodex(groups.get(day.isoformat(), []))
+
+    def query_category(self, categories, start=None, end=None):
+        categories = sorted(_category_set(categories))
+        if not categories:
+            return []
+        where, parameters = _day_range(start, end)
+        placeholders = ', '.join('?' * len(categories))
+        condition = f'category IN ({placeholders})'
+        where = f'{where} AND {condition}' if where else f'WHERE {condition}'
+        rows = self._query(
+            'SELECT day, start, end, name, category, weight FROM activities '
+            f'{where} ORDER BY day, row', parameters + tuple(categories),
+        )
+        return [
+            (date.fromisoformat(row[0]), _make_row(row[1:])) for row in rows
+        ]
+
+    def __len__(self):
+        return self._query('SELECT COUNT(*) FROM days')[0][0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class ArchiveStorage(Storage):
+    """Stores the days of each year in a YYYY.dex archive of the data
+    directory.
+
+    Writing a day appends its block to the archive of its year and syncs it,
+    see serpentime.core.archive. An archive is compacted once its
+    unreferenced blocks outgrow ARCHIVE_COMPACT_SIZE and its referenced
+    ones. The archives are shared by the threads of the application, each
+    access holding them.
+    """
+
+    def __init__(self, directory):
+        """Opens the archives of the data directory as they are needed.
+
+        Parameters
+        ----------
+        directory: str
+            The data directory.
+        """
+        self.directory = directory
+        self._lock = threading.RLock()
+        # {int: Archive}, the archives opened so far by year
+        self._archives = {}
+
+    def _archive(self, year, create=False):
+        """Returns the archive of the given year, or None if it does not
+        exist and create is False.
+        """
+        archive = self._archives.get(year)
+        if archive is None:
+            path = archive_path(self.directory, year)
+            if not create and not os.path.exists(path):
+                return None
+            archive = self._archives[year] = Archive(path, year=year)
+        return archive
+
+    def _years(self, start=None, end=None):
+        """Returns the sorted years of the archives between the years of
+        start and end.
+        """
+        years = set(self._archives)
+        for filename in os.listdir(self.directory):
+            match = ARCHIVE_PATTERN.match(filename)
+            if match:
+                years.add(int(match.group(1)))
+        return sorted(
+            year for year in years
+            if (start is None or year >= start.year)
+            and (end is None or year <= end.year)
+        )
+
+    @staticmethod
+    def _collect(archive):
+        garbage = archive.garbage_size()
+        if garbage > max(ARCHIVE_COMPACT_SIZE, archive.live_size()):
+            archive.compact()
+
+    def get(self, day):
+        with self._lock:
+            archive = self._archive(day.year)
+            chronodex = archive.get(day) if archive is not None else None
+        return chronodex if chronodex is not None else Chronodex()
+
+    def put(self, day, chronodex):
+        return self.put_many([(day, chronodex)])[day]
+
+    def put_many(self, items):
+        by_year = {}
+        for day, chronodex in items:
+            by_year.setdefault(day.year, {})[day] = chronodex
+        stamps = {}
+        with self._lock:
+            for year, days in by_year.items():
+                archive = self._archive(year, create=True)
+                archive.put_many(days.items())
+                self._collect(archive)
+                stamps.update((day, archive.stamp(day)) for day in days)
+        return stamps
+
+    def delete(self, day):
+        with self._lock:
+            archive = self._archive(day.year)
+            if archive is not None and day in archive:
+                archive.delete(day)
+                self._collect(archive)
+
+    def days(self, start=None, end=None):
+        with self._lock:
+            return [
+                day
+                for year in self._years(start, end)
+                for day in self._archive(year).days()
+                if (start is None or day >= start)
+                and (end is None or day <= end)
+            ]
+
+    def stamp(self, day):
+        with self._lock:
+            archive = self._archive(day.year)
+            return archive.stamp(day) if archive is not None else None
+
+    def close(self):
+        with self._lock:
+            for archive in self._archives.values():
+                archive.close()
+            self._archives = {}
+
+
+# Storage backends by name, as given by the "storage" preference
+STORAGE_BACKENDS = {
+    'csv': CsvStorage,
+    'sqlite': SqliteStorage,
+    'archive': ArchiveStorage,
+}
+
+
+def open_storage(directory, backend='csv'):
+    """Opens the storage of the given data directory.
+
+    Parameters
+    ----------
+    directory: str
+        The data directory.
+    backend: str
+        The name of the backend, one of STORAGE_BACKENDS.
+
+    Returns
+    -------
+    storage: Storage
+    """
+    try:
+        storage_class = STORAGE_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(
+            f"Unknown storage backend {backend!r}, expected one of "
+            f"{', '.join(STORAGE_BACKENDS)}"
+        ) from None
+    return storage_class(directory)
+
+
+def copy_storage(source, target, start=None, end=None, overwrite=True,
+                 batch_size=500):
+    """Copies the days of a storage to another one, for instance to move a
+    data directory from the csv to the sqlite backend.
+
+    Parameters
+    ----------
+    source, target: Storage
+        The storages to copy from and to.
+    start, end: datetime.date or None
+        The bounds of the range of days to copy, None for unbounded.
+    overwrite: bool
+        Whether the days already in the target are replaced, or skipped.
+    batch_size: int
+        The number of days written to the target in each batch.
+
+    Returns
+    -------
+    n_days: int
+        The number of days copied.
+    """
+    n_days = 0
+    batch = []
+    for day, chronodex in source.iter_range(start, end):
+        if not overwrite and day in target:
+            continue
+        batch.append((day, chronodex))
+        if len(batch) >= batch_size:
+            target.put_many(batch)
+            n_days += len(batch)
+            batch = []
+    if batch:
+        target.put_many(batch)
+        n_days += len(batch)
+    return n_days
+
+
+def _category_set(categories):
+    if isinstance(categories, str):
+        return {categories}
+    return set(categories)
+
+
+def _day_range(start, end):
+    """Returns the WHERE clause and parameters selecting the days between
+    start and end.
+    """
+    conditions = []
+    parameters = ()
+    if start is not None:
+        conditions.append('day >= ?')
+        parameters += (start.isoformat(),)
+    if end is not None:
+        conditions.append('day <= ?')
+        parameters += (end.isoformat(),)
+    if not conditions:
+        return '', parameters
+    return 'WHERE ' + ' AND '.join(conditions), parameters
+
+
+def _make_row(values):
+    """Returns the ActivityRow of (start, end, name, category, weight)
+    values read from the database, where NULL stands for missing numbers.
+    """
+    start, end, name, category, weight = values
+    if weight is None:
+        weight = MISSING
+    return ActivityRow(start, end, name, category, weight)
+
+
+def _make_chronodex(rows):
+    chronodex = Chronodex()
+    for row in rows:
+        chronodex._append(*row)
+    return chronodex
@@ -0,0 +1,183 @@
+"""A persisted store of per-day summaries of the chronodex files of a data
+directory, to show an overview of many days without reading their files.
+"""
+from collections import namedtuple
+from datetime import date
+import json
+import os
+import threading
+
+from .analytics import covered_hours, day_totals
+from .files import atomic_write
+
+
+# Name of the file holding the persisted summaries, in the data directory
+SUMMARIES_FILENAME = '.serpentime-summaries.json'
+
+# The summary of one day:
+# - hours: the hours spent in valid activities, overlaps counted twice,
+# - covered: the hours covered by at least one valid activity,
+# - categories: {category: hours}, categories not resolved from aliases,
+# - content_hash: the Chronodex.content_hash of the day,
+# - stamp: the Storage.stamp of the day summarized, such as the (mtime,
+#   size) of its file, None if the summary was made from unsaved data.
+DaySummary = namedtuple(
+    'DaySummary', ['hours', 'covered', 'categories', 'content_hash', 'stamp']
+)
+
+
+def summarize_day(chronodex, stamp=None):
+    """Returns the DaySummary of the given Chronodex."""
+    categories, _ = day_totals(chronodex)
+    return DaySummary(
+        sum(categories.values()), covered_hours(chronodex), categories,
+        chronodex.content_hash(), stamp,
+    )
+
+
+class SummaryStore(object):
+    """Holds the DaySummary of the days of a data directory.
+
+    Summaries are updated when days are saved or deleted, and persisted by
+    :meth:`flush`. :meth:`sync` summarizes the day files modified outside
+    of the store, for instance by an import.
+    """
+
+    def __init__(self, directory):
+        """Loads the summaries persisted in the given data directory.
+
+        Parameters
+        ----------
+        directory: str
+            The data directory holding the chronodex files.
+        """
+        self.directory = directory
+        self.path = os.path.join(directory, SUMMARIES_FILENAME)
+        # {datetime.date: DaySummary}
+        self._summaries = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        """Loads the persisted summaries, if any."""
+        try:
+            with open(self.path, 'r') as fi:
+                content = json.load(fi)
+        except (OSError, ValueError):
+            return
+        for key, values in content.items():
+            try:
+                day = date.fromisoformat(key)
+                summary = DaySummary(*values)
+            except (TypeError, ValueError):
+                continue
+            if summary.stamp is not None:
+                summary = summary._replace(stamp=tuple(summary.stamp))
+            self._summaries[day] = summary
+
+    def flush(self):
+        """Persists the summaries, if they changed since the last flush."""
+        with self._lock:
+            if not self._dirty:
+                return
+            content = {
+                day.isoformat(): list(summary)
+                for day, summary in sorted(self._summaries.items())
+            }
+            self._dirty = False
+        with atomic_write(self.path, 'w') as fi:
+            json.dump(content, fi)
+
+    def __contains__(self, day):
+        with self._lock:
+            return day in self._summaries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._summaries)
+
+    def get(self, day):
+        """Returns the DaySummary of the given day, None if it has none."""
+        with self._lock:
+            return self._summaries.get(day)
+
+    def range(self, start, end):
+        """Returns {datetime.date: DaySummary} for the summarized days from
+        start to end, both included.
+        """
+        with self._lock:
+            return {
+                day: summary for day, summary in self._summaries.items()
+                if start <= day <= end
+            }
+
+    def update(self, day, chronodex, stamp=None):
+        """Summarizes the given Chronodex as the content of the given day.
+
+        Parameters
+        ----------
+        day: datetime.date
+            The day of the Chronodex.
+        chronodex: serpentime.core.Chronodex
+            The activities of the day. An empty Chronodex discards the day.
+        stamp: tuple or None
+            The Storage.stamp of the day holding the Chronodex, None if it
+            is not stored yet.
+        """
+        if len(chronodex) == 0:
+            self.discard(day)
+            return
+        summary = summarize_day(chronodex, stamp)
+        with self._lock:
+            if self._summaries.get(day) != summary:
+                self._summaries[day] = summary
+                self._dirty = True
+
+    def discard(self, day):
+        """Forgets the summary of the given day, after it was deleted."""
+        with self._lock:
+            if self._summaries.pop(day, None) is not None:
+                self._dirty = True
+
+    def sync(self, storage, loader, start=None, end=None):
+        """Summarizes the stored days whose content changed since they were
+        summarized, and forgets the days no longer stored.
+
+        Parameters
+        ----------
+        storage: serpentime.core.storage.Storage or DataIndex
+            The storage of the data directory, or any object with the days
+            and stamp methods of a Storage.
+        loader: callable
+            A function taking a datetime.date and returning its Chronodex.
+        start, end: datetime.date or None
+            The bounds of the range of days to synchronize, None for
+            unbounded.
+
+        Returns
+        -------
+        days: list(datetime.date)
+            The days that were summarized again.
+        """
+        days = storage.days(start, end)
+        updated = []
+        for day in days:
+            stamp = storage.stamp(day)
+            summary = self.get(day)
+            if summary is not None and summary.stamp in (stamp, None):
+                # Summaries of unsaved data are newer than the file
+                continue
+            self.update(day, loader(day), stamp)
+            updated.append(day)
+        indexed = set(days)
+        with self._lock:
+            removed = [
+                day for day, summary in self._summaries.items()
+                if day not in indexed and summary.stamp is not None
+                and (start is None or day >= start)
+                and (end is None or day <= end)
+            ]
+        for day in removed:
+            self.discard(day)
+        return updated
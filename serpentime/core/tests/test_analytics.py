@@ -0,0 +1,96 @@
+from unittest import TestCase
+from datetime import date
+import os
+import tempfile
+
+from ..analytics import (
+    RangeSummary, category_aliases, covered_hours, summarize
+)
+from ..chronodex import Activity, Chronodex
+from ..journal import EditJournal
+from ..storage import CsvStorage
+
+
+CATEGORIES = [
+    {'name': 'work', 'color': '#32a84e', 'weight': '6', 'aliases': ['job']},
+    {'name': 'sleep', 'color': '#FFFFFF', 'weight': '4'},
+]
+
+
+class TestAnalytics(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.write_day('20200302.csv', [
+            '0,8,sleep,,4', '9,12,work,report,6', '13,14,job,report,6',
+        ])
+        self.write_day('20200304.csv', ['0,6,sleep,,4', '5,7,work,mail,6'])
+        self.write_day('20200401.csv', ['0,8,sleep,,4'])
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write_day(self, filename, lines):
+        path = os.path.join(self.tmp_dir.name, filename)
+        with open(path, 'w') as fi:
+            fi.write('\n'.join(lines) + '\n')
+
+    def test_category_aliases(self):
+        """Checks that aliases map to their canonical category."""
+        aliases = category_aliases(CATEGORIES)
+        self.assertEqual(aliases['job'], 'work')
+        self.assertEqual(aliases['sleep'], 'sleep')
+
+    def test_covered_hours(self):
+        """Checks that overlapping activities are counted once."""
+        dex = Chronodex([
+            Activity(start=0, end=4), Activity(start=3, end=5),
+            Activity(start=6, end=7), Activity(start=None, end=9),
+        ])
+        self.assertEqual(covered_hours(dex), 6)
+
+    def test_summarize(self):
+        """Checks the totals, daily series and coverage of a range."""
+        # When
+        summary = summarize(
+            self.tmp_dir.name, date(2020, 3, 1), date(2020, 3, 31),
+            categories=CATEGORIES,
+        )
+        # Then
+        self.assertDictEqual(
+            summary.category_totals, {'sleep': 14, 'work': 6}
+        )
+        self.assertDictEqual(
+            summary.name_totals, {'': 14, 'report': 4, 'mail': 2}
+        )
+        self.assertListEqual(
+            summary.daily_series('work')[:5], [0, 4, 0, 2, 0]
+        )
+        self.assertEqual(summary.daily_coverage()[date(2020, 3, 4)], 7 / 24)
+        self.assertAlmostEqual(summary.coverage, 19 / (24 * 31))
+
+    def test_summarize_journal(self):
+        """Checks that the journaled edits are summarized with the stored
+        days.
+        """
+        # Given
+        storage = CsvStorage(self.tmp_dir.name)
+        journal = EditJournal(self.tmp_dir.name)
+        journal.set_field(date(2020, 3, 4), 1, 'end', 9)
+        journal.delete(date(2020, 3, 2))
+        # When
+        summary = summarize(
+            storage, date(2020, 3, 1), date(2020, 3, 31),
+            categories=CATEGORIES, journal=journal,
+        )
+        # Then
+        self.assertDictEqual(summary.category_totals, {'sleep': 6, 'work': 4})
+        self.assertListEqual(list(summary.daily), [date(2020, 3, 4)])
+        journal.close()
+        storage.close()
+
+    def test_empty_range(self):
+        """Checks that a range ending before its start covers nothing."""
+        summary = RangeSummary(date(2020, 3, 31), date(2020, 3, 1))
+        self.assertEqual(summary.coverage, 0)
+        self.assertDictEqual(summary.daily_coverage(), {})
@@ -0,0 +1,104 @@
+from unittest import mock, TestCase
+from datetime import date
+import os
+import tempfile
+
+from .. import storage as storage_module
+from ..archive import Archive, archive_path
+from ..chronodex import Chronodex
+from ..storage import ArchiveStorage
+
+
+THIS_DIR = os.path.dirname(__file__)
+
+
+class TestArchive(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = archive_path(self.tmp_dir.name, 2019)
+        self.dex = Chronodex.from_txt(os.path.join(THIS_DIR, '20191113.txt'))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def get_params(self, dex):
+        return [
+            (act.start, act.end, act.category, act.name, act.weight)
+            for act in dex.activities
+        ]
+
+    def test_round_trip(self):
+        """Checks that a Chronodex is unchanged by an archive round trip."""
+        # When
+        self.dex.to_archive(self.path, date(2019, 11, 13))
+        loaded = Chronodex.from_archive(self.path, date(2019, 11, 13))
+        # Then
+        self.assertListEqual(self.get_params(loaded), self.get_params(self.dex))
+        with self.subTest("Missing days are empty"):
+            missing = Chronodex.from_archive(self.path, date(2019, 11, 14))
+            self.assertEqual(len(missing), 0)
+
+    def test_put_delete_and_compact(self):
+        """Checks that days can be overwritten, deleted and compacted."""
+        # Given
+        day = date(2019, 11, 13)
+        with Archive(self.path, year=2019) as archive:
+            archive.put(day, Chronodex())
+            archive.put(day, self.dex)
+            archive.put(date(2019, 1, 1), self.dex)
+            archive.delete(date(2019, 1, 1))
+            size = os.path.getsize(self.path)
+            # When
+            archive.compact()
+            # Then
+            self.assertLess(os.path.getsize(self.path), size)
+            self.assertListEqual(archive.days(), [day])
+            columns = archive.columns(day)
+            self.assertListEqual(list(columns[0]), list(self.dex.starts))
+            for column in columns:
+                column.release()
+            self.assertListEqual(
+                self.get_params(archive.get(day)), self.get_params(self.dex)
+            )
+
+    def test_put_syncs_blocks_before_index(self):
+        """Checks that the written blocks are synced once, then the index
+        entries pointing to them.
+        """
+        # Given
+        days = [date(2019, 11, 13), date(2019, 11, 14)]
+        with Archive(self.path, year=2019) as archive:
+            # When
+            with mock.patch('os.fsync', wraps=os.fsync) as fsync:
+                archive.put_many((day, self.dex) for day in days)
+            # Then
+            self.assertEqual(fsync.call_count, 2)
+            self.assertListEqual(archive.days(), days)
+            # Only the alignment padding is unreferenced
+            self.assertLess(archive.garbage_size(), 8)
+
+    def test_storage_compaction(self):
+        """Checks that the archive storage compacts an archive once its
+        unreferenced blocks outgrow the referenced ones, changing stamps.
+        """
+        # Given
+        day = date(2019, 11, 13)
+        storage = ArchiveStorage(self.tmp_dir.name)
+        with mock.patch.object(storage_module, 'ARCHIVE_COMPACT_SIZE', 0):
+            stamps = [storage.put(day, self.dex)]
+            size = os.path.getsize(self.path)
+            # When
+            stamps.append(storage.put(day, self.dex))
+        # Then
+        self.assertNotEqual(stamps[0], stamps[1])
+        self.assertEqual(stamps[1][0], 1)
+        self.assertEqual(os.path.getsize(self.path), size)
+        self.assertListEqual(storage.days(), [day])
+        storage.close()
+        storage = ArchiveStorage(self.tmp_dir.name)
+        self.assertEqual(storage.stamp(day), stamps[-1])
+        self.assertListEqual(
+            self.get_params(storage.get(day)), self.get_params(self.dex)
+        )
+        storage.close()
@@ -0,0 +1,62 @@
+from unittest import TestCase, mock
+import os
+import tempfile
+import threading
+
+from ..autosave import DebouncedTrigger
+from ..files import atomic_write
+
+
+class TestDebouncedTrigger(TestCase):
+
+    def test_bursts_are_coalesced(self):
+        """Checks that a burst of triggers runs the action once."""
+        # Given
+        action = mock.Mock()
+        trigger = DebouncedTrigger(action, delay=60)
+        # When
+        for _ in range(5):
+            trigger.trigger()
+        # Then
+        action.assert_not_called()
+        trigger.close()
+        action.assert_called_once_with()
+
+    def test_action_runs_after_delay(self):
+        """Checks that the action runs once the delay elapsed."""
+        # Given
+        done = threading.Event()
+        trigger = DebouncedTrigger(done.set, delay=0.01)
+        # When
+        trigger.trigger()
+        # Then
+        self.assertTrue(done.wait(5))
+        trigger.close()
+
+
+class TestAtomicWrite(TestCase):
+
+    def test_failed_write_keeps_previous_content(self):
+        """Checks that the file is only replaced once fully written."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, '20200301.csv')
+            with atomic_write(path) as fi:
+                fi.write('first')
+            with self.assertRaises(RuntimeError):
+                with atomic_write(path) as fi:
+                    fi.write('second')
+                    raise RuntimeError()
+            with open(path) as fi:
+                self.assertEqual(fi.read(), 'first')
+            self.assertListEqual(os.listdir(directory), ['20200301.csv'])
+
+    def test_directory_is_synced(self):
+        """Checks that the directory is synced once the file is renamed.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, '20200301.csv')
+            with mock.patch('serpentime.core.files.fsync_directory') as sync:
+                with atomic_write(path) as fi:
+                    fi.write('first')
+                    sync.assert_not_called()
+            sync.assert_called_once_with(os.path.abspath(directory))
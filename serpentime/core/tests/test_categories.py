@@ -0,0 +1,44 @@
+from unittest import TestCase
+
+from ..categories import DEFAULT_COLOR, CategoryRegistry
+
+
+class TestCategoryRegistry(TestCase):
+
+    def setUp(self):
+        self.categories = [
+            {'name': 'work', 'color': '#32a84e', 'weight': '6',
+             'aliases': ['job', 'code']},
+            {'name': 'code', 'color': '#e8bd20', 'weight': 'heavy'},
+            {'color': '#000000'},
+        ]
+
+    def test_lookup(self):
+        """Checks that names take precedence over aliases, and that
+        weights are parsed.
+        """
+        # Given
+        registry = CategoryRegistry(self.categories)
+        # Then
+        self.assertListEqual(registry.names, ['work', 'code'])
+        for name, expected in [('work', 'work'), ('job', 'work'),
+                               ('code', 'code'), ('other', 'other')]:
+            with self.subTest(name=name):
+                self.assertEqual(registry.resolve(name), expected)
+        self.assertEqual(registry.get('job').color, '#32a84e')
+        self.assertEqual(registry.weight('job'), 6)
+        self.assertEqual(registry.weight('code', 3), 3)
+        self.assertIsNone(registry.get('other'))
+        self.assertIn('job', registry)
+
+    def test_update(self):
+        """Checks that the registry is only recompiled when the categories
+        change.
+        """
+        # Given
+        registry = CategoryRegistry(self.categories)
+        # When / Then
+        self.assertFalse(registry.update(self.categories))
+        self.categories[1]['color'] = None
+        self.assertTrue(registry.update(self.categories))
+        self.assertEqual(registry.get('code').color, DEFAULT_COLOR)
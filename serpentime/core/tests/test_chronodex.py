@@ -1,7 +1,11 @@
 from unittest import TestCase
+from math import isnan
+import io
 import os
 
-from ..chronodex import Chronodex
+from ..chronodex import (
+    BAD_TYPE, END_BEFORE_START, OUT_OF_RANGE, OVERLAP, Activity, Chronodex
+)
 
 
 THIS_DIR = os.path.dirname(__file__)
@@ -35,3 +39,156 @@ class TestChronodex(TestCase):
             for act in dex.activities
         ]
         self.assertListEqual(params, expected)
+
+    def test_activities_are_views_on_columns(self):
+        """Checks that activities read and write the Chronodex columns."""
+        # Given
+        dex = Chronodex([
+            Activity(start=0, end=2, category='sleep', name='nap'),
+            Activity(start=2, end=3, category='work', name='mail', weight=7),
+        ])
+        # When
+        dex.activities[1].end = 4
+        dex.activities.insert(1, Activity(start=None, category='sleep'))
+        removed = dex.activities.pop(0)
+        # Then
+        self.assertEqual(len(dex), 2)
+        self.assertEqual(removed.name, 'nap')
+        self.assertIsNone(dex.activities[0].start)
+        self.assertFalse(dex.activities[0].is_valid())
+        self.assertTrue(dex.activities[1].is_valid())
+        self.assertTrue(isnan(dex.ends[0]))
+        self.assertEqual(dex.ends[1], 4)
+        self.assertListEqual(dex.categories, ['sleep', 'work'])
+        self.assertEqual(dex.total_duration(), 2)
+
+    def test_validate(self):
+        """Checks the validity mask and reason codes of validate."""
+        # Given
+        dex = Chronodex([
+            Activity(start=0, end=3),
+            Activity(start=2, end=4),
+            Activity(start=None, end=5),
+            Activity(start=6, end=30),
+            Activity(start=9, end=8),
+        ])
+        # When
+        mask, reasons = dex.validate()
+        # Then
+        self.assertListEqual(mask, [True, True, False, False, True])
+        self.assertListEqual(
+            list(reasons),
+            [OVERLAP, OVERLAP, BAD_TYPE, OUT_OF_RANGE, END_BEFORE_START],
+        )
+        with self.subTest("The result is cached until an edit"):
+            self.assertIs(dex.validate(), dex.validate())
+            dex.activities[2].start = 4
+            self.assertListEqual(
+                dex.validate()[0], [True, True, True, False, True]
+            )
+
+    def test_instantiation_from_csv(self):
+        """Checks instantiation from csv content, as path or buffer."""
+        # Given
+        content = b'0.0,2.5,sleep,,4.0\n\n2.5,3,work,"mail, calls",6\n'
+        # When
+        dex = Chronodex.from_csv(io.BytesIO(content))
+        # Then
+        params = [
+            (act.start, act.end, act.category, act.name, act.weight)
+            for act in dex.activities
+        ]
+        expected = [
+            (0, 2.5, 'sleep', '', 4),
+            (2.5, 3, 'work', 'mail, calls', 6),
+        ]
+        self.assertListEqual(params, expected)
+
+    def test_interval_queries(self):
+        """Checks point and range lookups, kept up to date by edits."""
+        # Given
+        dex = Chronodex([
+            Activity(start=8, end=12, name='work'),
+            Activity(start=0, end=7, name='sleep'),
+            Activity(start=13, end=14, name='lunch'),
+        ])
+        # Then
+        self.assertEqual(dex.activity_at(9.5).name, 'work')
+        self.assertIsNone(dex.activity_at(12.5))
+        self.assertListEqual(
+            [act.name for act in dex.overlapping(6, 13.5)],
+            ['work', 'sleep', 'lunch'],
+        )
+        self.assertListEqual(dex.gaps(), [(7, 8), (12, 13), (14, 24)])
+        with self.subTest("The index follows edits"):
+            dex.activities.insert(0, Activity(start=12, end=13, name='walk'))
+            dex.activities[3].end = None
+            del dex.activities[2]
+            self.assertEqual(dex.activity_at(12.5).name, 'walk')
+            self.assertListEqual(
+                [act.name for act in dex.overlapping(0, 24)],
+                ['walk', 'work'],
+            )
+            self.assertListEqual(dex.gaps(), [(0, 8), (13, 24)])
+        with self.subTest("Other fields keep the index"):
+            intervals = dex.intervals
+            dex.activities[0].name = 'stroll'
+            dex.activities[0].category = 'rest'
+            dex.activities[1].weight = 20
+            self.assertIs(dex.intervals, intervals)
+            self.assertListEqual(dex.validate()[0], [True, False, False])
+
+    def test_content_hash(self):
+        """Checks that the content hash only depends on the activities."""
+        # Given
+        dex = Chronodex.from_txt(os.path.join(THIS_DIR, '20191113.txt'))
+        copy = dex.copy()
+        # Then
+        self.assertEqual(dex.content_hash(), copy.content_hash())
+        # When
+        copy.activities[0].name = 'other'
+        # Then
+        self.assertNotEqual(dex.content_hash(), copy.content_hash())
+        self.assertNotEqual(
+            Chronodex().content_hash(), dex.content_hash()
+        )
+
+    def test_getter(self):
+        """Checks that field getters read the same values as the activities,
+        including after edits.
+        """
+        # Given
+        dex = Chronodex.from_txt(os.path.join(THIS_DIR, '20191113.txt'))
+        fields = ['start', 'end', 'weight', 'name', 'category']
+        getters = {field: dex.getter(field) for field in fields}
+        # When
+        dex.activities.insert(1, Activity(start=None, name='new'))
+        dex.activities[0].category = 'other'
+        # Then
+        for field in fields:
+            with self.subTest(field=field):
+                self.assertListEqual(
+                    [getters[field](row) for row in range(len(dex))],
+                    [getattr(activity, field) for activity in dex.activities],
+                )
+        with self.assertRaises(ValueError):
+            dex.getter('duration')
+
+    def test_delete_slice(self):
+        """Checks that deleting a slice of activities keeps the columns and
+        interval queries consistent.
+        """
+        # Given
+        dex = Chronodex([
+            Activity(start=hour, end=hour + 1, name=str(hour))
+            for hour in range(10)
+        ])
+        dex.activity_at(5.5)
+        # When
+        del dex.activities[2:6]
+        del dex.activities[::3]
+        # Then
+        self.assertListEqual(dex.names, ['1', '6', '8', '9'])
+        self.assertListEqual(list(dex.starts), [1, 6, 8, 9])
+        self.assertEqual(dex.activity_at(6.5).name, '6')
+        self.assertIsNone(dex.activity_at(4.5))
@@ -0,0 +1,110 @@
+from unittest import TestCase
+from datetime import date, timedelta
+import os
+import tempfile
+import threading
+
+from ..data_index import DataIndex, day_filename
+
+
+class TestDataIndex(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.directory = self.tmp_dir.name
+        for filename in ['20200301.csv', '20200301.txt', '20200315.txt',
+                         '20200401.csv', '__init__.py', '20201399.csv']:
+            self.touch(filename)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def touch(self, filename):
+        with open(os.path.join(self.directory, filename), 'w') as fi:
+            fi.write('0, 1, work, , 5\n')
+
+    def test_lookup_and_range(self):
+        """Checks day lookups and range queries."""
+        # When
+        index = DataIndex(self.directory)
+        # Then
+        self.assertEqual(len(index), 3)
+        self.assertEqual(index.get(date(2020, 3, 1)).format, 'csv')
+        self.assertEqual(index.get(date(2020, 3, 15)).format, 'txt')
+        self.assertIsNone(index.get(date(2020, 3, 2)))
+        self.assertListEqual(
+            index.days(date(2020, 3, 1), date(2020, 3, 31)),
+            [date(2020, 3, 1), date(2020, 3, 15)],
+        )
+
+    def test_persistence_and_rescan(self):
+        """Checks that the persisted index is reloaded and rescanned."""
+        # Given
+        index = DataIndex(self.directory)
+        self.touch(day_filename(date(2020, 5, 1)))
+        index.update(date(2020, 5, 1))
+        os.remove(os.path.join(self.directory, '20200401.csv'))
+        # When
+        reloaded = DataIndex(self.directory)
+        # Then
+        self.assertIn(date(2020, 5, 1), reloaded)
+        self.assertNotIn(date(2020, 4, 1), reloaded)
+        with self.subTest("Discarded days are forgotten"):
+            for entry in reloaded.entries(date(2020, 3, 1)):
+                os.remove(entry.path)
+            reloaded.discard(date(2020, 3, 1))
+            self.assertListEqual(
+                DataIndex(self.directory).days(),
+                [date(2020, 3, 15), date(2020, 5, 1)],
+            )
+
+    def test_rewritten_in_place(self):
+        """Checks that a file rewritten in place is rescanned, although the
+        listing of the directory did not change.
+        """
+        # Given
+        day = date(2020, 3, 15)
+        stamp = DataIndex(self.directory).stamp(day)
+        # When
+        with open(os.path.join(self.directory, '20200315.txt'), 'a') as fi:
+            fi.write('1, 2, work, , 5\n')
+        # Then
+        index = DataIndex(self.directory)
+        self.assertNotEqual(index.stamp(day), stamp)
+        self.assertEqual(index.get(day).size, 32)
+        self.assertListEqual(
+            [name for name in os.listdir(self.directory)
+             if name.endswith('.tmp')], [],
+        )
+
+    def test_threads(self):
+        """Checks that the index can be read while another thread updates
+        it.
+        """
+        # Given
+        index = DataIndex(self.directory)
+        days = [date(2021, 1, 1) + timedelta(days=ind) for ind in range(200)]
+        for day in days:
+            self.touch(day_filename(day))
+        errors = []
+
+        def update():
+            try:
+                for ind in range(0, len(days), 10):
+                    index.update_many(days[ind:ind + 10])
+            except Exception as error:
+                errors.append(error)
+
+        writer = threading.Thread(target=update)
+        # When
+        writer.start()
+        while writer.is_alive():
+            for day in index.days(date(2021, 1, 1)):
+                self.assertIsNotNone(index.stamp(day))
+        writer.join()
+        # Then
+        self.assertListEqual(errors, [])
+        self.assertListEqual(index.days(date(2021, 1, 1)), days)
+        self.assertListEqual(
+            DataIndex(self.directory).days(date(2021, 1, 1)), days
+        )
@@ -0,0 +1,61 @@
+from unittest import TestCase, mock
+from datetime import date, timedelta
+
+from ..chronodex import Activity, Chronodex
+from ..day_cache import DayCache
+
+
+DAY = date(2020, 3, 1)
+
+
+def load_day(day):
+    """Returns a Chronodex with as many activities as the day of month."""
+    return Chronodex([
+        Activity(start=hour, end=hour + 1) for hour in range(day.day)
+    ])
+
+
+class TestDayCache(TestCase):
+
+    def setUp(self):
+        self.loader = mock.Mock(side_effect=load_day)
+        self.cache = DayCache(self.loader, max_activities=10)
+
+    def tearDown(self):
+        self.cache.close()
+
+    def test_get_caches_copies(self):
+        """Checks that days are loaded once and returned as copies."""
+        # When
+        first = self.cache.get(DAY)
+        first.activities.pop()
+        second = self.cache.get(DAY)
+        # Then
+        self.loader.assert_called_once_with(DAY)
+        self.assertEqual(len(second), 1)
+
+    def test_prefetch_and_invalidate(self):
+        """Checks that prefetched days are served without loading, and
+        that invalidated days are loaded again.
+        """
+        # When
+        self.cache.prefetch([DAY, DAY + timedelta(days=1)])
+        self.cache.get(DAY + timedelta(days=1))
+        self.cache.get(DAY)
+        # Then
+        self.assertEqual(self.loader.call_count, 2)
+        with self.subTest("Invalidated days are reloaded"):
+            self.cache.invalidate(DAY)
+            self.assertNotIn(DAY, self.cache)
+            self.cache.get(DAY)
+            self.assertEqual(self.loader.call_count, 3)
+
+    def test_bounded_size(self):
+        """Checks that least recently used days are evicted."""
+        # When
+        for day in range(1, 6):
+            self.cache.get(date(2020, 3, day))
+        # Then
+        self.assertNotIn(date(2020, 3, 1), self.cache)
+        self.assertNotIn(date(2020, 3, 3), self.cache)
+        self.assertIn(date(2020, 3, 5), self.cache)
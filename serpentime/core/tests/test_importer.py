@@ -0,0 +1,146 @@
+from datetime import date
+from unittest import TestCase
+import csv
+import os
+import tempfile
+
+from ..chronodex import Activity, Chronodex
+from ..data_index import DataIndex
+from ..importer import find_day_files, import_tree
+from ..journal import EditJournal
+from ..storage import SqliteStorage
+
+
+class TestImportTree(TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self._tmp.name, 'source')
+        self.data_dir = os.path.join(self._tmp.name, 'data')
+        os.makedirs(os.path.join(self.source, '2019', 'old'))
+        os.makedirs(self.data_dir)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def write(self, relpath, content):
+        path = os.path.join(self.source, relpath)
+        with open(path, 'w') as fi:
+            fi.write(content)
+        return path
+
+    def test_find_day_files(self):
+        """Checks that csv files are preferred over txt ones for a day."""
+        # Given
+        txt = self.write('20190101.txt', '8, work, 10, code\n')
+        csv = self.write(os.path.join('2019', '20190101.csv'), '')
+        other = self.write(os.path.join('2019', 'old', '20190102.txt'), '')
+        self.write('notes.txt', '')
+        # When
+        files, duplicates = find_day_files(self.source)
+        # Then
+        self.assertDictEqual(files, {
+            date(2019, 1, 1): (csv, 'csv'),
+            date(2019, 1, 2): (other, 'txt'),
+        })
+        self.assertListEqual(duplicates, [txt])
+
+    def test_import_tree(self):
+        """Checks that files are imported as normalized csv files, and that
+        invalid files are reported.
+        """
+        # Given
+        self.write('20190101.txt', '8, work, 10, code\n12, food, 1, lunch\n')
+        self.write(
+            os.path.join('2019', '20190102.csv'),
+            '9, 10, work, code, 10\n10, 12, work, code, 10\n'
+            '30, 40, work, late, 1\n'
+        )
+        bad = self.write(
+            os.path.join('2019', 'old', '20190103.csv'), 'a, b, c, d, e\n'
+        )
+        # When
+        report = import_tree(self.source, self.data_dir, workers=2)
+        # Then
+        self.assertListEqual(
+            report.imported, [date(2019, 1, 1), date(2019, 1, 2)]
+        )
+        self.assertListEqual(list(report.errors), [bad])
+        # The activities are counted once normalized
+        self.assertEqual(report.activities, 3)
+        self.assertEqual(report.invalid, 1)
+        index = DataIndex(self.data_dir)
+        self.assertListEqual(
+            index.days(), [date(2019, 1, 1), date(2019, 1, 2)]
+        )
+        with open(index.get(date(2019, 1, 2)).path, newline='') as fi:
+            self.assertEqual(fi.read(), '9.0,12.0,work,code,10.0\r\n')
+
+    def test_malformed_csv(self):
+        """Checks that a file the csv module cannot read is reported as an
+        error, without aborting the import of the other files.
+        """
+        # Given
+        self.write('20190101.csv', '8, 9, work, code, 10\n')
+        bad = self.write(
+            '20190102.csv',
+            '8, 9, "%s", code, 10\n' % ('x' * (csv.field_size_limit() + 1)),
+        )
+        # When
+        report = import_tree(self.source, self.data_dir, workers=1)
+        # Then
+        self.assertListEqual(report.imported, [date(2019, 1, 1)])
+        self.assertListEqual(list(report.errors), [bad])
+        self.assertIn('row 1', report.errors[bad])
+
+    def test_existing_days_are_skipped(self):
+        """Checks that days of the data directory are only replaced when
+        overwriting.
+        """
+        # Given
+        self.write('20190101.csv', '8, 9, work, code, 10\n')
+        with open(os.path.join(self.data_dir, '20190101.csv'), 'w') as fi:
+            fi.write('1.0,2.0,rest,sleep,1.0\r\n')
+        for overwrite, expected in ((False, 'sleep'), (True, 'code')):
+            with self.subTest(overwrite=overwrite):
+                # When
+                report = import_tree(
+                    self.source, self.data_dir, overwrite=overwrite,
+                    workers=1,
+                )
+                # Then
+                self.assertEqual(len(report.skipped), int(not overwrite))
+                path = os.path.join(self.data_dir, '20190101.csv')
+                with open(path) as fi:
+                    self.assertIn(expected, fi.read())
+
+    def test_import_into_storage(self):
+        """Checks that days are imported through the storage, replacing
+        their journaled edits when overwriting, and skipped otherwise.
+        """
+        # Given
+        days = [date(2019, 1, 1), date(2019, 1, 2)]
+        self.write('20190101.csv', '8, 9, work, code, 10\n')
+        self.write('20190102.csv', '10, 11, food, lunch, 1\n')
+        storage = SqliteStorage(self.data_dir)
+        storage.put(days[0], Chronodex([Activity(1, 2, 'sleep', 'rest', 1)]))
+        journal = EditJournal(self.data_dir)
+        journal.set_field(days[0], 0, 'name', 'nap')
+        journal.insert_row(days[1], 0, Activity(3, 4, 'read', 'rest', 1))
+        for overwrite, expected in ((False, [['nap'], ['read']]),
+                                    (True, [['code'], ['lunch']])):
+            with self.subTest(overwrite=overwrite):
+                # When
+                report = import_tree(
+                    self.source, storage, overwrite=overwrite, workers=1,
+                    journal=journal,
+                )
+                # Then
+                self.assertEqual(len(report.skipped), 0 if overwrite else 2)
+                self.assertListEqual([
+                    chronodex.names
+                    for _, chronodex in journal.iter_range(storage)
+                ], expected)
+        self.assertListEqual(journal.days(), [])
+        journal.close()
+        storage.close()
@@ -0,0 +1,209 @@
+from datetime import date
+from unittest import mock, TestCase
+import os
+import tempfile
+
+from ..chronodex import Activity, Chronodex
+from ..journal import EditJournal
+from ..storage import CsvStorage
+
+
+class TestEditJournal(TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.directory = self._tmp.name
+        self.day = date(2020, 3, 1)
+        # The day files, as {datetime.date: Chronodex}
+        self.files = {}
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def read_file(self, day):
+        return self.files.get(day, Chronodex()).copy()
+
+    def write_day(self, day, chronodex):
+        self.files[day] = chronodex.copy()
+
+    def remove_day(self, day):
+        self.files.pop(day, None)
+
+    def make_chronodex(self):
+        chronodex = Chronodex()
+        chronodex.activities.append(Activity(8, 12, 'code', 'work', 10))
+        chronodex.activities.append(Activity(13, 18, 'meet', 'work', 5))
+        return chronodex
+
+    def test_replay(self):
+        """Checks that journaled edits are applied to the day file, and
+        persist once the journal is reloaded.
+        """
+        # Given
+        self.files[self.day] = self.make_chronodex()
+        journal = EditJournal(self.directory)
+        # When
+        journal.set_field(self.day, 0, 'name', 'review')
+        journal.insert_row(self.day, 1, Activity(12, 13, 'lunch', 'food', 1))
+        journal.remove_row(self.day, 2)
+        journal.close()
+        # Then
+        for journal in (journal, EditJournal(self.directory)):
+            with self.subTest(journal=journal):
+                self.assertIn(self.day, journal)
+                self.assertEqual(len(journal), 3)
+                chronodex = journal.replay(self.day, self.read_file)
+                self.assertListEqual(chronodex.names, ['review', 'lunch'])
+                self.assertListEqual(list(chronodex.starts), [8, 12])
+        self.assertListEqual(self.files[self.day].names, ['code', 'meet'])
+
+    def test_edits_are_synced(self):
+        """Checks that each edit is synced to disk once recorded."""
+        # Given
+        journal = EditJournal(self.directory)
+        # When
+        with mock.patch('os.fsync', wraps=os.fsync) as fsync:
+            journal.set_field(self.day, 0, 'name', 'review')
+            journal.remove_row(self.day, 1)
+        journal.close()
+        # Then
+        self.assertEqual(fsync.call_count, 2)
+
+    def test_remove_rows(self):
+        """Checks that a range of removed rows is journaled as a single
+        operation.
+        """
+        # Given
+        self.files[self.day] = self.make_chronodex()
+        self.files[self.day].activities.append(Activity(19, 20, 'run'))
+        journal = EditJournal(self.directory)
+        # When
+        journal.remove_rows(self.day, 0, 1)
+        journal.remove_rows(self.day, 5, 6)
+        # Then
+        self.assertEqual(len(journal), 2)
+        chronodex = journal.replay(self.day, self.read_file)
+        self.assertListEqual(chronodex.names, ['run'])
+        journal.close()
+
+    def test_remove_ranges(self):
+        """Checks that removed ranges of rows are journaled with a single
+        sync.
+        """
+        # Given
+        self.files[self.day] = self.make_chronodex()
+        self.files[self.day].activities.append(Activity(19, 20, 'run'))
+        self.files[self.day].activities.append(Activity(20, 21, 'read'))
+        journal = EditJournal(self.directory)
+        # When
+        with mock.patch('os.fsync', wraps=os.fsync) as fsync:
+            journal.remove_ranges(self.day, [(3, 3), (0, 1)])
+        journal.close()
+        # Then
+        self.assertEqual(fsync.call_count, 1)
+        journal = EditJournal(self.directory)
+        self.assertEqual(len(journal), 2)
+        chronodex = journal.replay(self.day, self.read_file)
+        self.assertListEqual(chronodex.names, ['run'])
+        journal.close()
+
+    def test_reset_and_delete(self):
+        """Checks that reset and delete operations replace the day file."""
+        # Given
+        self.files[self.day] = self.make_chronodex()
+        journal = EditJournal(self.directory)
+        reset = Chronodex()
+        reset.activities.append(Activity(1, 2, 'sleep', 'rest', 1))
+        # When
+        journal.reset(self.day, reset)
+        # Then
+        chronodex = journal.replay(self.day, self.read_file)
+        self.assertListEqual(chronodex.names, ['sleep'])
+        # When
+        journal.delete(self.day)
+        # Then
+        self.assertEqual(len(journal.replay(self.day, self.read_file)), 0)
+        journal.close()
+
+    def test_iter_range(self):
+        """Checks that the stored days of a range are read with their
+        journaled edits, including the days only journaled, and without the
+        deleted days.
+        """
+        # Given
+        days = [date(2020, 3, day) for day in range(1, 6)]
+        storage = CsvStorage(self.directory)
+        storage.put_many(
+            (day, self.make_chronodex()) for day in days[:2] + days[3:]
+        )
+        journal = EditJournal(self.directory)
+        journal.set_field(days[0], 0, 'name', 'review')
+        journal.delete(days[1])
+        journal.insert_row(days[2], 0, Activity(8, 9, 'run', 'sport', 5))
+        # When
+        names = [
+            (day, chronodex.names)
+            for day, chronodex in journal.iter_range(storage, end=days[3])
+        ]
+        # Then
+        self.assertListEqual(names, [
+            (days[0], ['review', 'meet']),
+            (days[2], ['run']),
+            (days[3], ['code', 'meet']),
+        ])
+        journal.close()
+        storage.close()
+
+    def test_compact(self):
+        """Checks that compaction writes the edited days to their files and
+        empties the journal.
+        """
+        # Given
+        other = date(2020, 3, 2)
+        self.files[self.day] = self.make_chronodex()
+        self.files[other] = self.make_chronodex()
+        journal = EditJournal(self.directory)
+        journal.set_field(self.day, 1, 'end', 17)
+        journal.delete(other)
+        # When
+        days = journal.compact(self.read_file, self.write_day, self.remove_day)
+        # Then
+        self.assertListEqual(days, [self.day, other])
+        self.assertEqual(len(journal), 0)
+        self.assertListEqual(list(self.files[self.day].ends), [12, 17])
+        self.assertNotIn(other, self.files)
+        journal.close()
+        self.assertEqual(len(EditJournal(self.directory)), 0)
+
+    def test_compact_keeps_invalid_activities(self):
+        """Checks that the journal keeps the days with invalid activities,
+        which are not written to files.
+        """
+        # Given
+        journal = EditJournal(self.directory)
+        journal.insert_row(self.day, 0, Activity(8, 12, 'code', 'work', 10))
+        journal.insert_row(self.day, 1, Activity(30, 40, 'late', 'work', 1))
+        # When
+        journal.compact(self.read_file, self.write_day, self.remove_day)
+        # Then
+        self.assertListEqual(self.files[self.day].names, ['code'])
+        self.assertIn(self.day, journal)
+        chronodex = journal.replay(self.day, self.read_file)
+        self.assertListEqual(chronodex.names, ['code', 'late'])
+        journal.close()
+        # Then the day is not written again until it is edited
+        journal = EditJournal(self.directory)
+        with mock.patch.object(self, 'write_day') as write_day:
+            days = journal.compact(
+                self.read_file, write_day, self.remove_day
+            )
+        self.assertListEqual(days, [])
+        write_day.assert_not_called()
+        self.assertIn(self.day, journal)
+        journal.set_field(self.day, 0, 'name', 'review')
+        days = journal.compact(self.read_file, self.write_day, self.remove_day)
+        self.assertListEqual(days, [self.day])
+        self.assertListEqual(self.files[self.day].names, ['review'])
+        chronodex = journal.replay(self.day, self.read_file)
+        self.assertListEqual(chronodex.names, ['review', 'late'])
+        journal.close()
@@ -0,0 +1,116 @@
+from unittest import TestCase
+from datetime import date
+import os
+import tempfile
+
+from ..chronodex import Activity, Chronodex
+from ..journal import EditJournal
+from ..normalize import SPLIT, TRIM, normalize_rows, normalize_storage
+from ..parsers import ActivityRow
+from ..storage import SqliteStorage
+
+
+def row(start, end, name, category='work'):
+    return ActivityRow(start, end, name, category, 5)
+
+
+class TestNormalize(TestCase):
+
+    def test_merge(self):
+        """Checks that contiguous same activities are merged."""
+        # When
+        rows = normalize_rows(
+            [row(1, 2, 'a'), row(0, 1, 'a'), row(2, 3, 'b'), row(3, 4, 'b')]
+        )
+        # Then
+        self.assertListEqual(rows, [row(0, 2, 'a'), row(2, 4, 'b')])
+
+    def test_overlap_policies(self):
+        """Checks the split and trim overlap policies."""
+        # Given
+        rows = [row(8, 12, 'long'), row(9, 10, 'short')]
+        # Then
+        self.assertListEqual(
+            normalize_rows(rows, overlap=SPLIT),
+            [row(8, 9, 'long'), row(9, 10, 'short'), row(10, 12, 'long')],
+        )
+        self.assertListEqual(
+            normalize_rows(rows + [row(11, 13, 'late')], overlap=TRIM),
+            [row(8, 12, 'long'), row(12, 13, 'late')],
+        )
+        for overlap, rows, expected in [
+            (SPLIT, [row(0, 10, 'a'), row(1, 3, 'b'), row(2, 5, 'c')],
+             [row(0, 1, 'a'), row(1, 2, 'b'), row(2, 5, 'c'),
+              row(5, 10, 'a')]),
+            (TRIM, [row(0, 2, 'a'), row(1, 5, 'b'), row(1.5, 4, 'c')],
+             [row(0, 2, 'a'), row(2, 5, 'b')]),
+        ]:
+            with self.subTest(overlap=overlap):
+                # Then the remainders keep the start of their activity
+                self.assertListEqual(
+                    normalize_rows(rows, overlap=overlap), expected
+                )
+
+    def test_fill_gaps(self):
+        """Checks that gaps are filled by extending activities."""
+        rows = normalize_rows(
+            [row(0, 1, 'a'), row(2, 3, 'b')], fill_gaps=True
+        )
+        self.assertListEqual(rows, [row(0, 2, 'a'), row(2, 3, 'b')])
+
+    def test_chronodex_normalize_keeps_invalid_activities(self):
+        """Checks that invalid activities are kept after the others."""
+        # Given
+        dex = Chronodex([
+            Activity(start=None, end=3, name='x'),
+            Activity(start=3, end=4, name='a'),
+            Activity(start=2, end=3, name='a'),
+        ])
+        # When
+        normalized = dex.normalize()
+        # Then
+        self.assertListEqual(
+            [(act.start, act.end, act.name) for act in normalized.activities],
+            [(2, 4, 'a'), (None, 3, 'x')],
+        )
+
+    def test_normalize_directory(self):
+        """Checks that only days that changed are rewritten."""
+        with tempfile.TemporaryDirectory() as directory:
+            for filename, content in [('20200301.csv', '0,1,w,a,5\n'),
+                                      ('20200302.csv', '0,1,w,a,5\n'
+                                                       '1,2,w,a,5\n')]:
+                with open(os.path.join(directory, filename), 'w') as fi:
+                    fi.write(content)
+            # When
+            changed = normalize_storage(directory)
+            # Then
+            self.assertListEqual(changed, [date(2020, 3, 2)])
+            dex = Chronodex.from_csv(os.path.join(directory, '20200302.csv'))
+            self.assertEqual(len(dex), 1)
+
+    def test_normalize_storage(self):
+        """Checks that the days are normalized through the storage, except
+        the days with journaled edits.
+        """
+        days = [date(2020, 3, 1), date(2020, 3, 2)]
+        with tempfile.TemporaryDirectory() as directory:
+            # Given
+            storage = SqliteStorage(directory)
+            split = Chronodex([
+                Activity(start=0, end=1, name='a', category='w'),
+                Activity(start=1, end=2, name='a', category='w'),
+            ])
+            storage.put_many([(day, split) for day in days])
+            stamp = storage.stamp(days[0])
+            journal = EditJournal(directory)
+            journal.insert_row(days[1], 2, Activity(start=2, end=3))
+            # When
+            changed = normalize_storage(storage, journal=journal)
+            # Then
+            self.assertListEqual(changed, [days[0]])
+            self.assertEqual(len(storage.get(days[0])), 1)
+            self.assertNotEqual(storage.stamp(days[0]), stamp)
+            self.assertEqual(len(storage.get(days[1])), 2)
+            journal.close()
+            storage.close()
@@ -0,0 +1,59 @@
+from unittest import TestCase
+import csv
+import os
+
+from ..parsers import (
+    ActivityRow, ChronodexParseError, iter_activities, iter_csv_activities,
+    iter_txt_activities
+)
+
+
+THIS_DIR = os.path.dirname(__file__)
+
+
+class TestParsers(TestCase):
+
+    def test_txt_end_times(self):
+        """Checks that txt end times are taken from the next start."""
+        # When
+        rows = list(iter_txt_activities(b'0, chore, 7, a\n1, , , \n'
+                                        b'3, sleep, x, b\n'))
+        # Then
+        self.assertListEqual(rows, [
+            ActivityRow(0, 3, 'a', 'chore', 7),
+            ActivityRow(3, 24, 'b', 'sleep', 10),
+        ])
+
+    def test_file_objects_and_paths(self):
+        """Checks that paths and open files give the same activities."""
+        # Given
+        path = os.path.join(THIS_DIR, '20191113.txt')
+        # When
+        with open(path, 'rb') as fid:
+            from_binary = list(iter_activities(fid, fmt='txt'))
+            self.assertFalse(fid.closed)
+        with open(path, 'r') as fid:
+            from_text = list(iter_activities(fid, fmt='txt'))
+        # Then
+        self.assertListEqual(from_binary, list(iter_activities(path)))
+        self.assertListEqual(from_text, from_binary)
+
+    def test_bad_rows(self):
+        """Checks that bad rows are reported with their row number."""
+        # Given
+        content = b'0,1,work,,5\n1,2,work\n2,x,work,,5\n'
+        # Then
+        with self.assertRaises(ChronodexParseError) as context:
+            list(iter_csv_activities(content))
+        self.assertEqual(context.exception.row, 3)
+        with self.subTest("Strict mode reports malformed rows"):
+            with self.assertRaises(ChronodexParseError) as context:
+                list(iter_csv_activities(content, strict=True))
+            self.assertEqual(context.exception.row, 2)
+        with self.subTest("Rows the csv module rejects are reported"):
+            content = b'0,1,work,,5\n1,2,"%s",,5\n' % (
+                b'x' * (csv.field_size_limit() + 1)
+            )
+            with self.assertRaises(ChronodexParseError) as context:
+                list(iter_csv_activities(content))
+            self.assertEqual(context.exception.row, 2)
@@ -0,0 +1,100 @@
+from datetime import date
+from unittest import TestCase, mock
+import tempfile
+
+from ..chronodex import Activity, Chronodex
+from ..search import SearchIndex, tokenize
+from ..storage import CsvStorage
+
+
+class TestSearchIndex(TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.directory = self._tmp.name
+        self.days = [date(2020, 3, 1), date(2020, 3, 2)]
+        self.chronodexes = [
+            Chronodex([
+                Activity(start=8, end=12, name='Project X review',
+                         category='work'),
+                Activity(start=12, end=13, name='lunch', category='food'),
+            ]),
+            Chronodex([
+                Activity(start=9, end=10, name='project-y', category='work'),
+                Activity(start=10, end=11, name='x-ray', category='health'),
+            ]),
+        ]
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_tokenize(self):
+        """Checks that text is split in lower case words."""
+        self.assertListEqual(
+            tokenize("Project X, code-review"),
+            ['project', 'x', 'code', 'review'],
+        )
+
+    def test_search(self):
+        """Checks that all the words of a query must match the same
+        activity, as prefixes.
+        """
+        # Given
+        index = SearchIndex(self.directory)
+        for day, chronodex in zip(self.days, self.chronodexes):
+            index.update(day, chronodex)
+        # Then
+        for query, expected in [
+            ('project x', [(self.days[0], [0])]),
+            ('proj', [(self.days[0], [0]), (self.days[1], [0])]),
+            ('WORK x', [(self.days[0], [0])]),
+            ('x', [(self.days[0], [0]), (self.days[1], [1])]),
+            ('lunch work', []),
+            ('', []),
+        ]:
+            with self.subTest(query=query):
+                self.assertListEqual(index.search(query), expected)
+        self.assertListEqual(
+            index.search('project', start=self.days[1]),
+            [(self.days[1], [0])],
+        )
+
+    def test_update_and_persist(self):
+        """Checks that updated and deleted days are reflected in the
+        persisted index.
+        """
+        # Given
+        index = SearchIndex(self.directory)
+        for day, chronodex in zip(self.days, self.chronodexes):
+            index.update(day, chronodex)
+        # When
+        self.chronodexes[0].activities[0].name = 'planning'
+        index.update(self.days[0], self.chronodexes[0])
+        index.discard(self.days[1])
+        index.flush()
+        # Then
+        index = SearchIndex(self.directory)
+        self.assertListEqual(index.search('project'), [])
+        self.assertListEqual(index.search('plan'), [(self.days[0], [0])])
+        self.assertNotIn(self.days[1], index)
+
+    def test_sync(self):
+        """Checks that only the days stored since they were indexed are
+        read.
+        """
+        # Given
+        storage = CsvStorage(self.directory)
+        storage.put_many(zip(self.days, self.chronodexes))
+        index = SearchIndex(self.directory)
+        loader = mock.Mock(side_effect=storage.get)
+        # When
+        index.sync(storage, loader)
+        index.sync(storage, loader)
+        # Then
+        self.assertEqual(loader.call_count, 2)
+        self.assertEqual(len(index.search('work')), 2)
+        # When
+        storage.delete(self.days[0])
+        index.sync(storage, loader)
+        # Then
+        self.assertListEqual(index.search('work'), [(self.days[1], [0])])
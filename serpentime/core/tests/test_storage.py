@@ -0,0 +1,162 @@
+from datetime import date
+from unittest import TestCase
+import os
+import tempfile
+import threading
+
+from ..chronodex import Activity, Chronodex
+from ..storage import (
+    SQLITE_FILENAME, CsvStorage, SqliteStorage, copy_storage, open_storage
+)
+
+
+class TestStorage(TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.directory = self._tmp.name
+        self.days = [date(2020, 3, 1), date(2020, 3, 2), date(2020, 3, 4)]
+        self.chronodexes = [
+            Chronodex([
+                Activity(start=8, end=12, name='code', category='work'),
+                Activity(start=12, end=13, name='lunch', category='food'),
+            ]),
+            Chronodex([
+                Activity(start=9, end=10, name='mail', category='job'),
+            ]),
+            Chronodex(),
+        ]
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def open_storages(self):
+        for backend in ('csv', 'sqlite', 'archive'):
+            directory = os.path.join(self.directory, backend)
+            os.mkdir(directory)
+            yield backend, open_storage(directory, backend)
+
+    def test_put_get_delete(self):
+        """Checks that the backends store, list and delete days."""
+        for backend, storage in self.open_storages():
+            with self.subTest(backend=backend):
+                # When
+                stamps = storage.put_many(zip(self.days, self.chronodexes))
+                # Then
+                self.assertListEqual(storage.days(), self.days)
+                self.assertListEqual(
+                    storage.days(date(2020, 3, 2), date(2020, 3, 3)),
+                    [date(2020, 3, 2)],
+                )
+                for day, chronodex in zip(self.days, self.chronodexes):
+                    self.assertListEqual(
+                        storage.get(day).rows(), chronodex.rows()
+                    )
+                    self.assertEqual(storage.stamp(day), stamps[day])
+                self.assertEqual(len(storage.get(date(2020, 3, 3))), 0)
+                self.assertIsNone(storage.stamp(date(2020, 3, 3)))
+                # When
+                storage.delete(self.days[0])
+                # Then
+                self.assertNotIn(self.days[0], storage)
+                self.assertEqual(len(storage), 2)
+                storage.close()
+
+    def test_range_queries(self):
+        """Checks the range iteration and category queries of the
+        backends.
+        """
+        for backend, storage in self.open_storages():
+            with self.subTest(backend=backend):
+                # Given
+                storage.put_many(zip(self.days, self.chronodexes))
+                # When
+                days = [
+                    (day, chronodex.names)
+                    for day, chronodex in storage.iter_range(
+                        end=date(2020, 3, 10)
+                    )
+                ]
+                matches = storage.query_category(['work', 'job'])
+                # Then
+                self.assertListEqual(days, [
+                    (self.days[0], ['code', 'lunch']),
+                    (self.days[1], ['mail']),
+                    (self.days[2], []),
+                ])
+                self.assertListEqual(
+                    [(day, row.name) for day, row in matches],
+                    [(self.days[0], 'code'), (self.days[1], 'mail')],
+                )
+                self.assertListEqual(
+                    storage.query_category('food', start=self.days[1]), []
+                )
+                storage.close()
+
+    def test_sqlite_batch(self):
+        """Checks that the writes of a failed batch are rolled back, and
+        that the database persists the committed ones.
+        """
+        # Given
+        storage = SqliteStorage(self.directory)
+        storage.put(self.days[0], self.chronodexes[0])
+        # When
+        with self.assertRaises(RuntimeError):
+            with storage.batch():
+                storage.put(self.days[1], self.chronodexes[1])
+                storage.delete(self.days[0])
+                raise RuntimeError()
+        storage.close()
+        # Then
+        self.assertTrue(
+            os.path.exists(os.path.join(self.directory, SQLITE_FILENAME))
+        )
+        storage = SqliteStorage(self.directory)
+        self.assertListEqual(storage.days(), [self.days[0]])
+        self.assertListEqual(
+            storage.get(self.days[0]).names, ['code', 'lunch']
+        )
+        storage.close()
+
+    def test_sqlite_batch_threads(self):
+        """Checks that the writes of another thread wait for the end of a
+        batch, rather than being rolled back with it.
+        """
+        # Given
+        storage = SqliteStorage(self.directory)
+        writer = threading.Thread(
+            target=storage.put, args=(self.days[1], self.chronodexes[1])
+        )
+        # When
+        with self.assertRaises(RuntimeError):
+            with storage.batch():
+                storage.put(self.days[0], self.chronodexes[0])
+                writer.start()
+                writer.join(0.2)
+                # Then
+                self.assertTrue(writer.is_alive())
+                raise RuntimeError()
+        writer.join()
+        self.assertListEqual(storage.days(), [self.days[1]])
+        storage.close()
+
+    def test_copy_storage(self):
+        """Checks that days are copied from the csv to the sqlite backend,
+        keeping the existing days unless asked to overwrite them.
+        """
+        # Given
+        source = CsvStorage(self.directory)
+        source.put_many(zip(self.days, self.chronodexes))
+        target = SqliteStorage(self.directory)
+        target.put(self.days[1], Chronodex())
+        # When
+        n_days = copy_storage(source, target, overwrite=False, batch_size=1)
+        # Then
+        self.assertEqual(n_days, 2)
+        self.assertListEqual(target.days(), self.days)
+        self.assertEqual(len(target.get(self.days[1])), 0)
+        # When
+        copy_storage(source, target)
+        # Then
+        self.assertListEqual(target.get(self.days[1]).names, ['mail'])
+        target.close()
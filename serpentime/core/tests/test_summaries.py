@@ -0,0 +1,66 @@
+from datetime import date
+from unittest import TestCase, mock
+import os
+import tempfile
+
+from ..chronodex import Activity, Chronodex
+from ..data_index import DataIndex
+from ..summaries import SummaryStore
+
+
+class TestSummaryStore(TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.directory = self._tmp.name
+        self.day = date(2020, 3, 1)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_update_and_persist(self):
+        """Checks that saved days are summarized and persisted."""
+        # Given
+        store = SummaryStore(self.directory)
+        dex = Chronodex([
+            Activity(start=8, end=12, name='code', category='work'),
+            Activity(start=10, end=13, name='call', category='work'),
+            Activity(start=30, end=31, name='late', category='work'),
+        ])
+        # When
+        store.update(self.day, dex)
+        store.flush()
+        # Then
+        summary = SummaryStore(self.directory).get(self.day)
+        self.assertEqual(summary.hours, 7)
+        self.assertEqual(summary.covered, 5)
+        self.assertDictEqual(summary.categories, {'work': 7})
+        self.assertEqual(summary.content_hash, dex.content_hash())
+        # When
+        store.update(self.day, Chronodex())
+        # Then
+        self.assertNotIn(self.day, store)
+
+    def test_sync(self):
+        """Checks that only the files modified since they were summarized
+        are read.
+        """
+        # Given
+        path = os.path.join(self.directory, '20200301.csv')
+        with open(path, 'w') as fi:
+            fi.write('8, 12, work, code, 10\n')
+        index = DataIndex(self.directory)
+        store = SummaryStore(self.directory)
+        loader = mock.Mock(side_effect=lambda day: Chronodex.from_csv(path))
+        # When
+        store.sync(index, loader)
+        store.sync(index, loader)
+        # Then
+        loader.assert_called_once_with(self.day)
+        self.assertEqual(store.get(self.day).covered, 4)
+        # When
+        os.remove(path)
+        index.scan()
+        store.sync(index, loader)
+        # Then
+        self.assertNotIn(self.day, store)
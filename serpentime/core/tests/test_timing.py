@@ -0,0 +1,64 @@
+from unittest import TestCase
+import json
+import os
+import tempfile
+
+from ..timing import TimingStats
+
+
+class TestTimingStats(TestCase):
+
+    def test_disabled_stats_record_nothing(self):
+        """Checks that timed functions are only recorded when enabled."""
+        # Given
+        stats = TimingStats()
+
+        @stats.timed('double')
+        def double(value):
+            return 2 * value
+
+        # When
+        result = double(2)
+        with stats.timer('block'):
+            pass
+        # Then
+        self.assertEqual(result, 4)
+        self.assertListEqual(stats.names(), [])
+        self.assertIsNone(stats.last('double'))
+
+    def test_record(self):
+        """Checks the counters and histogram of an operation."""
+        # Given
+        stats = TimingStats(enabled=True)
+        # When
+        for seconds in (0.001, 0.002, 0.004, 0.1):
+            stats.record('load', seconds)
+        # Then
+        load = stats.get('load')
+        self.assertEqual(load.count, 4)
+        self.assertAlmostEqual(load.total, 0.107)
+        self.assertEqual(load.last, 0.1)
+        self.assertEqual(sum(load.buckets), 4)
+        self.assertLessEqual(load.percentile(0.5), 0.004)
+        self.assertGreaterEqual(load.percentile(0.5), 0.002)
+        self.assertEqual(load.percentile(1), 0.1)
+
+    def test_dump(self):
+        """Checks that statistics are written as JSON."""
+        # Given
+        stats = TimingStats(enabled=True)
+
+        @stats.timed('noop')
+        def noop():
+            pass
+
+        noop()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'timings.json')
+            # When
+            stats.dump(path)
+            # Then
+            with open(path) as fi:
+                content = json.load(fi)
+        self.assertListEqual(list(content), ['noop'])
+        self.assertEqual(content['noop']['count'], 1)
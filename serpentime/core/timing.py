@@ -0,0 +1,209 @@
+"""Lightweight timing instrumentation of the load, save and render paths.
+
+Functions decorated with ``STATS.timed(name)`` record their duration in the
+shared TimingStats instance when it is enabled. When it is disabled, the
+decorator only adds one attribute check to each call.
+"""
+from functools import wraps
+import json
+import threading
+import time
+
+from .files import atomic_write
+
+
+# Upper bounds of the histogram buckets, in microseconds: 1us, 2us, 4us...
+# up to about 67s, the last bucket holding anything slower
+N_BUCKETS = 27
+
+
+def _bucket(seconds):
+    """Returns the index of the histogram bucket of a duration."""
+    return min(int(seconds * 1e6).bit_length(), N_BUCKETS - 1)
+
+
+class OperationStats(object):
+    """The call counter and latency histogram of one operation."""
+
+    __slots__ = ('count', 'total', 'min', 'max', 'last', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+        self.last = 0.0
+        self.buckets = [0] * N_BUCKETS
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+        self.last = seconds
+        self.buckets[_bucket(seconds)] += 1
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, ratio):
+        """Returns an upper bound of the given percentile of the durations,
+        in seconds, from the histogram.
+
+        Parameters
+        ----------
+        ratio: float
+            The percentile, between 0 and 1.
+        """
+        if not self.count:
+            return 0.0
+        threshold = ratio * self.count
+        seen = 0
+        for ind, count in enumerate(self.buckets):
+            seen += count
+            if seen >= threshold:
+                return min((1 << ind) * 1e-6, self.max)
+        return self.max
+
+    def to_dict(self):
+        """Returns the statistics as a JSON serializable dictionary, with
+        durations in milliseconds.
+        """
+        return {
+            'count': self.count,
+            'total_ms': self.total * 1e3,
+            'mean_ms': self.mean * 1e3,
+            'min_ms': self.min * 1e3 if self.count else 0.0,
+            'max_ms': self.max * 1e3,
+            'last_ms': self.last * 1e3,
+            'p50_ms': self.percentile(0.5) * 1e3,
+            'p95_ms': self.percentile(0.95) * 1e3,
+            # {upper bound in microseconds: number of calls}
+            'histogram_us': {
+                str(1 << ind): count
+                for ind, count in enumerate(self.buckets) if count
+            },
+        }
+
+
+class _Timer(object):
+    """A context manager recording the duration of its block."""
+
+    __slots__ = ('_stats', '_name', '_start')
+
+    def __init__(self, stats, name):
+        self._stats = stats
+        self._name = name
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stats.record(self._name, time.perf_counter() - self._start)
+
+
+class _NullTimer(object):
+    """The context manager returned when timing is disabled."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class TimingStats(object):
+    """Per-operation call counters and latency histograms."""
+
+    def __init__(self, enabled=False):
+        """Creates empty statistics.
+
+        Parameters
+        ----------
+        enabled: bool
+            Whether durations are recorded.
+        """
+        self.enabled = enabled
+        self._operations = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        """Records one call of the given operation."""
+        with self._lock:
+            operation = self._operations.get(name)
+            if operation is None:
+                operation = self._operations[name] = OperationStats()
+            operation.add(seconds)
+
+    def timer(self, name):
+        """Returns a context manager recording the duration of its block
+        under the given operation name, if enabled.
+        """
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name)
+
+    def timed(self, name):
+        """Returns a decorator recording the duration of each call of the
+        decorated function under the given operation name, if enabled.
+        """
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record(name, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def get(self, name):
+        """Returns the OperationStats of the given operation, or None if it
+        was not recorded.
+        """
+        with self._lock:
+            return self._operations.get(name)
+
+    def last(self, name):
+        """Returns the duration of the last call of the given operation, in
+        seconds, or None if it was not recorded.
+        """
+        operation = self.get(name)
+        return None if operation is None else operation.last
+
+    def names(self):
+        """Returns the sorted names of the recorded operations."""
+        with self._lock:
+            return sorted(self._operations)
+
+    def reset(self):
+        """Forgets all the recorded durations."""
+        with self._lock:
+            self._operations = {}
+
+    def to_dict(self):
+        """Returns {operation name: statistics} as a JSON serializable
+        dictionary.
+        """
+        with self._lock:
+            return {
+                name: operation.to_dict()
+                for name, operation in sorted(self._operations.items())
+            }
+
+    def dump(self, path):
+        """Writes the statistics to a JSON file."""
+        with atomic_write(path, 'w') as fid:
+            json.dump(self.to_dict(), fid, indent=2)
+
+
+# The statistics shared by the instrumented functions
+STATS = TimingStats()
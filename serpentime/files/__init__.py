@@ -0,0 +1,11 @@
+"""Resources of the application: the preferences and the data directory.
+
+Paths are resolved from the package directory rather than through
+pkg_resources, whose import alone noticeably slows down startup.
+"""
+import os
+
+
+FILES_PATH = os.path.dirname(os.path.abspath(__file__))
+PREF_PATH = os.path.join(FILES_PATH, "preferences.json")
+DATA_PATH = os.path.join(FILES_PATH, "data")
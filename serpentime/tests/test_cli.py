@@ -0,0 +1,129 @@
+from contextlib import redirect_stderr, redirect_stdout
+from datetime import date
+from unittest import TestCase
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from ..cli import main
+from ..core.chronodex import Activity
+from ..core.journal import EditJournal
+
+
+class TestCli(TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.data_dir = self._tmp.name
+        with open(os.path.join(self.data_dir, '20200301.csv'), 'w') as fi:
+            fi.write('8, 12, work, code, 10\n12, 13, food, lunch, 3\n')
+        with open(os.path.join(self.data_dir, '20200302.csv'), 'w') as fi:
+            fi.write('9, 11, work, code, 10\n30, 2, work, late, 1\n')
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def run_cli(self, *args):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            code = main(['--data-dir', self.data_dir] + list(args))
+        return code, output.getvalue()
+
+    def test_stats(self):
+        """Checks the hours per category over a range, including the edits
+        of the journal.
+        """
+        # Given
+        journal = EditJournal(self.data_dir)
+        journal.insert_row(
+            date(2020, 3, 3), 0, Activity(14, 15, 'bike', 'sport', 5)
+        )
+        journal.close()
+        # When
+        code, output = self.run_cli('stats', '2020-03-01', '2020-03-31',
+                                    '--json')
+        # Then
+        self.assertEqual(code, 0)
+        self.assertDictEqual(
+            json.loads(output)['hours'], {'work': 6, 'food': 1, 'sport': 1}
+        )
+
+    def test_reversed_range(self):
+        """Checks that a range ending before its start is rejected."""
+        for command in ('stats', 'export', 'validate'):
+            with self.subTest(command=command):
+                errors = io.StringIO()
+                with self.assertRaises(SystemExit) as context:
+                    with redirect_stderr(errors):
+                        self.run_cli(command, '2020-03-31', '2020-03-01')
+                self.assertEqual(context.exception.code, 2)
+                self.assertIn('before the start date', errors.getvalue())
+
+    def test_export(self):
+        """Checks that valid activities are exported with their date and
+        their journaled edits.
+        """
+        # Given
+        journal = EditJournal(self.data_dir)
+        journal.set_field(date(2020, 3, 2), 0, 'name', 'review')
+        journal.insert_row(
+            date(2020, 3, 4), 0, Activity(14, 15, 'bike', 'sport', 5)
+        )
+        journal.close()
+        # When
+        code, output = self.run_cli('export', '--format', 'json')
+        # Then
+        self.assertEqual(code, 0)
+        records = json.loads(output)
+        self.assertListEqual(
+            [(record['date'], record['name']) for record in records],
+            [('2020-03-01', 'code'), ('2020-03-01', 'lunch'),
+             ('2020-03-02', 'review'), ('2020-03-04', 'bike')]
+        )
+
+    def test_validate(self):
+        """Checks that invalid activities are reported."""
+        code, output = self.run_cli('validate')
+        self.assertEqual(code, 1)
+        self.assertIn('2020-03-02 row 2: invalid', output)
+
+    def test_search(self):
+        """Checks that the days of the matching activities are listed."""
+        code, output = self.run_cli('search', 'code', 'work')
+        self.assertEqual(code, 0)
+        self.assertListEqual(output.splitlines(), [
+            '2020-03-01  code', '2020-03-02  code',
+        ])
+        code, output = self.run_cli('search', 'nothing')
+        self.assertEqual(code, 1)
+
+    def test_migrate(self):
+        """Checks that the days are copied to the sqlite storage, and read
+        back from it.
+        """
+        # When
+        code, output = self.run_cli('--backend', 'csv', 'migrate', 'sqlite')
+        # Then
+        self.assertEqual(code, 0)
+        self.assertIn('2 days copied', output)
+        # When
+        code, output = self.run_cli(
+            '--backend', 'sqlite', 'show', '2020-03-01', '--format', 'json'
+        )
+        # Then
+        self.assertListEqual(
+            [record['name'] for record in json.loads(output)],
+            ['code', 'lunch'],
+        )
+
+    def test_does_not_import_qt(self):
+        """Checks that the command line interface does not import PyQt5."""
+        script = (
+            "import sys; import serpentime.cli; "
+            "sys.exit('PyQt5' in sys.modules)"
+        )
+        result = subprocess.run([sys.executable, '-c', script])
+        self.assertEqual(result.returncode, 0)
@@ -1,20 +1,26 @@
-import pkg_resources
-import os
-import csv
 import json
-from datetime import date
+from datetime import date, timedelta
 
+from serpentime.core.autosave import DebouncedTrigger
 from serpentime.core.chronodex import Chronodex
-
+from serpentime.core.day_cache import DayCache
+from serpentime.core.journal import COMPACT_DELAY, EditJournal
+from serpentime.core.search import SearchIndex
+from serpentime.core.storage import open_storage
+from serpentime.core.summaries import SummaryStore
+from serpentime.core.timing import STATS
+from serpentime.files import DATA_PATH, PREF_PATH
+
+from .category_registry import StyledCategoryRegistry
 from .chronodex_graph import ChronodexGraph
 from .chronodex_table_model import ChronodexTableModel
 from .pref_table_model import PrefTableModel
 
 
-PREF_PATH = os.path.join(
-    pkg_resources.resource_filename("serpentime", "files"), "preferences.json"
-)
-DATA_PATH = pkg_resources.resource_filename("serpentime.files", "data")
+# Offsets of the days prefetched around the current date: previous and next
+# day and week, matching the navigation buttons.
+PREFETCH_OFFSETS = [timedelta(days=-1), timedelta(days=1),
+                    timedelta(days=-7), timedelta(days=7)]
 
 
 class AppModel(object):
@@ -25,21 +31,54 @@ class AppModel(object):
         """Initialises the application model by loading today's chronodex.
         If none exists, creates an empty chronodex ready to be edited.
         """
-        self.txt_file_list = []
-        self.csv_file_list = []
-        for fi in os.listdir(DATA_PATH):
-            if fi.endswith('.txt'):
-                self.txt_file_list.append(fi)
-            elif fi.endswith('.csv'):
-                self.csv_file_list.append(fi)
+        self._preferences = self.load_preferences()
+        # Holds the saved days, in day files or in a database according to
+        # the "storage" preference
+        self.storage = open_storage(
+            DATA_PATH, self._preferences.get("storage", "csv")
+        )
+        # Per-day summaries shown by the calendar, kept up to date by saves
+        # and deletions
+        self.summaries = SummaryStore(DATA_PATH)
+        # Index of the words of the activities, kept up to date likewise,
+        # and synchronized with the storage on the first search
+        self.search_index = SearchIndex(DATA_PATH)
+        self._search_synced = False
+        # Edits are journaled when auto save is on. The edits journaled
+        # before a crash are written to their day files here.
+        self.journal = EditJournal(DATA_PATH)
+        self.compact_journal()
+        self.day_cache = DayCache(self.read_chronodex)
+        # Timings of the load, save and render paths, recorded when the
+        # timing overlay is shown
+        self.stats = STATS
+        self.stats.enabled = self.show_timings
+        # Compacts the journal in the background once edits settle
+        self.saver = DebouncedTrigger(
+            self.compact_journal,
+            delay=self._preferences.get("auto_save_delay", COMPACT_DELAY),
+        )
         self._date = date.today()
         self._chronodex = self.get_chronodex(self._date)
-        self._preferences = self.load_preferences()
+        # Whether the journal and day files hold the content of chronodex
+        self._synced = True
+        self.prefetch_neighbours()
         self.pref_table = PrefTableModel(preferences=self._preferences)
+        # Shared by the graph, the table delegates and the analytics
+        self.category_registry = StyledCategoryRegistry(
+            self._preferences.get("categories", [])
+        )
         self.chronodex_graph = ChronodexGraph(
-            self.chronodex, self._preferences
+            self.chronodex, self._preferences, self.category_registry
         )
         self.chronodex_table = ChronodexTableModel(self.chronodex)
+        self.chronodex_table.dataChanged.connect(self.on_activities_edited)
+        self.chronodex_table.activitiesInserted.connect(
+            self.on_activities_inserted
+        )
+        self.chronodex_table.activitiesRemoved.connect(
+            self.on_activities_removed
+        )
 
     @property
     def date(self):
@@ -49,6 +88,8 @@ class AppModel(object):
     def date(self, value):
         self._date = value
         self.chronodex = self.get_chronodex(value)
+        self._synced = True
+        self.prefetch_neighbours()
 
     @property
     def chronodex(self):
@@ -68,6 +109,7 @@ class AppModel(object):
     def preferences(self, value):
         self._preferences = value
         self.pref_table.preferences = self._preferences
+        self.category_registry.update(value.get("categories", []))
         self.chronodex_graph.preferences = self._preferences
 
     @property
@@ -115,12 +157,114 @@ class AppModel(object):
         self._preferences["auto_save"] = value
         self.chronodex_graph.preferences = self._preferences
 
+    @property
+    def show_pref_pane(self):
+        return self._preferences.get("show_pref_pane", True)
+
+    @show_pref_pane.setter
+    def show_pref_pane(self, value):
+        self._preferences["show_pref_pane"] = value
+
+    @property
+    def show_timings(self):
+        return self._preferences.get("show_timings", False)
+
+    @show_timings.setter
+    def show_timings(self, value):
+        self._preferences["show_timings"] = value
+        self.stats.enabled = value
+
     @property
     def categories(self):
-        return [cat['name'] for cat in self.pref_table.categories]
+        return self.category_registry.names
+
+    def on_activities_edited(self, top_left, bottom_right):
+        if self.journal_edit():
+            activities = self.chronodex.activities
+            columns = self.chronodex_table.columns
+            for row in range(top_left.row(), bottom_right.row() + 1):
+                for col in range(top_left.column(), bottom_right.column() + 1):
+                    field = columns[col][1]
+                    value = getattr(activities[row], field)
+                    self.journal.set_field(self._date, row, field, value)
+
+    def on_activities_inserted(self, first, last):
+        self.chronodex_graph.insert_activities(first, last)
+        if self.journal_edit():
+            activities = self.chronodex.activities
+            for row in range(first, last + 1):
+                self.journal.insert_row(self._date, row, activities[row])
+
+    def on_activities_removed(self, ranges):
+        self.chronodex_graph.remove_activity_ranges(ranges)
+        if self.journal_edit():
+            self.journal.remove_ranges(self._date, ranges)
+
+    def journal_edit(self):
+        """Prepares the journaling of an edit of :attr:`chronodex`.
 
+        Returns
+        -------
+        journal: bool
+            Whether the edit should be appended to the journal. It should
+            not if auto save is off, or if the journal missed previous edits
+            and the whole chronodex was journaled instead.
+        """
+        if not self.auto_save:
+            self._synced = False
+            return False
+        self.day_cache.invalidate(self._date)
+        self.saver.trigger()
+        if not self._synced:
+            self.save_chronodex()
+            return False
+        return True
+
+    def prefetch_neighbours(self):
+        """Loads the days around :attr:`date` in the background."""
+        self.day_cache.prefetch(
+            [self._date + offset for offset in PREFETCH_OFFSETS]
+        )
+
+    @STATS.timed('get_chronodex')
     def get_chronodex(self, date):
-        """Returns the Chronodex instances for the given date.
+        """Returns the Chronodex instances for the given date, from the
+        cache of recently visited and prefetched days if possible.
+
+        Parameters
+        ----------
+        date: datetime.Date
+            The date corresponding to the Chronodex to be returned.
+
+        Returns
+        -------
+        chronodex: serpentime.core.Chronodex
+            The Chronodex instance corresponding to the given date.
+        """
+        return self.day_cache.get(date)
+
+    @STATS.timed('read_chronodex')
+    def read_chronodex(self, date):
+        """Reads the Chronodex instances for the given date from the
+        storage and the journal.
+
+        Parameters
+        ----------
+        date: datetime.Date
+            The date corresponding to the Chronodex to be returned.
+
+        Returns
+        -------
+        chronodex: serpentime.core.Chronodex
+            The Chronodex instance corresponding to the given date.
+        """
+        if date in self.journal:
+            return self.journal.replay(date, self.read_stored)
+        return self.read_stored(date)
+
+    def read_stored(self, date):
+        """Reads the Chronodex instances for the given date from the
+        storage.
 
         Parameters
         ----------
@@ -132,14 +276,7 @@ class AppModel(object):
         chronodex: serpentime.core.Chronodex
             The Chronodex instance corresponding to the given date.
         """
-        basename = date.isoformat().replace('-', '')
-        csvname = basename + '.csv'
-        txtname = basename + '.txt'
-        if csvname in self.csv_file_list:
-            return Chronodex.from_csv(os.path.join(DATA_PATH, csvname))
-        elif txtname in self.txt_file_list:
-            return Chronodex.from_txt(os.path.join(DATA_PATH, txtname))
-        return Chronodex()
+        return self.storage.get(date)
 
     def load_chronodex(self, filename):
         """Assigns a Chronodex loaded from the given filename to
@@ -152,37 +289,96 @@ class AppModel(object):
         """
         if filename.endswith(".txt"):
             self.chronodex = Chronodex.from_txt(filename)
+            self._synced = False
         elif filename.endswith(".csv"):
             self.chronodex = Chronodex.from_csv(filename)
+            self._synced = False
 
+    @STATS.timed('save_chronodex')
     def save_chronodex(self):
-        """Saves the chronodex data in a csv file.
+        """Saves the chronodex data.
+
+        The content of the chronodex is appended to the journal, unless
+        its edits were already journaled, and the journal is compacted into
+        the storage in the background once edits settle, see
+        :attr:`saver`.
+        """
+        if not self._synced:
+            self.journal.reset(self._date, self.chronodex)
+            self._synced = True
+        self.day_cache.invalidate(self._date)
+        self.day_cache.put(self._date, self.chronodex)
+        self.summaries.update(self._date, self.chronodex)
+        self.search_index.update(self._date, self.chronodex)
+        self.saver.trigger()
+
+    def compact_journal(self):
+        """Writes the journaled edits to the storage, in a single batch.
+        Called from the saver thread.
+        """
+        self.journal.compact(
+            self.read_stored, self.write_chronodex, self.remove_stored,
+            batch=self.storage.batch,
+        )
+        self.summaries.flush()
+        self.search_index.flush()
+
+    @STATS.timed('write_chronodex')
+    def write_chronodex(self, date, chronodex):
+        """Stores the given Chronodex as the content of the given date."""
+        stamp = self.storage.put(date, chronodex)
+        self.summaries.update(date, chronodex, stamp)
+        self.search_index.update(date, chronodex, stamp)
+
+    def remove_stored(self, date):
+        """Deletes the stored content of the given date."""
+        self.storage.delete(date)
+        self.summaries.discard(date)
+        self.search_index.discard(date)
+
+    def close(self):
+        """Writes the pending saves and stops the background threads."""
+        self.saver.close()
+        self.journal.close()
+        self.day_cache.close()
+        self.summaries.flush()
+        self.search_index.flush()
+        self.storage.close()
+
+    def day_summaries(self, start, end):
+        """Returns {datetime.date: DaySummary} for the days with data from
+        start to end, both included. Only the days stored since they were
+        last summarized are read.
+        """
+        self.summaries.sync(self.storage, self.read_stored, start, end)
+        return self.summaries.range(start, end)
+
+    def search(self, query):
+        """Returns the days holding activities whose name or category
+        match all the words of the given query.
+
+        Returns
+        -------
+        hits: list(serpentime.core.search.SearchHit)
+            The matching days, sorted, with the rows of their matching
+            activities.
         """
-        filename = self._date.isoformat().replace('-', '') + '.csv'
-        with open(os.path.join(DATA_PATH, filename), 'w') as csvfile:
-            writer = csv.writer(csvfile, delimiter=',')
-            for act in self.chronodex.activities:
-                if act.is_valid():
-                    writer.writerow(
-                        [act.start, act.end, act.category,
-                         act.name, act.weight]
-                    )
-        if filename not in self.csv_file_list:
-            self.csv_file_list.append(filename)
+        if not self._search_synced:
+            # Indexes the days stored while the application was closed,
+            # for instance by an import
+            self.search_index.sync(self.storage, self.read_stored)
+            self._search_synced = True
+        return self.search_index.search(query)
 
     def delete_chronodex(self):
-        """Deletes the chronodex file corresponding to :attr:`date`.
+        """Deletes the stored chronodex corresponding to :attr:`date`.
         """
-        basename = self._date.isoformat().replace('-', '')
-        csvname = basename + '.csv'
-        txtname = basename + '.txt'
-        if csvname in self.csv_file_list:
-            os.remove(os.path.join(DATA_PATH, csvname))
-            self.csv_file_list.remove(csvname)
-        if txtname in self.txt_file_list:
-            os.remove(os.path.join(DATA_PATH, txtname))
-            self.txt_file_list.remove(txtname)
+        self.remove_stored(self._date)
+        self.journal.delete(self._date)
+        self.saver.trigger()
+        self.day_cache.invalidate(self._date)
         self.chronodex = Chronodex()
+        self._synced = True
 
     def load_preferences(self):
         """Assigns to :attr:`preferences` the loaded preferences dictionary
@@ -1,20 +1,28 @@
-import pkg_resources
 import os
 from datetime import date, timedelta
 
 from PyQt5.QtWidgets import (
-    QAction, QCalendarWidget, QCheckBox, QDateEdit, QDockWidget, QFileDialog,
-    QGraphicsView, QHBoxLayout, QMainWindow, QMenu, QPushButton, QTableView,
-    QVBoxLayout, QWidget
+    QAction, QCheckBox, QDateEdit, QDockWidget, QFileDialog, QGraphicsView,
+    QHBoxLayout, QHeaderView, QLineEdit, QMainWindow, QMenu, QPushButton,
+    QTableView, QVBoxLayout, QWidget
 )
 from PyQt5.QtCore import QDate, QModelIndex, Qt
 from PyQt5.QtGui import QIcon
 
 from .app_model import AppModel
+from .day_grid import DayGridModel, DayGridView
+from .heatmap_calendar import HeatmapCalendar
 from .item_delegates import ComboBoxDelegate, SpinBoxDelegate
 
 
-ICON_PATH = pkg_resources.resource_filename("serpentime.ui", "icons")
+ICON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "icons")
+# Number of rows measured to size the columns of the activity table
+COLUMN_SAMPLE_SIZE = 50
+# Horizontal margin around the measured cell contents, in pixels
+CELL_MARGIN = 16
+# Maximum number of days listed by the search results menu, most recent
+# first
+MAX_SEARCH_RESULTS = 50
 
 
 class AppView(QMainWindow):
@@ -43,7 +51,7 @@ class AppView(QMainWindow):
 
         # Sets up the table dock pane for the calendar and table
         self.table_dock = QDockWidget(self)
-        self.calendar_widget = QCalendarWidget()
+        self.calendar_widget = HeatmapCalendar(self.model.day_summaries)
         self.calendar_widget.clicked.connect(self.on_date_changed)
         self.table_view = self.create_chronodex_table()
         self.model.chronodex_table.dataChanged.connect(self.on_activity_edited)
@@ -59,8 +67,67 @@ class AppView(QMainWindow):
         self.table_dock.setWidget(right_dock_widget)
         self.addDockWidget(Qt.RightDockWidgetArea, self.table_dock)
 
-        # Sets up the preferences dock pane
+        # Sets up the preferences dock pane. Its content is only built once
+        # the pane is shown, so that a hidden pane does not slow down startup.
         self.pref_dock = QDockWidget(self)
+        self.pref_dock_built = False
+        self.addDockWidget(Qt.LeftDockWidgetArea, self.pref_dock)
+        if self.model.show_pref_pane:
+            self.build_pref_dock()
+        else:
+            self.pref_dock.setVisible(False)
+            self.pref_dock_button.setText("\u25B6")
+
+        # The day grid is only built once shown
+        self.day_grid_dock = None
+        self.day_grid_model = None
+
+        # Sets up menus
+        menubar = self.menuBar()
+        # menubar.setNativeMenuBar(False)
+        view_menu = menubar.addMenu('&View')
+        self.toggle_table_pane_action = QAction(
+            'Table pane', self, checkable=True
+        )
+        self.toggle_table_pane_action.setStatusTip('Calendar and table pane')
+        self.toggle_table_pane_action.setChecked(True)
+        self.toggle_table_pane_action.triggered.connect(self.toogle_table_pane)
+        view_menu.addAction(self.toggle_table_pane_action)
+        self.toggle_pref_pane_action = QAction(
+            'Chronodex pane', self, checkable=True
+        )
+        self.toggle_pref_pane_action.setStatusTip('Preferences pane')
+        self.toggle_pref_pane_action.setChecked(self.model.show_pref_pane)
+        self.toggle_pref_pane_action.triggered.connect(self.toogle_pref_pane)
+        view_menu.addAction(self.toggle_pref_pane_action)
+        self.toggle_day_grid_action = QAction('Day grid', self, checkable=True)
+        self.toggle_day_grid_action.setStatusTip('Thumbnails of all the days')
+        self.toggle_day_grid_action.triggered.connect(self.toggle_day_grid)
+        view_menu.addAction(self.toggle_day_grid_action)
+        view_menu.addSeparator()
+        self.toggle_timings_action = QAction(
+            'Timing overlay', self, checkable=True
+        )
+        self.toggle_timings_action.setStatusTip(
+            'Load and draw timings in the status bar'
+        )
+        self.toggle_timings_action.setChecked(self.model.show_timings)
+        self.toggle_timings_action.triggered.connect(self.toggle_timings)
+        view_menu.addAction(self.toggle_timings_action)
+        dump_timings_action = QAction('Save timings...', self)
+        dump_timings_action.setStatusTip('Save the timing statistics as JSON')
+        dump_timings_action.triggered.connect(self.dump_timings)
+        view_menu.addAction(dump_timings_action)
+        self.update_timing_overlay()
+
+        # Sets general config of UI
+        self.setGeometry(100, 100, 1200, 700)
+        self.setWindowTitle("Serpentime")
+
+        self.show()
+
+    def build_pref_dock(self):
+        """Builds the content of the preferences dock pane."""
         self.add_category_button = QPushButton(
             QIcon(os.path.join(ICON_PATH, "add-black-18dp.svg")), ""
         )
@@ -136,32 +203,14 @@ class AppView(QMainWindow):
         pref_dock_widget = QWidget()
         pref_dock_widget.setLayout(pref_dock_layout)
         self.pref_dock.setWidget(pref_dock_widget)
-        self.addDockWidget(Qt.LeftDockWidgetArea, self.pref_dock)
+        self.pref_dock_built = True
 
-        # Sets up menus
-        menubar = self.menuBar()
-        # menubar.setNativeMenuBar(False)
-        view_menu = menubar.addMenu('&View')
-        self.toggle_table_pane_action = QAction(
-            'Table pane', self, checkable=True
-        )
-        self.toggle_table_pane_action.setStatusTip('Calendar and table pane')
-        self.toggle_table_pane_action.setChecked(True)
-        self.toggle_table_pane_action.triggered.connect(self.toogle_table_pane)
-        view_menu.addAction(self.toggle_table_pane_action)
-        self.toggle_pref_pane_action = QAction(
-            'Chronodex pane', self, checkable=True
-        )
-        self.toggle_pref_pane_action.setStatusTip('Preferences pane')
-        self.toggle_pref_pane_action.setChecked(True)
-        self.toggle_pref_pane_action.triggered.connect(self.toogle_pref_pane)
-        view_menu.addAction(self.toggle_pref_pane_action)
-
-        # Sets general config of UI
-        self.setGeometry(100, 100, 1200, 700)
-        self.setWindowTitle("Serpentime")
-
-        self.show()
+    def closeEvent(self, event):
+        if self.day_grid_model is not None:
+            self.day_grid_model.close()
+        # Writes the pending saves before quitting
+        self.model.close()
+        super().closeEvent(event)
 
     def create_date_navigation_bar(self):
         self.pref_dock_button = QPushButton("\u25C0")
@@ -178,6 +227,10 @@ class AppView(QMainWindow):
         self.next_week_button.clicked.connect(self.on_next_week_clicked)
         self.table_dock_button = QPushButton("\u25B6")
         self.table_dock_button.clicked.connect(self.toogle_table_pane)
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("Search activities")
+        self.search_edit.setClearButtonEnabled(True)
+        self.search_edit.returnPressed.connect(self.on_search)
 
         date_nav_layout = QHBoxLayout()
         date_nav_layout.addWidget(self.pref_dock_button)
@@ -186,6 +239,7 @@ class AppView(QMainWindow):
         date_nav_layout.addWidget(self.date_edit)
         date_nav_layout.addWidget(self.next_day_button)
         date_nav_layout.addWidget(self.next_week_button)
+        date_nav_layout.addWidget(self.search_edit)
         date_nav_layout.addWidget(self.table_dock_button)
 
         return date_nav_layout
@@ -234,7 +288,7 @@ class AppView(QMainWindow):
             end_index, SpinBoxDelegate(table_view, 0.01, 24),
         )
         self.category_delegate = ComboBoxDelegate(
-            table_view, self.model.categories
+            table_view, self.model.category_registry
         )
         table_view.setItemDelegateForColumn(
             self.col_names.index('Category'), self.category_delegate
@@ -245,6 +299,8 @@ class AppView(QMainWindow):
         )
         table_view.setColumnWidth(start_index, 50)
         table_view.setColumnWidth(end_index, 50)
+        # Fixed row heights spare the view from measuring every row
+        table_view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
         use_custom_weight = self.model.preferences.get(
             'use_custom_weight', False
         )
@@ -275,14 +331,39 @@ class AppView(QMainWindow):
         # Saves the chronodex before changing page
         if self.model.auto_save:
             self.save_chronodex()
+        previous_date = self.model.date
         self.model.date = new_date.toPyDate()
+        if self.day_grid_model is not None:
+            self.day_grid_model.refresh(previous_date)
+            self.day_grid_view.scroll_to_day(self.model.date)
+        self.calendar_widget.refresh()
         self.calendar_widget.setSelectedDate(new_date)
         # Disconnect and then reconnect dateChanged to avoid multiple calls
         # to this slot
         self.date_edit.dateChanged.disconnect()
         self.date_edit.setDate(new_date)
         self.date_edit.dateChanged.connect(self.on_date_changed)
-        self.table_view.resizeColumnsToContents()
+        self.resize_table_columns()
+        self.update_timing_overlay()
+
+    def resize_table_columns(self):
+        """Sizes the columns of the activity table to their header and a
+        sample of their rows, as measuring every row stalls on long days.
+        """
+        table = self.model.chronodex_table
+        rows = table.sample_rows(COLUMN_SAMPLE_SIZE)
+        metrics = self.table_view.fontMetrics()
+        for col in range(table.columnCount(None)):
+            title = table.headerData(col, Qt.Horizontal, Qt.DisplayRole)
+            width = metrics.horizontalAdvance(str(title)) + CELL_MARGIN
+            for row in rows:
+                value = table.data(table.index(row, col), Qt.DisplayRole)
+                if value is not None:
+                    width = max(
+                        width,
+                        metrics.horizontalAdvance(str(value)) + CELL_MARGIN,
+                    )
+            self.table_view.setColumnWidth(col, width)
 
     def on_next_day_clicked(self):
         new_date = self.model.date + timedelta(days=1)
@@ -303,11 +384,17 @@ class AppView(QMainWindow):
         )
 
     def on_activity_edited(self, top_left, bottom_right):
-        self.model.chronodex_graph.draw_chronodex()
+        self.model.chronodex_graph.update_activities(
+            top_left.row(), bottom_right.row()
+        )
 
     def on_pref_edited(self, top_left, bottom_right):
         self.model.preferences = self.model.pref_table.preferences
-        self.category_delegate.items = self.model.categories
+        self.on_preferences_changed()
+
+    def on_preferences_changed(self):
+        if self.day_grid_model is not None:
+            self.day_grid_model.preferences = self.model.preferences
 
     def toogle_table_pane(self):
         visible = self.table_dock.isVisible()
@@ -320,28 +407,133 @@ class AppView(QMainWindow):
 
     def toogle_pref_pane(self):
         visible = self.pref_dock.isVisible()
+        if not visible and not self.pref_dock_built:
+            self.build_pref_dock()
         self.pref_dock.setVisible(not visible)
+        self.model.show_pref_pane = not visible
         self.toggle_pref_pane_action.setChecked(not visible)
         if visible:
             self.pref_dock_button.setText("\u25B6")
         else:
             self.pref_dock_button.setText("\u25C0")
 
+    def build_day_grid(self):
+        """Builds the dock pane showing the thumbnails of all the days,
+        from the first one with data to today.
+        """
+        # Reads the days without going through the cache of visited days,
+        # which the grid would otherwise evict
+        self.day_grid_model = DayGridModel(
+            self.model.read_chronodex, self.model.preferences,
+            self.model.category_registry, parent=self,
+        )
+        days = self.model.storage.days()
+        today = date.today()
+        start = days[0] if days else today - timedelta(days=27)
+        self.day_grid_model.set_range(min(start, self.model.date), today)
+        self.day_grid_view = DayGridView(self.day_grid_model)
+        self.day_grid_view.clicked.connect(self.on_day_grid_clicked)
+        self.day_grid_dock = QDockWidget('Days', self)
+        self.day_grid_dock.setWidget(self.day_grid_view)
+        self.addDockWidget(Qt.BottomDockWidgetArea, self.day_grid_dock)
+        self.day_grid_view.scroll_to_day(self.model.date)
+
+    def toggle_day_grid(self):
+        if self.day_grid_dock is None:
+            self.build_day_grid()
+            visible = True
+        else:
+            visible = not self.day_grid_dock.isVisible()
+            self.day_grid_dock.setVisible(visible)
+        self.toggle_day_grid_action.setChecked(visible)
+
+    def on_day_grid_clicked(self, index):
+        day = index.data(Qt.UserRole)
+        self.date_edit.setDate(QDate(day.year, day.month, day.day))
+
+    def on_search(self):
+        """Lists the days matching the search box in a menu, selecting one
+        jumps to that day.
+        """
+        query = self.search_edit.text()
+        hits = self.model.search(query)
+        if not hits:
+            self.statusBar().showMessage(
+                f"No activity matches \"{query}\"", 5000
+            )
+            return
+        menu = QMenu(self)
+        for hit in reversed(hits[-MAX_SEARCH_RESULTS:]):
+            n_rows = len(hit.rows)
+            action = menu.addAction(
+                f"{hit.day.strftime('%a %d %b %Y')}  "
+                f"({n_rows} {'activity' if n_rows == 1 else 'activities'})"
+            )
+            action.triggered.connect(
+                lambda checked, hit=hit: self.show_search_hit(hit)
+            )
+        if len(hits) > MAX_SEARCH_RESULTS:
+            self.statusBar().showMessage(
+                f"{len(hits)} days match, showing the "
+                f"{MAX_SEARCH_RESULTS} most recent", 5000
+            )
+        menu.exec_(
+            self.search_edit.mapToGlobal(self.search_edit.rect().bottomLeft())
+        )
+
+    def show_search_hit(self, hit):
+        """Shows the day of a search hit and selects its first matching
+        activity.
+        """
+        day = hit.day
+        self.date_edit.setDate(QDate(day.year, day.month, day.day))
+        row = hit.rows[0]
+        if row < len(self.model.chronodex):
+            if row >= self.model.chronodex_table.rowCount(None):
+                self.model.chronodex_table.fetch_all()
+            self.table_view.selectRow(row)
+
+    def toggle_timings(self):
+        self.model.show_timings = not self.model.show_timings
+        self.toggle_timings_action.setChecked(self.model.show_timings)
+        if not self.model.show_timings:
+            self.statusBar().clearMessage()
+        self.update_timing_overlay()
+
+    def update_timing_overlay(self):
+        """Shows the load and draw timings of the last displayed chronodex
+        in the status bar, if the timing overlay is enabled.
+        """
+        if not self.model.show_timings:
+            return
+        timings = []
+        for label, name in (('load', 'get_chronodex'),
+                            ('draw', 'draw_chronodex')):
+            last = self.model.stats.last(name)
+            if last is not None:
+                timings.append(f"{label} {last * 1000:.1f} ms")
+        self.statusBar().showMessage(', '.join(timings))
+
+    def dump_timings(self):
+        filename, _ = QFileDialog.getSaveFileName(
+            self, "Save timings", "serpentime-timings.json",
+            "JSON files (*.json)"
+        )
+        if filename:
+            self.model.stats.dump(filename)
+
     def add_activity(self):
         selected = self.table_view.selectedIndexes()
         row_indexes = [ind.row() for ind in selected]
         if len(row_indexes) > 0:
             pos = max(row_indexes) + 1
         else:
-            pos = self.model.chronodex_table.rowCount(None)
+            pos = len(self.model.chronodex)
         self.model.chronodex_table.insertRows(pos, 1, QModelIndex())
 
     def remove_selected_activities(self):
         selected = self.table_view.selectedIndexes()
-        row_indexes = reversed(sorted(set([ind.row() for ind in selected])))
-        for ind in row_indexes:
-            self.model.chronodex_table.removeRow(ind, QModelIndex())
-        self.model.chronodex_graph.draw_chronodex()
+        self.model.chronodex_table.remove_rows(ind.row() for ind in selected)
 
     def load_chronodex(self):
         filename, _ = QFileDialog.getOpenFileName(
@@ -356,6 +548,9 @@ class AppView(QMainWindow):
 
     def delete_chronodex(self):
         self.model.delete_chronodex()
+        self.calendar_widget.refresh()
+        if self.day_grid_model is not None:
+            self.day_grid_model.refresh(self.model.date)
 
     def add_category(self):
         selected = self.pref_table_view.selectedIndexes()
@@ -368,26 +563,29 @@ class AppView(QMainWindow):
 
     def remove_selected_categories(self):
         selected = self.pref_table_view.selectedIndexes()
-        row_indexes = reversed(sorted(set([ind.row() for ind in selected])))
-        for ind in row_indexes:
-            self.model.pref_table.removeRow(ind, QModelIndex())
-        self.model.chronodex_graph.draw_chronodex()
+        self.model.pref_table.remove_rows(ind.row() for ind in selected)
+        self.model.preferences = self.model.pref_table.preferences
+        self.on_preferences_changed()
 
     def save_preferences(self):
         self.model.save_preferences()
 
     def set_show_labels(self, state):
         self.model.show_labels = state == Qt.Checked
+        self.on_preferences_changed()
         self.rotate_checkbox.setEnabled(self.model.show_labels)
 
     def set_activity_name_rotation(self, state):
         self.model.rotate_labels = state == Qt.Checked
+        self.on_preferences_changed()
 
     def set_show_overlay(self, state):
         self.model.show_overlay = state == Qt.Checked
+        self.on_preferences_changed()
 
     def set_custom_weight(self, state):
         self.model.use_custom_weight = state == Qt.Checked
+        self.on_preferences_changed()
         self.table_view.setColumnHidden(
             self.col_names.index('Weight'), not self.model.use_custom_weight
         )
@@ -418,5 +616,5 @@ class AppView(QMainWindow):
         if len(row_indexes) > 0:
             pos = min(row_indexes)
         else:
-            pos = self.model.chronodex_table.rowCount(None)
+            pos = len(self.model.chronodex)
         self.model.chronodex_table.insertRows(pos, 1, QModelIndex())
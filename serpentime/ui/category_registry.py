@@ -0,0 +1,29 @@
+from PyQt5.QtGui import QBrush, QColor
+
+from serpentime.core.categories import DEFAULT_COLOR, CategoryRegistry
+
+
+class StyledCategoryRegistry(CategoryRegistry):
+    """A CategoryRegistry also holding the QColor and QBrush of each
+    category, parsed once per change of the categories.
+    """
+
+    def _compile(self):
+        self.default_color = QColor(DEFAULT_COLOR)
+        self.default_brush = QBrush(self.default_color)
+        self._colors = {}
+        self._brushes = {}
+        for name, cat in self._lookup.items():
+            if cat.name not in self._colors:
+                self._colors[cat.name] = QColor(cat.color)
+                self._brushes[cat.name] = QBrush(self._colors[cat.name])
+            self._colors[name] = self._colors[cat.name]
+            self._brushes[name] = self._brushes[cat.name]
+
+    def color(self, name):
+        """Returns the QColor of the given category name or alias."""
+        return self._colors.get(name, self.default_color)
+
+    def brush(self, name):
+        """Returns the QBrush of the given category name or alias."""
+        return self._brushes.get(name, self.default_brush)
@@ -1,7 +1,13 @@
+from copy import deepcopy
+import json
 from math import cos, pi, sin
 
 from PyQt5.QtWidgets import QGraphicsScene
-from PyQt5.QtGui import QBrush, QColor, QFont, QPen
+from PyQt5.QtGui import QColor, QFont, QPen
+
+from serpentime.core.timing import STATS
+
+from .category_registry import StyledCategoryRegistry
 
 
 # Conversion factor for angle, from degree to radian
@@ -18,11 +24,30 @@ WINDOW_SIZE = 600
 # The minimal radius of an activity wedge, as a fraction of window size
 MIN_WEDGE_SIZE_FRACTION = 1/12
 
+# Z value added to the row of an activity to stack its label, keeping the
+# labels above all the wedges
+LABEL_Z = 1e6
+
+# Preferences changing the way activities are drawn
+ACTIVITY_PREFERENCES = [
+    "categories", "show_labels", "rotate_labels", "use_custom_weight"
+]
+
+
+def drawn_preferences_key(preferences):
+    """Returns a string identifying the preferences affecting the drawing,
+    to know whether a drawing made with other preferences is outdated.
+    """
+    keys = ACTIVITY_PREFERENCES + ["show_overlay"]
+    return json.dumps(
+        {key: preferences.get(key) for key in keys}, sort_keys=True
+    )
+
 
 class ChronodexGraph(QGraphicsScene):
     """A graphical representation of the Chronodex."""
 
-    def __init__(self, chronodex, preferences):
+    def __init__(self, chronodex, preferences, categories=None):
         """Handles the chronodex graphical design.
 
         Parameters
@@ -32,11 +57,21 @@ class ChronodexGraph(QGraphicsScene):
         preferences: dict
             A dictionary holding the settings for the chronodex graphical
             representation (color and weight for the activities, etc...).
+        categories: StyledCategoryRegistry or None
+            The compiled categories of the preferences, shared with the
+            other views. If None, the graph compiles its own.
         """
         super().__init__()
         self._chronodex = chronodex
         self._preferences = preferences
-        self.categories = self.get_categories()
+        if categories is None:
+            categories = StyledCategoryRegistry()
+        self.categories = categories
+        self.categories.update(preferences.get('categories', []))
+        self._drawn_preferences = self.get_drawn_preferences()
+        self.overlay_circles = []
+        self.activity_wedges = []
+        self.activity_labels = []
 
         self.setSceneRect(0, 0, WINDOW_SIZE, WINDOW_SIZE)
         self.center_pos = self.sceneRect().center()
@@ -58,15 +93,55 @@ class ChronodexGraph(QGraphicsScene):
 
     @preferences.setter
     def preferences(self, value):
+        """Sets the preferences, redrawing only what they change."""
         self._preferences = value
-        self.categories = self.get_categories()
-        self.draw_chronodex()
+        drawn_preferences = self.get_drawn_preferences()
+        previous = self._drawn_preferences
+        self._drawn_preferences = drawn_preferences
+        if drawn_preferences == previous:
+            return
+        if drawn_preferences["categories"] != previous["categories"]:
+            self.categories.update(self._preferences.get('categories', []))
+        overlay_only = all(
+            drawn_preferences[key] == previous[key]
+            for key in ACTIVITY_PREFERENCES
+        )
+        if overlay_only:
+            self.draw_overlay()
+        else:
+            self.draw_chronodex()
 
+    def get_drawn_preferences(self):
+        """Returns a copy of the preferences affecting the drawing, to
+        detect which of them changed since the last drawing.
+        """
+        keys = ACTIVITY_PREFERENCES + ["show_overlay"]
+        return deepcopy({key: self._preferences.get(key) for key in keys})
+
+    @STATS.timed('draw_chronodex')
     def draw_chronodex(self):
         """Redraws the chronodex graph.
         """
         self.clear()
+        self.overlay_circles = []
+        self.draw_overlay()
 
+        self.activity_wedges = []
+        self.activity_labels = []
+        mask, _ = self._chronodex.validate()
+        for activity, valid in zip(self._chronodex.activities, mask):
+            wedge, label = self.add_activity_wedge(activity, valid)
+            self.activity_wedges.append(wedge)
+            self.activity_labels.append(label)
+        self.stack_activities(0, len(self.activity_wedges) - 1)
+
+    def draw_overlay(self):
+        """Draws or removes the overlay circles, according to
+        :attr:`preferences`.
+        """
+        for circ in self.overlay_circles:
+            self.removeItem(circ)
+        self.overlay_circles = []
         if self.preferences.get("show_overlay", False):
             for frac in [2, 4, 6, 8, 10]:
                 size = frac * MIN_WEDGE_SIZE_FRACTION * WINDOW_SIZE
@@ -74,15 +149,84 @@ class ChronodexGraph(QGraphicsScene):
                 circ = self.addEllipse(x, y, size, size)
                 circ.setPos(self.center_pos - circ.boundingRect().center())
                 circ.setPen(QPen(QColor("grey")))
+                # Keeps the circles behind the wedges
+                circ.setZValue(-1)
+                self.overlay_circles.append(circ)
 
-        self.activity_wedges = []
-        self.activity_labels = []
-        for activity in self._chronodex.activities:
-            wedge, label = self.add_activity_wedge(activity)
-            self.activity_wedges.append(wedge)
-            self.activity_labels.append(label)
+    def stack_activities(self, first, last):
+        """Stacks the items of the activities from row first to row last,
+        both included, by row, as drawn by a full redraw. Items redrawn or
+        inserted later would otherwise be stacked on top.
+        """
+        for row in range(first, last + 1):
+            wedge = self.activity_wedges[row]
+            label = self.activity_labels[row]
+            if wedge is not None:
+                wedge.setZValue(row)
+            if label is not None:
+                label.setZValue(LABEL_Z + row)
+
+    def remove_activity_items(self, row):
+        """Removes from the scene the wedge and label of the activity
+        at the given row.
+        """
+        for item in (self.activity_wedges[row], self.activity_labels[row]):
+            if item is not None:
+                self.removeItem(item)
+
+    def update_activities(self, first, last):
+        """Redraws the activities from row first to row last, both
+        included, after they were edited.
+        """
+        mask, _ = self._chronodex.validate()
+        activities = self._chronodex.activities
+        for row in range(first, last + 1):
+            self.remove_activity_items(row)
+            wedge, label = self.add_activity_wedge(activities[row], mask[row])
+            self.activity_wedges[row] = wedge
+            self.activity_labels[row] = label
+        self.stack_activities(first, last)
+
+    def insert_activities(self, first, last):
+        """Draws the activities inserted from row first to row last, both
+        included.
+        """
+        mask, _ = self._chronodex.validate()
+        activities = self._chronodex.activities
+        for row in range(first, last + 1):
+            wedge, label = self.add_activity_wedge(activities[row], mask[row])
+            self.activity_wedges.insert(row, wedge)
+            self.activity_labels.insert(row, label)
+        self.stack_activities(first, len(self.activity_wedges) - 1)
+
+    def remove_activity_ranges(self, ranges):
+        """Removes the items of the activities removed in the given ranges
+        of rows, in a single pass over the items.
 
-    def add_activity_wedge(self, activity):
+        Parameters
+        ----------
+        ranges: list(tuple(int, int))
+            The (first, last) rows of each range, both included, as
+            numbered before any removal.
+        """
+        removed = set()
+        for first, last in ranges:
+            for row in range(first, last + 1):
+                self.remove_activity_items(row)
+                removed.add(row)
+        self.activity_wedges = [
+            wedge for row, wedge in enumerate(self.activity_wedges)
+            if row not in removed
+        ]
+        self.activity_labels = [
+            label for row, label in enumerate(self.activity_labels)
+            if row not in removed
+        ]
+        if ranges:
+            first = min(first for first, _ in ranges)
+            self.stack_activities(first, len(self.activity_wedges) - 1)
+
+    def add_activity_wedge(self, activity, valid=None):
         """Draws and returns the wedge corresponding to the given
         Activity instance.
 
@@ -90,6 +234,9 @@ class ChronodexGraph(QGraphicsScene):
         ----------
         activity: serpentime.core.Activity
             The activity to be sketched in the Chronodex.
+        valid: bool or None
+            Whether the activity is valid, as given by the mask of
+            Chronodex.validate. If None, Activity.is_valid() is called.
 
         Returns
         -------
@@ -102,23 +249,26 @@ class ChronodexGraph(QGraphicsScene):
         """
         wedge = None
         text = None
-        if activity.is_valid():
-            category_prefs = self.categories.get(activity.category, {})
+        if valid is None:
+            valid = activity.is_valid()
+        if valid:
             if self.preferences.get("use_custom_weight", False):
                 weight = activity.weight
             else:
-                weight = float(category_prefs.get('weight', activity.weight))
+                weight = self.categories.weight(
+                    activity.category, activity.weight
+                )
             size = weight * MIN_WEDGE_SIZE_FRACTION * WINDOW_SIZE
             wedge = self.addEllipse(0, 0, size, size)
-            color = category_prefs.get('color', "#FFFFFF")
-            wedge.setBrush(QBrush(QColor(color)))
+            wedge.setBrush(self.categories.brush(activity.category))
             wedge.setPos(self.center_pos - wedge.boundingRect().center())
 
             start, end = (activity.start, activity.end)
             start_angle = START_ANGLE - start * MIN_WEDGE_ANGLE
             span_angle = -MIN_WEDGE_ANGLE * (end - start)
-            wedge.setStartAngle(start_angle)
-            wedge.setSpanAngle(span_angle)
+            # Qt angles are integers, in sixteenths of a degree
+            wedge.setStartAngle(round(start_angle))
+            wedge.setSpanAngle(round(span_angle))
 
             text = None
             if self.preferences.get("show_labels", False):
@@ -137,8 +287,6 @@ class ChronodexGraph(QGraphicsScene):
                     if activity.start >= 12:
                         rot_angle += 180
                     text.setRotation(rot_angle)
-                # Brings the label to front, on top of wedges
-                text.setZValue(1)
                 # Sets text bold and grey
                 font = QFont()
                 font.setBold(True)
@@ -146,21 +294,3 @@ class ChronodexGraph(QGraphicsScene):
                 text.setDefaultTextColor(QColor("grey"))
 
         return wedge, text
-
-    def get_categories(self):
-        """Returns a dictionary mapping activities' categories' names to
-        a dictionary containing the settings for these categories, based
-        on the preferences stored in :attr:`preferences`.
-
-        Returns
-        -------
-        categories: dict
-            A dictionary of type
-            {category_name: {'color': '#FFFFFF', 'weight': 5, 'aliases': []}}.
-        """
-        categories = {}
-        for cat in self._preferences.get('categories', []):
-            categories[cat['name']] = {
-                key: val for key, val in cat.items() if key != 'name'
-            }
-        return categories
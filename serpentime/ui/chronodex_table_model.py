@@ -1,7 +1,9 @@
-from PyQt5.QtCore import QAbstractTableModel, Qt
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt, pyqtSignal
 
 from serpentime.core.chronodex import Activity
 
+from .row_ranges import contiguous_ranges
+
 
 COLUMNS = [
     ('Start', 'start'),
@@ -11,14 +13,34 @@ COLUMNS = [
     ('Weight', 'weight'),
 ]
 
+# Number of rows exposed to the views at a time. Further rows are exposed
+# by fetchMore as the views scroll to them.
+FETCH_BATCH = 256
+# Number of ranges of rows above which a removal resets the model, rather
+# than notifying the views of each range
+MAX_REMOVED_RANGES = 32
+
 
 class ChronodexTableModel(QAbstractTableModel):
-    """A model for the table of activities constituting the Chronodex."""
+    """A model for the table of activities constituting the Chronodex.
+
+    Rows are exposed to the views in batches through canFetchMore and
+    fetchMore, so that views of long days only lay out the rows they show.
+    Activities inserted or removed through the model, as opposed to rows
+    exposed by fetchMore, are reported by activitiesInserted and
+    activitiesRemoved, once per edit.
+    """
+
+    # Emitted with the first and last rows of inserted activities
+    activitiesInserted = pyqtSignal(int, int)
+    # Emitted with the (first, last) rows of the ranges of removed
+    # activities, in decreasing order, see remove_rows
+    activitiesRemoved = pyqtSignal(list)
 
     def __init__(self, chronodex):
         super().__init__()
-        self._chronodex = chronodex
         self.columns = COLUMNS
+        self._set_chronodex(chronodex)
 
     @property
     def chronodex(self):
@@ -26,16 +48,39 @@ class ChronodexTableModel(QAbstractTableModel):
 
     @chronodex.setter
     def chronodex(self, value):
-        self.layoutAboutToBeChanged.emit()
+        self.beginResetModel()
+        self._set_chronodex(value)
+        self.endResetModel()
+
+    def _set_chronodex(self, value):
         self._chronodex = value
-        # Refreshes the table
-        self.layoutChanged.emit()
+        # Reads the cells from the Chronodex columns without creating
+        # Activity views
+        self._getters = [value.getter(field) for _, field in self.columns]
+        self._loaded = min(len(value), FETCH_BATCH)
+
+    def canFetchMore(self, index):
+        return self._loaded < len(self._chronodex)
+
+    def fetchMore(self, index):
+        self._fetch(self._loaded + FETCH_BATCH)
+
+    def _fetch(self, count):
+        """Exposes the first count rows, if not already exposed."""
+        count = min(count, len(self._chronodex))
+        if count <= self._loaded:
+            return
+        self.beginInsertRows(QModelIndex(), self._loaded, count - 1)
+        self._loaded = count
+        self.endInsertRows()
+
+    def fetch_all(self):
+        """Exposes all the rows to the views."""
+        self._fetch(len(self._chronodex))
 
     def data(self, index, role):
         if role == Qt.DisplayRole or role == Qt.EditRole:
-            activity = self.chronodex.activities[index.row()]
-            attr_name = self.columns[index.column()][1]
-            return getattr(activity, attr_name)
+            return self._getters[index.column()](index.row())
 
     def setData(self, index, value, role):
         if role == Qt.EditRole:
@@ -51,6 +96,8 @@ class ChronodexTableModel(QAbstractTableModel):
         return False
 
     def insertRows(self, pos, count, index):
+        # Rows can only be inserted next to exposed rows
+        self._fetch(pos)
         self.beginInsertRows(index, pos, pos + count - 1)
         for ind in range(pos, pos + count):
             start = None
@@ -61,16 +108,49 @@ class ChronodexTableModel(QAbstractTableModel):
                 if prev_end is not None:
                     start = prev_end
             self.chronodex.activities.insert(ind, Activity(start=start))
+        self._loaded += count
         self.endInsertRows()
+        self.activitiesInserted.emit(pos, pos + count - 1)
         return True
 
     def removeRows(self, pos, count, index):
-        self.beginRemoveRows(index, pos, pos + count - 1)
-        for ind in range(pos, pos + count):
-            self.chronodex.activities.pop(pos)
-        self.endRemoveRows()
+        self.remove_rows(range(pos, pos + count))
         return True
 
+    def remove_rows(self, rows):
+        """Removes the activities at the given rows, with one model
+        transaction per range of contiguous rows.
+
+        Parameters
+        ----------
+        rows: iterable(int)
+            The rows to remove, in any order.
+
+        Returns
+        -------
+        ranges: list(tuple(int, int))
+            The (first, last) rows of the removed ranges, in decreasing
+            order.
+        """
+        ranges = contiguous_ranges(rows)
+        if not ranges:
+            return ranges
+        activities = self.chronodex.activities
+        reset = len(ranges) > MAX_REMOVED_RANGES
+        if reset:
+            self.beginResetModel()
+        for first, last in ranges:
+            if not reset:
+                self.beginRemoveRows(QModelIndex(), first, last)
+            del activities[first:last + 1]
+            self._loaded -= last - first + 1
+            if not reset:
+                self.endRemoveRows()
+        if reset:
+            self.endResetModel()
+        self.activitiesRemoved.emit(ranges)
+        return ranges
+
     def flags(self, index):
         return Qt.ItemIsEditable | Qt.ItemIsEnabled | Qt.ItemIsSelectable
 
@@ -80,7 +160,16 @@ class ChronodexTableModel(QAbstractTableModel):
         return super().headerData(section, orientation, role)
 
     def rowCount(self, index):
-        return len(self.chronodex.activities)
+        return self._loaded
 
     def columnCount(self, index):
         return len(self.columns)
+
+    def sample_rows(self, count):
+        """Returns up to count exposed rows spread evenly over the table,
+        including the first and last ones.
+        """
+        if self._loaded <= count:
+            return list(range(self._loaded))
+        step = (self._loaded - 1) / (count - 1)
+        return sorted({round(ind * step) for ind in range(count)})
@@ -0,0 +1,262 @@
+"""A grid of chronodex thumbnails, one per day, to browse weeks, months or
+years of history.
+
+Each day is rendered once by a single shared scene to a QPixmap, cached
+under the hash of the day's activities and the drawing preferences. Days
+are loaded in a background thread, most recently requested first, so that
+the tiles in view are loaded first while scrolling quickly.
+"""
+from collections import OrderedDict, deque
+from datetime import timedelta
+import threading
+
+from PyQt5.QtCore import QAbstractListModel, QSize, Qt, pyqtSignal
+from PyQt5.QtGui import QColor, QPainter, QPixmap
+from PyQt5.QtWidgets import QListView
+
+from serpentime.core.chronodex import Chronodex
+
+from .chronodex_graph import ChronodexGraph, drawn_preferences_key
+
+
+# Size of a thumbnail, in pixels
+THUMBNAIL_SIZE = 120
+# Maximum number of thumbnails kept in memory
+MAX_THUMBNAILS = 2000
+# Maximum number of pending loads. The oldest requests, for tiles likely
+# scrolled out of view, are dropped beyond it.
+MAX_PENDING = 256
+
+
+class DayLoader(object):
+    """Loads days in a background thread, most recent requests first."""
+
+    def __init__(self, loader, callback):
+        """Starts the loading thread.
+
+        Parameters
+        ----------
+        loader: callable
+            A function taking a datetime.date and returning its Chronodex.
+        callback: callable
+            Called from the loading thread with each day and its Chronodex.
+        """
+        self._loader = loader
+        self._callback = callback
+        self._pending = deque()
+        self._requested = set()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def request(self, day):
+        """Queues the loading of the given day, unless already queued."""
+        with self._condition:
+            if day in self._requested:
+                return
+            self._pending.append(day)
+            self._requested.add(day)
+            if len(self._pending) > MAX_PENDING:
+                self._requested.discard(self._pending.popleft())
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                day = self._pending.pop()
+            try:
+                chronodex = self._loader(day)
+            except Exception:
+                chronodex = Chronodex()
+            with self._condition:
+                self._requested.discard(day)
+            self._callback(day, chronodex)
+
+    def close(self):
+        """Stops the loading thread, dropping the pending requests."""
+        with self._condition:
+            self._closed = True
+            self._pending.clear()
+            self._condition.notify()
+        self._thread.join()
+
+
+class DayGridModel(QAbstractListModel):
+    """A list model of the days of a range, decorated with the thumbnail of
+    their chronodex.
+    """
+
+    # Emitted from the loading thread with a day and its Chronodex
+    dayLoaded = pyqtSignal(object, object)
+
+    def __init__(self, loader, preferences, categories=None, parent=None):
+        """Creates the model of an empty range of days.
+
+        Parameters
+        ----------
+        loader: callable
+            A function taking a datetime.date and returning its Chronodex,
+            called from a background thread.
+        preferences: dict
+            The settings for the chronodex graphical representation.
+        categories: StyledCategoryRegistry or None
+            The compiled categories of the preferences.
+        """
+        super().__init__(parent)
+        self.start = None
+        self._n_days = 0
+        self._preferences = preferences
+        self._preferences_key = drawn_preferences_key(preferences)
+        self._scene = ChronodexGraph(Chronodex(), preferences, categories)
+        # {datetime.date: (content hash, preferences key, QPixmap)}
+        self._thumbnails = OrderedDict()
+        # {datetime.date: content hash} of the loaded days
+        self._hashes = {}
+        # Days whose data may have changed since their last load
+        self._stale = set()
+        self._placeholder = QPixmap(THUMBNAIL_SIZE, THUMBNAIL_SIZE)
+        self._placeholder.fill(QColor("#eeeeee"))
+        self.dayLoaded.connect(self.on_day_loaded)
+        self._loader = DayLoader(loader, self.dayLoaded.emit)
+
+    def set_range(self, start, end):
+        """Shows the days from start to end, both included."""
+        self.beginResetModel()
+        self.start = start
+        self._n_days = max(0, (end - start).days + 1)
+        self.endResetModel()
+
+    def day(self, row):
+        return self.start + timedelta(days=row)
+
+    def row(self, day):
+        return (day - self.start).days
+
+    @property
+    def preferences(self):
+        return self._preferences
+
+    @preferences.setter
+    def preferences(self, value):
+        """Sets the preferences. Thumbnails drawn with other preferences are
+        redrawn when next shown.
+        """
+        self._preferences = value
+        key = drawn_preferences_key(value)
+        if key != self._preferences_key:
+            self._preferences_key = key
+            self._scene.preferences = value
+            self.dataChanged.emit(
+                self.index(0), self.index(self._n_days - 1),
+                [Qt.DecorationRole],
+            )
+
+    def refresh(self, day=None):
+        """Reloads the given day, or all days, when next shown. Only the
+        thumbnails whose activities changed are redrawn.
+        """
+        if day is None:
+            self._stale.update(self._hashes)
+        else:
+            self._stale.add(day)
+        self.dataChanged.emit(
+            self.index(0), self.index(self._n_days - 1), [Qt.DecorationRole]
+        )
+
+    def rowCount(self, parent=None):
+        return self._n_days
+
+    def data(self, index, role):
+        if not index.isValid():
+            return None
+        day = self.day(index.row())
+        if role == Qt.DisplayRole:
+            return day.strftime("%a %d %b %Y")
+        if role == Qt.DecorationRole:
+            return self.thumbnail(day)
+        if role == Qt.UserRole:
+            return day
+        return None
+
+    def thumbnail(self, day):
+        """Returns the thumbnail of the given day, or a placeholder while
+        it is being loaded.
+        """
+        entry = self._thumbnails.get(day)
+        up_to_date = (
+            entry is not None and day not in self._stale
+            and entry[0] == self._hashes.get(day)
+            and entry[1] == self._preferences_key
+        )
+        if up_to_date:
+            self._thumbnails.move_to_end(day)
+            return entry[2]
+        self._loader.request(day)
+        if entry is not None:
+            # The outdated thumbnail is shown until the new one is drawn
+            return entry[2]
+        return self._placeholder
+
+    def on_day_loaded(self, day, chronodex):
+        self._stale.discard(day)
+        content_hash = chronodex.content_hash()
+        self._hashes[day] = content_hash
+        entry = self._thumbnails.get(day)
+        if entry is not None and entry[:2] == (
+                content_hash, self._preferences_key):
+            return
+        self._thumbnails[day] = (
+            content_hash, self._preferences_key, self.render(chronodex)
+        )
+        self._thumbnails.move_to_end(day)
+        while len(self._thumbnails) > MAX_THUMBNAILS:
+            self._thumbnails.popitem(last=False)
+        if self.start is not None and 0 <= self.row(day) < self._n_days:
+            index = self.index(self.row(day))
+            self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+    def render(self, chronodex):
+        """Renders the given Chronodex to a thumbnail with the shared
+        scene.
+        """
+        self._scene.chronodex = chronodex
+        pixmap = QPixmap(THUMBNAIL_SIZE, THUMBNAIL_SIZE)
+        pixmap.fill(Qt.white)
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.Antialiasing)
+        self._scene.render(painter)
+        painter.end()
+        return pixmap
+
+    def close(self):
+        """Stops loading days."""
+        self._loader.close()
+
+
+class DayGridView(QListView):
+    """Shows the days of a DayGridModel as a grid of thumbnails."""
+
+    def __init__(self, model, parent=None):
+        super().__init__(parent)
+        self.setModel(model)
+        self.setViewMode(QListView.IconMode)
+        self.setFlow(QListView.LeftToRight)
+        self.setWrapping(True)
+        self.setResizeMode(QListView.Adjust)
+        self.setMovement(QListView.Static)
+        # Lets the view lay out items without querying each of them
+        self.setUniformItemSizes(True)
+        self.setLayoutMode(QListView.Batched)
+        self.setIconSize(QSize(THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+        self.setGridSize(QSize(THUMBNAIL_SIZE + 16, THUMBNAIL_SIZE + 32))
+        self.setVerticalScrollMode(QListView.ScrollPerPixel)
+
+    def scroll_to_day(self, day):
+        model = self.model()
+        if model.start is not None:
+            self.scrollTo(model.index(model.row(day)))
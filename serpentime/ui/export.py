@@ -0,0 +1,252 @@
+"""Headless rendering of chronodexes to PNG or SVG files.
+
+Days are rendered with the offscreen Qt platform, so no display is needed,
+in a pool of processes. Usage from the command line:
+
+    python -m serpentime.ui.export 2020-01-01 2020-12-31 out/ --format svg
+"""
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+import argparse
+import json
+import os
+import sys
+import time
+
+from serpentime.core.data_index import day_filename
+from serpentime.core.files import atomic_write
+from serpentime.core.journal import EditJournal
+from serpentime.core.storage import STORAGE_BACKENDS, open_storage
+
+
+FORMATS = ('png', 'svg')
+# Name of the file of the output directory recording the Storage.stamp of
+# the day each file was rendered from, and the drawn preferences it was
+# rendered with
+MANIFEST_FILENAME = '.serpentime-export.json'
+
+# The QApplication of a rendering process, created on first use
+_app = None
+
+
+def _ensure_app():
+    """Creates the QApplication needed to render scenes, using the
+    offscreen platform unless another one is configured.
+    """
+    global _app
+    from PyQt5.QtWidgets import QApplication
+
+    if QApplication.instance() is None:
+        os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+        _app = QApplication([])
+
+
+def render_image(chronodex, preferences):
+    """Renders the given Chronodex to a QImage.
+
+    Parameters
+    ----------
+    chronodex: serpentime.core.Chronodex
+        The Chronodex instance to be rendered.
+    preferences: dict
+        The settings for the chronodex graphical representation, as used
+        by serpentime.ui.chronodex_graph.ChronodexGraph.
+
+    Returns
+    -------
+    image: QImage
+        The rendered image, on a white background.
+    """
+    _ensure_app()
+    from PyQt5.QtCore import Qt
+    from PyQt5.QtGui import QImage, QPainter
+    from .chronodex_graph import ChronodexGraph, WINDOW_SIZE
+
+    scene = ChronodexGraph(chronodex, preferences)
+    image = QImage(WINDOW_SIZE, WINDOW_SIZE, QImage.Format_ARGB32)
+    image.fill(Qt.white)
+    painter = QPainter(image)
+    painter.setRenderHint(QPainter.Antialiasing)
+    scene.render(painter)
+    painter.end()
+    return image
+
+
+def render_svg(chronodex, preferences, path):
+    """Renders the given Chronodex to an SVG file.
+
+    Parameters
+    ----------
+    chronodex: serpentime.core.Chronodex
+        The Chronodex instance to be rendered.
+    preferences: dict
+        The settings for the chronodex graphical representation.
+    path: str
+        The full filename of the SVG file to write.
+    """
+    _ensure_app()
+    from PyQt5.QtCore import QRect, QSize
+    from PyQt5.QtGui import QPainter
+    from PyQt5.QtSvg import QSvgGenerator
+    from .chronodex_graph import ChronodexGraph, WINDOW_SIZE
+
+    scene = ChronodexGraph(chronodex, preferences)
+    generator = QSvgGenerator()
+    generator.setFileName(path)
+    generator.setSize(QSize(WINDOW_SIZE, WINDOW_SIZE))
+    generator.setViewBox(QRect(0, 0, WINDOW_SIZE, WINDOW_SIZE))
+    painter = QPainter(generator)
+    scene.render(painter)
+    painter.end()
+
+
+def render_file(chronodex, fmt, preferences, path):
+    """Renders the given Chronodex to path, in the given format. Called in
+    worker processes.
+    """
+    if fmt == 'svg':
+        render_svg(chronodex, preferences, path)
+    elif not render_image(chronodex, preferences).save(path, 'PNG'):
+        raise OSError(f"Could not write {path}")
+    return path
+
+
+def _load_manifest(output_dir):
+    """Returns {filename: (stamp, preferences key)} of the files of the
+    output directory, see drawn_preferences_key.
+    """
+    try:
+        with open(os.path.join(output_dir, MANIFEST_FILENAME), 'r') as fi:
+            return {
+                name: (tuple(entry['stamp']), entry['preferences'])
+                for name, entry in json.load(fi).items()
+            }
+    except (OSError, ValueError, TypeError, AttributeError, KeyError):
+        return {}
+
+
+def _save_manifest(output_dir, manifest):
+    with atomic_write(os.path.join(output_dir, MANIFEST_FILENAME), 'w') as fi:
+        json.dump({
+            name: {'stamp': stamp, 'preferences': key}
+            for name, (stamp, key) in manifest.items()
+        }, fi)
+
+
+def export_range(start, end, output_dir, data_dir, preferences, fmt='png',
+                 workers=None, backend='csv'):
+    """Renders the chronodex of each day with data between start and end,
+    both included, in a pool of processes.
+
+    Days are read from the storage of the data directory, with the edits
+    of its journal. Days whose output file was rendered from their current
+    Storage.stamp with the same drawn preferences are skipped, days with
+    journaled edits are always rendered.
+
+    Parameters
+    ----------
+    start, end: datetime.date
+        The bounds of the range of days to export.
+    output_dir: str
+        The directory in which YYYYMMDD.png or YYYYMMDD.svg files are
+        written.
+    data_dir: str
+        The data directory holding the chronodex data.
+    preferences: dict
+        The settings for the chronodex graphical representation.
+    fmt: str
+        Either 'png' or 'svg'.
+    workers: int or None
+        The number of processes to use. If None, uses all the cores.
+    backend: str
+        The storage backend of the data directory.
+
+    Returns
+    -------
+    written: list(str)
+        The files written.
+    skipped: list(str)
+        The files that were already up to date.
+    """
+    from .chronodex_graph import drawn_preferences_key
+
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt}, expected one of {FORMATS}")
+    os.makedirs(output_dir, exist_ok=True)
+    preferences_key = drawn_preferences_key(preferences)
+    manifest = _load_manifest(output_dir)
+    storage = open_storage(data_dir, backend)
+    journal = EditJournal(data_dir)
+    try:
+        days = set(storage.days(start, end))
+        days.update(day for day in journal.days() if start <= day <= end)
+        jobs = []
+        skipped = []
+        for day in sorted(days):
+            filename = day_filename(day, fmt)
+            path = os.path.join(output_dir, filename)
+            stamp = None if day in journal else storage.stamp(day)
+            entry = (stamp, preferences_key)
+            if (stamp is not None and manifest.get(filename) == entry
+                    and os.path.exists(path)):
+                skipped.append(path)
+                continue
+            if stamp is None:
+                manifest.pop(filename, None)
+                chronodex = journal.replay(day, storage.get)
+            else:
+                manifest[filename] = entry
+                chronodex = storage.get(day)
+            jobs.append((chronodex, path))
+    finally:
+        journal.close()
+        storage.close()
+    written = []
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(render_file, chronodex, fmt, preferences, path)
+                for chronodex, path in jobs
+            ]
+            written = [future.result() for future in futures]
+        _save_manifest(output_dir, manifest)
+    return written, skipped
+
+
+def main(argv=None):
+    from serpentime.files import DATA_PATH, PREF_PATH
+
+    parser = argparse.ArgumentParser(
+        description="Renders the chronodex of a range of days to images."
+    )
+    parser.add_argument('start', type=date.fromisoformat)
+    parser.add_argument('end', type=date.fromisoformat)
+    parser.add_argument('output_dir')
+    parser.add_argument('--format', choices=FORMATS, default='png')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--data-dir', default=DATA_PATH)
+    parser.add_argument('--preferences', default=PREF_PATH)
+    parser.add_argument(
+        '--backend', choices=sorted(STORAGE_BACKENDS),
+        help="the storage of the data directory, by default the one set "
+             "in the preferences",
+    )
+    args = parser.parse_args(argv)
+
+    with open(args.preferences, 'r') as fi:
+        preferences = json.load(fi)
+    backend = args.backend or preferences.get('storage', 'csv')
+    begin = time.perf_counter()
+    written, skipped = export_range(
+        args.start, args.end, args.output_dir, args.data_dir, preferences,
+        fmt=args.format, workers=args.workers, backend=backend,
+    )
+    elapsed = time.perf_counter() - begin
+    print(
+        f"{len(written)} rendered, {len(skipped)} up to date, "
+        f"in {elapsed:.2f}s"
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+from datetime import date, timedelta
+
+from PyQt5.QtGui import QColor
+from PyQt5.QtWidgets import QCalendarWidget
+
+from serpentime.core.analytics import HOURS_PER_DAY
+
+
+# Color of the days fully covered by activities. Days are painted with
+# this color, more transparent the less they are covered.
+HEATMAP_COLOR = QColor("#32a84e")
+# Opacity of the days fully covered, out of 255
+MAX_ALPHA = 160
+
+
+class HeatmapCalendar(QCalendarWidget):
+    """A calendar coloring each day by the ratio of its hours covered by
+    activities, read from per-day summaries rather than day files.
+    """
+
+    def __init__(self, summaries, parent=None):
+        """Creates the calendar.
+
+        Parameters
+        ----------
+        summaries: callable
+            A function taking the first and last day of a month page, and
+            returning {datetime.date: DaySummary} for the days with data,
+            see serpentime.core.summaries.SummaryStore.range.
+        """
+        super().__init__(parent)
+        self._summaries = summaries
+        self._page = {}
+        self.currentPageChanged.connect(self.refresh)
+        self.refresh()
+
+    def refresh(self, *args):
+        """Reads the summaries of the displayed page and repaints it."""
+        first = date(self.yearShown(), self.monthShown(), 1)
+        # The page also shows the end and start of the surrounding months
+        self._page = self._summaries(
+            first - timedelta(days=7), first + timedelta(days=44)
+        )
+        self.updateCells()
+
+    def paintCell(self, painter, rect, qdate):
+        super().paintCell(painter, rect, qdate)
+        summary = self._page.get(qdate.toPyDate())
+        if summary is None or summary.covered <= 0:
+            return
+        color = QColor(HEATMAP_COLOR)
+        ratio = min(summary.covered / HOURS_PER_DAY, 1)
+        color.setAlpha(int(MAX_ALPHA * (0.2 + 0.8 * ratio)))
+        painter.fillRect(rect, color)
@@ -41,6 +41,16 @@ class SpinBoxDelegate(QStyledItemDelegate):
 class ComboBoxDelegate(QStyledItemDelegate):
 
     def __init__(self, owner, choices):
+        """Creates the delegate.
+
+        Parameters
+        ----------
+        owner: QWidget
+            The view of the delegate.
+        choices: iterable(str)
+            The items of the combo box, read each time an editor is
+            created so that a live collection stays up to date.
+        """
         super().__init__(owner)
         self.items = choices
 
@@ -52,7 +62,7 @@ class ComboBoxDelegate(QStyledItemDelegate):
     def createEditor(self, parent, option, index):
         editor = QComboBox(parent)
         # editor.currentIndexChanged.connect(self.commit_editor)
-        editor.addItems(self.items)
+        editor.addItems(list(self.items))
         return editor
 
     # def commit_editor(self):
@@ -61,9 +71,9 @@ class ComboBoxDelegate(QStyledItemDelegate):
 
     def setEditorData(self, editor, index):
         value = index.data(Qt.DisplayRole)
-        if value in self.items:
-            num = self.items.index(value)
-            editor.setCurrentIndex(num)
+        items = list(self.items)
+        if value in items:
+            editor.setCurrentIndex(items.index(value))
 
     def setModelData(self, editor, model, index):
         value = editor.currentText()
@@ -1,6 +1,8 @@
-from PyQt5.QtCore import QAbstractTableModel, Qt
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt
 from PyQt5.QtGui import QColor
 
+from .row_ranges import contiguous_ranges
+
 
 COLUMNS = [
     ('Category', 'name'),
@@ -42,12 +44,18 @@ class PrefTableModel(QAbstractTableModel):
         return True
 
     def removeRows(self, pos, count, index):
-        self.beginRemoveRows(index, pos, pos + count - 1)
-        for ind in range(pos, pos + count):
-            self.categories.pop(pos)
-        self.endRemoveRows()
+        self.remove_rows(range(pos, pos + count))
         return True
 
+    def remove_rows(self, rows):
+        """Removes the categories at the given rows, in any order, with one
+        model transaction per range of contiguous rows.
+        """
+        for first, last in contiguous_ranges(rows):
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self.categories[first:last + 1]
+            self.endRemoveRows()
+
     def flags(self, index):
         return Qt.ItemIsEditable | Qt.ItemIsEnabled | Qt.ItemIsSelectable
 
@@ -0,0 +1,22 @@
+def contiguous_ranges(rows):
+    """Groups rows into ranges of contiguous rows.
+
+    Parameters
+    ----------
+    rows: iterable(int)
+        The rows, in any order, possibly repeated.
+
+    Returns
+    -------
+    ranges: list(tuple(int, int))
+        The (first, last) rows of each range, both included, in decreasing
+        order, so that removing the ranges in turn keeps the rows of the
+        next ranges valid.
+    """
+    ranges = []
+    for row in sorted(set(rows), reverse=True):
+        if ranges and ranges[-1][0] == row + 1:
+            ranges[-1] = (row, ranges[-1][1])
+        else:
+            ranges.append((row, row))
+    return ranges
@@ -1,17 +1,21 @@
+from datetime import date, timedelta
+import os
+import shutil
 import sys
-import pkg_resources
+import tempfile
 from unittest import mock, TestCase
 
 from PyQt5.QtWidgets import QApplication
 from PyQt5.QtCore import QDate, Qt
 from PyQt5.QtTest import QTest
 
+from serpentime.ui import app_model
 from serpentime.ui.app_view import AppView
-from serpentime.core.chronodex import Chronodex
+from serpentime.core.chronodex import Activity, Chronodex
+from serpentime.core.data_index import day_filename
+from serpentime.files import PREF_PATH
 
 
-DATA_PATH = pkg_resources.resource_filename("serpentime.files", "data")
-
 app = QApplication(sys.argv)
 
 
@@ -19,9 +23,60 @@ class TestAppView(TestCase):
     """Test the app GUI"""
 
     def setUp(self):
-        """Create the GUI"""
+        """Create the GUI on a temporary copy of the preferences and a data
+        directory holding the activities of yesterday.
+        """
+        self._tmp = tempfile.TemporaryDirectory()
+        self.data_dir = os.path.join(self._tmp.name, 'data')
+        os.mkdir(self.data_dir)
+        Chronodex([
+            Activity(start=8, end=12, name='code', category='work'),
+            Activity(start=12, end=13, name='lunch', category='food'),
+        ]).to_csv(os.path.join(
+            self.data_dir, day_filename(date.today() - timedelta(days=1))
+        ))
+        pref_path = os.path.join(self._tmp.name, 'preferences.json')
+        shutil.copy(PREF_PATH, pref_path)
+        for name, value in [('DATA_PATH', self.data_dir),
+                            ('PREF_PATH', pref_path)]:
+            patcher = mock.patch.object(app_model, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
         self.view = AppView()
 
+    def tearDown(self):
+        self.view.model.close()
+        self._tmp.cleanup()
+
+    def test_date_change_with_data(self):
+        """Checks that changing the date shows the activities stored for
+        the new date, reading them from the data directory.
+        """
+        # Given
+        self.view.model.auto_save = False
+        yesterday = QDate.currentDate().addDays(-1)
+        # When
+        QTest.mouseClick(self.view.prev_day_button, Qt.LeftButton)
+        # Then
+        self.assertEqual(self.view.date_edit.date(), yesterday)
+        table = self.view.model.chronodex_table
+        self.assertEqual(table.rowCount(None), 2)
+        self.assertListEqual(
+            [table.data(table.index(row, 3), Qt.DisplayRole)
+             for row in range(2)],
+            ['code', 'lunch'],
+        )
+        for col in range(table.columnCount(None)):
+            if not self.view.table_view.isColumnHidden(col):
+                self.assertGreater(self.view.table_view.columnWidth(col), 0)
+        # When
+        QTest.mouseClick(self.view.next_day_button, Qt.LeftButton)
+        # Then
+        self.assertEqual(
+            self.view.model.date, yesterday.toPyDate() + timedelta(days=1)
+        )
+        self.assertEqual(table.rowCount(None), 0)
+
     def test_date_navigation(self):
         """Checks that button in the navigation bar updates the date in
         the drop-down and calendar accordingly.
@@ -0,0 +1,142 @@
+import json
+import sys
+from unittest import mock, TestCase
+
+from PyQt5.QtWidgets import (
+    QApplication, QGraphicsEllipseItem, QGraphicsTextItem
+)
+
+from serpentime.core.chronodex import Activity, Chronodex
+from serpentime.files import PREF_PATH
+from serpentime.ui.chronodex_graph import ChronodexGraph
+
+
+app = QApplication.instance() or QApplication(sys.argv)
+
+
+def make_chronodex():
+    return Chronodex([
+        Activity(start=ind, end=ind + 1, name=f'a{ind}', category='work')
+        for ind in range(0, 12, 2)
+    ])
+
+
+def describe_items(scene):
+    """Returns a description of the items drawn in the scene, in stacking
+    order.
+    """
+    items = []
+    for item in scene.items():
+        pos = (round(item.pos().x(), 3), round(item.pos().y(), 3))
+        if isinstance(item, QGraphicsEllipseItem):
+            rect = item.rect()
+            items.append((
+                'ellipse', pos, item.zValue(), rect.width(), rect.height(),
+                item.startAngle(), item.spanAngle(),
+                item.brush().color().name(),
+            ))
+        elif isinstance(item, QGraphicsTextItem):
+            items.append((
+                'text', pos, item.zValue(), item.toPlainText(),
+                round(item.rotation(), 3),
+            ))
+        else:
+            items.append((type(item).__name__, pos))
+    return items
+
+
+class TestChronodexGraph(TestCase):
+
+    def setUp(self):
+        with open(PREF_PATH) as fi:
+            self.preferences = json.load(fi)
+        self.preferences.update(show_labels=True, rotate_labels=True)
+        self.chronodex = make_chronodex()
+        self.graph = ChronodexGraph(self.chronodex, self.preferences)
+
+    def check_full_redraw(self):
+        """Checks that the scene holds the items of a full redraw."""
+        redrawn = ChronodexGraph(self.chronodex.copy(), self.graph.preferences)
+        self.assertListEqual(
+            describe_items(self.graph), describe_items(redrawn)
+        )
+        self.assertEqual(len(self.graph.activity_wedges), len(self.chronodex))
+        self.assertEqual(len(self.graph.activity_labels), len(self.chronodex))
+
+    def test_update_activities(self):
+        """Checks that edited activities are redrawn, including an activity
+        becoming invalid.
+        """
+        # When
+        self.chronodex.activities[1].end = 5
+        self.chronodex.activities[2].weight = 20
+        self.graph.update_activities(1, 2)
+        # Then
+        self.assertIsNone(self.graph.activity_wedges[2])
+        self.check_full_redraw()
+
+    def test_update_overlapping_activities(self):
+        """Checks that a redrawn activity keeps its place in the stacking
+        order, below the overlapping activities drawn after it.
+        """
+        # Given
+        self.chronodex = Chronodex([
+            Activity(start=0, end=6, name='large', category='work', weight=3),
+            Activity(start=2, end=4, name='small', category='work', weight=1),
+        ])
+        self.graph.preferences = dict(
+            self.graph.preferences, use_custom_weight=True
+        )
+        self.graph.chronodex = self.chronodex
+        # When
+        self.chronodex.activities[0].name = 'larger'
+        self.graph.update_activities(0, 0)
+        # Then
+        self.check_full_redraw()
+
+    def test_insert_activities(self):
+        """Checks that inserted activities are drawn at their rows."""
+        # When
+        self.chronodex.activities.insert(1, Activity(start=13, end=15))
+        self.chronodex.activities.insert(2, Activity(start=16, end=17))
+        self.graph.insert_activities(1, 2)
+        # Then
+        self.check_full_redraw()
+
+    def test_remove_activities(self):
+        """Checks that the items of removed activities are removed."""
+        for ranges in [[(1, 2)], [(4, 4), (0, 1)], [(5, 5)]]:
+            with self.subTest(ranges=ranges):
+                # Given
+                self.chronodex = make_chronodex()
+                self.graph.chronodex = self.chronodex
+                # When
+                for first, last in ranges:
+                    del self.chronodex.activities[first:last + 1]
+                self.graph.remove_activity_ranges(ranges)
+                # Then
+                self.check_full_redraw()
+
+    def test_preferences_diffing(self):
+        """Checks that preferences are redrawn only as far as they changed.
+        """
+        for key, value, full in [
+            ('auto_save', not self.preferences['auto_save'], None),
+            ('show_overlay', not self.preferences['show_overlay'], False),
+            ('show_labels', False, True),
+        ]:
+            with self.subTest(key=key):
+                with mock.patch.object(
+                        self.graph, 'draw_chronodex',
+                        wraps=self.graph.draw_chronodex) as draw_chronodex, \
+                        mock.patch.object(
+                            self.graph, 'draw_overlay',
+                            wraps=self.graph.draw_overlay) as draw_overlay:
+                    # When
+                    self.graph.preferences = dict(
+                        self.graph.preferences, **{key: value}
+                    )
+                # Then
+                self.assertEqual(draw_chronodex.called, bool(full))
+                self.assertEqual(draw_overlay.called, full is not None)
+                self.check_full_redraw()
@@ -0,0 +1,148 @@
+import sys
+from unittest import TestCase
+
+from PyQt5.QtCore import QModelIndex, Qt
+from PyQt5.QtWidgets import QApplication
+
+from serpentime.core.chronodex import Activity, Chronodex
+from serpentime.ui.chronodex_table_model import (
+    ChronodexTableModel, FETCH_BATCH, MAX_REMOVED_RANGES
+)
+
+
+app = QApplication.instance() or QApplication(sys.argv)
+
+
+def make_chronodex(count):
+    return Chronodex([
+        Activity(start=ind, end=ind + 1, name=f'a{ind}', category='work')
+        for ind in range(count)
+    ])
+
+
+class TestChronodexTableModel(TestCase):
+
+    def record(self, signal):
+        """Returns the list of the arguments of each emission of signal."""
+        emitted = []
+        signal.connect(lambda *args: emitted.append(args))
+        return emitted
+
+    def test_fetch_more(self):
+        """Checks that rows are exposed by batches."""
+        # Given
+        chronodex = make_chronodex(2 * FETCH_BATCH + 10)
+        model = ChronodexTableModel(chronodex)
+        inserted = self.record(model.rowsInserted)
+        # Then
+        self.assertEqual(model.rowCount(QModelIndex()), FETCH_BATCH)
+        self.assertTrue(model.canFetchMore(QModelIndex()))
+        # When
+        model.fetchMore(QModelIndex())
+        model.fetchMore(QModelIndex())
+        # Then
+        self.assertEqual(model.rowCount(QModelIndex()), len(chronodex))
+        self.assertFalse(model.canFetchMore(QModelIndex()))
+        self.assertListEqual(
+            [args[1:] for args in inserted],
+            [(FETCH_BATCH, 2 * FETCH_BATCH - 1),
+             (2 * FETCH_BATCH, len(chronodex) - 1)],
+        )
+        self.assertEqual(
+            model.data(model.index(len(chronodex) - 1, 3), Qt.DisplayRole),
+            f'a{len(chronodex) - 1}',
+        )
+
+    def test_fetch_all(self):
+        """Checks that all rows are exposed at once by fetch_all."""
+        for count in [FETCH_BATCH - 1, 3 * FETCH_BATCH]:
+            with self.subTest(count=count):
+                # Given
+                model = ChronodexTableModel(make_chronodex(count))
+                # When
+                model.fetch_all()
+                # Then
+                self.assertEqual(model.rowCount(QModelIndex()), count)
+                self.assertFalse(model.canFetchMore(QModelIndex()))
+
+    def test_insert_rows(self):
+        """Checks that rows inserted past the exposed rows expose the rows
+        before them, and start where the previous activity ends.
+        """
+        # Given
+        chronodex = make_chronodex(FETCH_BATCH + 20)
+        model = ChronodexTableModel(chronodex)
+        inserted = self.record(model.activitiesInserted)
+        pos = FETCH_BATCH + 5
+        # When
+        model.insertRows(pos, 2, QModelIndex())
+        # Then
+        self.assertEqual(model.rowCount(QModelIndex()), pos + 2)
+        self.assertEqual(len(chronodex), FETCH_BATCH + 22)
+        self.assertListEqual(inserted, [(pos, pos + 1)])
+        self.assertEqual(chronodex.activities[pos].start, pos)
+        self.assertEqual(chronodex.activities[pos + 2].name, f'a{pos}')
+        # When
+        model.fetch_all()
+        # Then
+        self.assertEqual(model.rowCount(QModelIndex()), len(chronodex))
+
+    def test_remove_rows(self):
+        """Checks that removed rows are removed by ranges of contiguous
+        rows, in decreasing order.
+        """
+        # Given
+        chronodex = make_chronodex(FETCH_BATCH + 10)
+        model = ChronodexTableModel(chronodex)
+        removed = self.record(model.rowsRemoved)
+        reset = self.record(model.modelReset)
+        # When
+        ranges = model.remove_rows([5, 1, 2])
+        # Then
+        self.assertListEqual(ranges, [(5, 5), (1, 2)])
+        self.assertListEqual(
+            [args[1:] for args in removed], [(5, 5), (1, 2)]
+        )
+        self.assertListEqual(reset, [])
+        self.assertEqual(model.rowCount(QModelIndex()), FETCH_BATCH - 3)
+        self.assertListEqual(chronodex.names[:4], ['a0', 'a3', 'a4', 'a6'])
+        # When the rows left unexposed are fetched
+        model.fetch_all()
+        # Then
+        self.assertEqual(model.rowCount(QModelIndex()), FETCH_BATCH + 7)
+
+    def test_remove_many_ranges(self):
+        """Checks that removing more ranges than MAX_REMOVED_RANGES resets
+        the model once.
+        """
+        # Given
+        count = 2 * (MAX_REMOVED_RANGES + 1)
+        chronodex = make_chronodex(count)
+        model = ChronodexTableModel(chronodex)
+        removed = self.record(model.rowsRemoved)
+        reset = self.record(model.modelReset)
+        activities_removed = self.record(model.activitiesRemoved)
+        # When
+        ranges = model.remove_rows(range(0, count, 2))
+        # Then
+        self.assertEqual(len(ranges), MAX_REMOVED_RANGES + 1)
+        self.assertListEqual(removed, [])
+        self.assertEqual(len(reset), 1)
+        self.assertListEqual(activities_removed, [(ranges,)])
+        self.assertEqual(model.rowCount(QModelIndex()), count // 2)
+        self.assertListEqual(
+            chronodex.names, [f'a{ind}' for ind in range(1, count, 2)]
+        )
+
+    def test_sample_rows(self):
+        """Checks that sampled rows spread over the exposed rows."""
+        for length, count, expected in [
+            (3, 5, [0, 1, 2]),
+            (10, 3, [0, 4, 9]),
+            (FETCH_BATCH + 10, 2, [0, FETCH_BATCH - 1]),
+        ]:
+            with self.subTest(length=length, count=count):
+                # Given
+                model = ChronodexTableModel(make_chronodex(length))
+                # Then
+                self.assertListEqual(model.sample_rows(count), expected)
@@ -0,0 +1,133 @@
+from datetime import date, timedelta
+import json
+import sys
+import threading
+from unittest import mock, TestCase
+
+from PyQt5.QtWidgets import QApplication
+
+from serpentime.core.chronodex import Activity, Chronodex
+from serpentime.files import PREF_PATH
+from serpentime.ui import day_grid
+from serpentime.ui.day_grid import DayGridModel, DayLoader
+
+
+app = QApplication.instance() or QApplication(sys.argv)
+
+
+class TestDayLoader(TestCase):
+
+    def test_pending_requests_are_dropped(self):
+        """Checks that days are loaded most recent request first, and that
+        the oldest requests are dropped beyond MAX_PENDING.
+        """
+        # Given
+        started = threading.Event()
+        release = threading.Event()
+        loaded = []
+        done = threading.Event()
+        days = [date(2020, 3, 1) + timedelta(days=ind) for ind in range(7)]
+
+        def load(day):
+            started.set()
+            release.wait(5)
+            return Chronodex()
+
+        def callback(day, chronodex):
+            loaded.append(day)
+            if len(loaded) == 5:
+                done.set()
+
+        with mock.patch.object(day_grid, 'MAX_PENDING', 4):
+            loader = DayLoader(load, callback)
+            loader.request(days[0])
+            started.wait(5)
+            # When
+            for day in days[1:]:
+                loader.request(day)
+            # Already queued
+            loader.request(days[6])
+            release.set()
+            done.wait(5)
+            loader.close()
+        # Then
+        self.assertListEqual(
+            loaded, [days[0], days[6], days[5], days[4], days[3]]
+        )
+
+
+class TestDayGridModel(TestCase):
+
+    def setUp(self):
+        with open(PREF_PATH) as fi:
+            self.preferences = json.load(fi)
+        self.day = date(2020, 3, 1)
+        self.chronodex = Chronodex([
+            Activity(start=8, end=12, name='code', category='work'),
+        ])
+        self.model = DayGridModel(lambda day: Chronodex(), self.preferences)
+        self.model.set_range(self.day, self.day + timedelta(days=6))
+        self.model._loader.request = mock.Mock()
+        self.model.render = mock.Mock(wraps=self.model.render)
+
+    def tearDown(self):
+        self.model.close()
+
+    def test_render_by_content_hash(self):
+        """Checks that a reloaded day is only redrawn if its activities
+        changed.
+        """
+        # Given
+        placeholder = self.model.thumbnail(self.day)
+        self.model._loader.request.assert_called_once_with(self.day)
+        # When
+        self.model.on_day_loaded(self.day, self.chronodex)
+        # Then
+        self.model.render.assert_called_once()
+        thumbnail = self.model.thumbnail(self.day)
+        self.assertIsNot(thumbnail, placeholder)
+        self.model._loader.request.assert_called_once()
+        with self.subTest("Unchanged activities are not redrawn"):
+            # When
+            self.model.refresh(self.day)
+            self.assertIs(self.model.thumbnail(self.day), thumbnail)
+            self.model.on_day_loaded(self.day, self.chronodex.copy())
+            # Then
+            self.model.render.assert_called_once()
+            self.assertEqual(self.model._loader.request.call_count, 2)
+        with self.subTest("Changed activities are redrawn"):
+            # When
+            changed = self.chronodex.copy()
+            changed.activities[0].end = 13
+            self.model.refresh(self.day)
+            self.model.on_day_loaded(self.day, changed)
+            # Then
+            self.assertEqual(self.model.render.call_count, 2)
+            self.assertIsNot(self.model.thumbnail(self.day), thumbnail)
+
+    def test_preferences_key(self):
+        """Checks that thumbnails are redrawn only when the preferences
+        affecting the drawing change.
+        """
+        # Given
+        self.model.on_day_loaded(self.day, self.chronodex)
+        self.model._loader.request.reset_mock()
+        for key, value, redrawn in [
+            ('auto_save', not self.preferences['auto_save'], False),
+            ('show_overlay', not self.preferences['show_overlay'], True),
+        ]:
+            with self.subTest(key=key):
+                self.model.render.reset_mock()
+                # When
+                self.model.preferences = dict(
+                    self.model.preferences, **{key: value}
+                )
+                self.model.thumbnail(self.day)
+                if redrawn:
+                    self.model._loader.request.assert_called_once_with(
+                        self.day
+                    )
+                    self.model.on_day_loaded(self.day, self.chronodex)
+                # Then
+                self.assertEqual(self.model.render.call_count, int(redrawn))
+                self.model._loader.request.reset_mock()
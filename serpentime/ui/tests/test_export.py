@@ -0,0 +1,85 @@
+from datetime import date
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+from serpentime.core.chronodex import Activity, Chronodex
+from serpentime.core.journal import EditJournal
+from serpentime.core.storage import CsvStorage
+from serpentime.files import PREF_PATH
+from serpentime.ui.export import export_range
+
+
+class TestExport(TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.data_dir = os.path.join(self._tmp.name, 'data')
+        self.output_dir = os.path.join(self._tmp.name, 'out')
+        os.mkdir(self.data_dir)
+        with open(PREF_PATH) as fi:
+            self.preferences = json.load(fi)
+        storage = CsvStorage(self.data_dir)
+        for day in (date(2020, 3, 1), date(2020, 3, 2), date(2020, 3, 9)):
+            storage.put(day, Chronodex([
+                Activity(start=8, end=12, name='code', category='work'),
+            ]))
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def export(self):
+        written, skipped = export_range(
+            date(2020, 3, 1), date(2020, 3, 5), self.output_dir,
+            self.data_dir, self.preferences, fmt='svg', workers=1,
+        )
+        return (
+            [os.path.basename(path) for path in written],
+            [os.path.basename(path) for path in skipped],
+        )
+
+    def test_export_range(self):
+        """Checks that the days of the range are rendered with their
+        journaled edits, and rendered again only when they change.
+        """
+        # Given
+        journal = EditJournal(self.data_dir)
+        journal.insert_row(
+            date(2020, 3, 3), 0, Activity(14, 15, 'bike', 'sport', 5)
+        )
+        journal.close()
+        # When
+        written, skipped = self.export()
+        # Then
+        self.assertListEqual(
+            written, ['20200301.svg', '20200302.svg', '20200303.svg']
+        )
+        self.assertListEqual(skipped, [])
+        with open(os.path.join(self.output_dir, '20200303.svg')) as fi:
+            self.assertIn('bike', fi.read())
+        with self.subTest("Only the changed and journaled days are redone"):
+            # When
+            CsvStorage(self.data_dir).put(date(2020, 3, 2), Chronodex())
+            written, skipped = self.export()
+            # Then
+            self.assertListEqual(written, ['20200302.svg', '20200303.svg'])
+            self.assertListEqual(skipped, ['20200301.svg'])
+
+    def test_export_preferences_changed(self):
+        """Checks that the days are rendered again when the drawn
+        preferences change, but not when other preferences do.
+        """
+        # Given
+        self.export()
+        for key, value, expected in [
+            ('auto_save', not self.preferences['auto_save'], []),
+            ('show_labels', not self.preferences['show_labels'],
+             ['20200301.svg', '20200302.svg']),
+        ]:
+            with self.subTest(key=key):
+                # When
+                self.preferences = dict(self.preferences, **{key: value})
+                written, _ = self.export()
+                # Then
+                self.assertListEqual(written, expected)
@@ -0,0 +1,56 @@
+from datetime import date
+import sys
+import tempfile
+from unittest import mock, TestCase
+
+from PyQt5.QtWidgets import QApplication
+
+from serpentime.core.chronodex import Activity, Chronodex
+from serpentime.core.storage import CsvStorage
+from serpentime.core.summaries import SummaryStore
+from serpentime.ui.heatmap_calendar import HeatmapCalendar
+
+
+app = QApplication.instance() or QApplication(sys.argv)
+
+
+class TestHeatmapCalendar(TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.storage = CsvStorage(self._tmp.name)
+        self.days = [date(2020, 3, 2), date(2020, 3, 20), date(2020, 5, 4)]
+        for hours, day in enumerate(self.days, start=1):
+            self.storage.put(day, Chronodex([
+                Activity(start=8, end=8 + hours, name='code',
+                         category='work'),
+            ]))
+        # Summarizes the stored days once, as done when they are saved
+        self.summaries = SummaryStore(self._tmp.name)
+        self.summaries.sync(self.storage, self.storage.get)
+        self.read_day = mock.Mock(side_effect=self.storage.get)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def day_summaries(self, start, end):
+        self.summaries.sync(self.storage, self.read_day, start, end)
+        return self.summaries.range(start, end)
+
+    def test_page_from_summaries(self):
+        """Checks that the shown month is colored from the summaries of its
+        days, without reading the day files.
+        """
+        # When
+        calendar = HeatmapCalendar(self.day_summaries)
+        calendar.setCurrentPage(2020, 3)
+        calendar.grab()
+        # Then
+        self.assertListEqual(sorted(calendar._page), self.days[:2])
+        self.assertEqual(calendar._page[self.days[1]].covered, 2)
+        with self.subTest("Other months are read when shown"):
+            # When
+            calendar.setCurrentPage(2020, 5)
+            # Then
+            self.assertListEqual(sorted(calendar._page), self.days[2:])
+        self.read_day.assert_not_called()
@@ -0,0 +1,17 @@
+from unittest import TestCase
+
+from serpentime.ui.row_ranges import contiguous_ranges
+
+
+class TestContiguousRanges(TestCase):
+
+    def test_contiguous_ranges(self):
+        """Checks that rows are grouped in decreasing contiguous ranges."""
+        for rows, expected in [
+            ([], []),
+            ([3], [(3, 3)]),
+            ([4, 1, 2, 2, 7, 3, 8], [(7, 8), (1, 4)]),
+            (range(100), [(0, 99)]),
+        ]:
+            with self.subTest(rows=rows):
+                self.assertListEqual(contiguous_ranges(rows), expected)